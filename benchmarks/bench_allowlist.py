@@ -0,0 +1,127 @@
+"""
+Ложные срабатывания и стоимость проверки со списком исключений.
+
+Размеченный корпус: обычные фразы со словами, внутри которых есть
+запрещенные ("Херсон", "оскорблять", "плохо"), и фразы с настоящими
+нарушениями, в том числе рядом с такими словами и с обходом через
+разделители. Сравниваются старый фильтр на регулярках и автомат
+без исключений и с ними.
+
+Запуск: python benchmarks/bench_allowlist.py [повторов]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from filters import word_filter
+from legacy import LegacyWordFilter
+
+BANNED = [
+    "блять", "пизда", "ебать", "ебал", "хуй", "мудак", "сука", "жопа",
+    "хер", "лох", "жид", "дерьмо", "говно", "залупа",
+]
+
+ALLOWED = [
+    "херсон", "херес", "херувим", "оскорблять", "употреблять", "истреблять",
+    "колебать", "колебал", "хлебать", "хлебал", "страхуй", "страхуё",
+    "плох", "блох", "лохмат", "лохан", "переполох", "всполох", "жидк",
+]
+
+INNOCENT = [
+    "Вчера вернулся из Херсона, погода отличная",
+    "херсонские арбузы самые сладкие",
+    "не надо никого оскорблять в чате",
+    "Оскорблять людей плохо",
+    "врачи не советуют употреблять много сахара",
+    "истреблять вредителей на даче пора",
+    "он долго колебался, но согласился",
+    "не стоит колебать доверие команды",
+    "хлебать суп ложкой",
+    "он хлебал чай из блюдца",
+    "застрахуй машину до понедельника",
+    "страхуйся на скалодроме",
+    "плохо спал ночью",
+    "это плохая идея",
+    "у кота блохи, купи капли",
+    "лохматый пес бегает во дворе",
+    "в лохани стирали белье",
+    "в офисе переполох",
+    "всполохи на небе",
+    "жидкость для стекол закончилась",
+    "жидкий азот",
+    "хересный уксус в салат",
+    "херувимы на картине",
+    "Плохой день, но все будет хорошо",
+    "Блохастый котенок нашелся",
+]
+
+OFFENSIVE = [
+    "ты лох",
+    "хер тебе",
+    "иди на хер",
+    "хер сон не помешает",
+    "плохо, что ты лох",
+    "Херсон херня, а ты мудак",
+    "блоха и лох",
+    "х е р",
+    "л.о.х",
+    "ну ты и сука",
+    "полная жопа",
+    "блять опять",
+    "жид",
+    "страхуй хуй",
+]
+
+
+def evaluate(check, repeats):
+    """Доля ложных срабатываний, пропусков и время на сообщение"""
+    false_positives = sum(1 for text in INNOCENT if check(text)[0])
+    misses = sum(1 for text in OFFENSIVE if not check(text)[0])
+
+    corpus = INNOCENT + OFFENSIVE
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for text in corpus:
+            check(text)
+    elapsed = time.perf_counter() - started
+
+    return (false_positives / len(INNOCENT), misses / len(OFFENSIVE),
+            elapsed / (repeats * len(corpus)) * 1e6)
+
+
+def build(allowed):
+    word_filter.base_words = list(BANNED)
+    word_filter.allowed_words = list(allowed)
+    word_filter.generate_patterns()
+    # Кеш вердиктов отключен: измеряем саму проверку
+    word_filter.verdict_cache.max_entries = 0
+    word_filter.verdict_cache.clear()
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    results = [("regex", *evaluate(LegacyWordFilter(BANNED).check_message, repeats))]
+
+    build([])
+    results.append(("automaton", *evaluate(word_filter.check_message, repeats)))
+
+    build(ALLOWED)
+    results.append(("+allowlist", *evaluate(word_filter.check_message, repeats)))
+
+    print(f"Корпус: {len(INNOCENT)} обычных, {len(OFFENSIVE)} с нарушениями; "
+          f"словарь {len(BANNED)} слов, исключений {len(ALLOWED)}")
+    for name, false_positives, misses, per_message in results:
+        print(f"{name:>11}: ложных срабатываний {false_positives:6.1%}, "
+              f"пропусков {misses:6.1%}, {per_message:7.1f} мкс/сообщение")
+
+    for text in INNOCENT:
+        verdict = word_filter.check_message(text)
+        if verdict[0]:
+            print(f"  ложное срабатывание: {text!r} -> {verdict[1]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Пакетная проверка check_messages против цикла по check_message.
+
+Кеш вердиктов отключен, чтобы сравнивать саму проверку, а вердикты
+обоих способов сверяются между собой.
+
+Запуск: python benchmarks/bench_batch.py [сообщений]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from common import FILLER
+from filters import word_filter
+
+WORDS = ["блять", "пизда", "хуй", "сука", "жопа", "залупа", "мудак", "говно", "шлюха"]
+
+
+def make_corpus(size, seed=3):
+    rnd = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        words = [rnd.choice(FILLER) for _ in range(rnd.randint(3, 15))]
+        if rnd.random() < 0.1:
+            words.insert(rnd.randrange(len(words)), rnd.choice(WORDS))
+        corpus.append(' '.join(words) + f' {rnd.randint(0, 10 ** 6)}')
+    return corpus
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    corpus = make_corpus(size)
+
+    word_filter.base_words = list(WORDS)
+    word_filter.generate_patterns()
+    word_filter.verdict_cache.max_entries = 0
+
+    started = time.perf_counter()
+    single = [word_filter.check_message(text) for text in corpus]
+    single_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = list(word_filter.check_messages(iter(corpus)))
+    batch_time = time.perf_counter() - started
+
+    assert single == batch, "Вердикты пакетной проверки расходятся с check_message"
+
+    print(f"Сообщений: {size}, с нарушениями: {sum(v[0] for v in batch)}")
+    print(f"  check_message:  {single_time / size * 1e6:7.1f} мкс/сообщение")
+    print(f"  check_messages: {batch_time / size * 1e6:7.1f} мкс/сообщение")
+    print(f"  ускорение:      {single_time / batch_time:7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
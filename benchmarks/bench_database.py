@@ -0,0 +1,120 @@
+"""
+Слой SQLite под нагрузкой из N потоков: legacy, pooled (WAL) и queued (фоновая запись).
+
+Запуск: python benchmarks/bench_database.py [секунд на замер] [макс. потоков]
+"""
+import random
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from common import isolate_database, percentile
+from config import Config
+
+TEMP_DIR = isolate_database()
+
+from database import Database
+from legacy import LegacyDatabase
+
+USERS = 1000
+
+
+def prepare(path, journal_mode):
+    database = Database(path)
+    with database.transaction() as cursor:
+        cursor.executemany(
+            'INSERT INTO users (user_id, username, first_name) VALUES (?, ?, ?)',
+            [(user_id, f'user{user_id}', 'Имя') for user_id in range(USERS)]
+        )
+    database.close()
+    conn = sqlite3.connect(path)
+    conn.execute(f'PRAGMA journal_mode = {journal_mode}')
+    conn.close()
+
+
+def worker(database, seconds, seed, results):
+    rnd = random.Random(seed)
+    reads = writes = errors = 0
+    read_times = []
+    write_times = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        user_id = rnd.randrange(USERS)
+        roll = rnd.random()
+        try:
+            if roll < 0.8:
+                started = time.perf_counter()
+                database.get_user(user_id)
+                read_times.append(time.perf_counter() - started)
+                reads += 1
+            elif roll < 0.95:
+                started = time.perf_counter()
+                database.add_user(user_id, f'user{user_id}', 'Имя', None)
+                write_times.append(time.perf_counter() - started)
+                writes += 1
+            else:
+                started = time.perf_counter()
+                database.update_warnings(user_id, rnd.randrange(5))
+                database.add_moderation_log(user_id, -100, 'message_deleted', 'bench', 'текст')
+                write_times.append(time.perf_counter() - started)
+                writes += 2
+        except Exception:
+            # У общего соединения без блокировки бывают и SystemError из sqlite3
+            errors += 1
+    results.append((reads, writes, errors, read_times, write_times))
+
+
+def measure(make_database, threads, seconds):
+    database = make_database()
+    results = []
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(database, seconds, seed, results))
+               for seed in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    database.close()
+    elapsed = time.perf_counter() - started
+
+    reads = sum(result[0] for result in results)
+    writes = sum(result[1] for result in results)
+    errors = sum(result[2] for result in results)
+    read_p99 = percentile([t for result in results for t in result[3]], 0.99) * 1e6
+    write_p99 = percentile([t for result in results for t in result[4]], 0.99) * 1e6
+    return reads / elapsed, writes / elapsed, read_p99, write_p99, errors
+
+
+def make_database(path, write_behind):
+    Config.DB_WRITE_BEHIND = write_behind
+    return Database(path)
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    max_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    engines = {
+        'legacy': ('DELETE', LegacyDatabase),
+        'pooled': ('WAL', lambda path: make_database(path, False)),
+        'queued': ('WAL', lambda path: make_database(path, True)),
+    }
+    print(f"{'потоков':>7} {'движок':<7} {'чтений/с':>10} {'записей/с':>10} "
+          f"{'p99 чтения, мкс':>16} {'p99 записи, мкс':>16} {'ошибок':>7}")
+    threads = 1
+    while threads <= max_threads:
+        for name, (journal_mode, engine) in engines.items():
+            path = TEMP_DIR / f'{name}-{threads}.db'
+            prepare(path, journal_mode)
+            reads, writes, read_p99, write_p99, errors = measure(lambda: engine(path), threads, seconds)
+            print(f"{threads:>7} {name:<7} {reads:>10.0f} {writes:>10.0f} "
+                  f"{read_p99:>16.0f} {write_p99:>16.0f} {errors:>7}")
+        threads *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+"""
+Набор бенчмарков фильтра на синтетическом корпусе.
+
+Корпус генерируется из фиксированного зерна: чистые сообщения
+(русские и смешанные) и сообщения с нарушениями в разных стилях
+обхода (как есть, транслит, разделители, повторы букв, разбиение
+пробелами, опечатка) при трех распределениях длины. Движки:
+
+  automaton     - WordFilter.check_message,
+  fuzzy         - то же в чате с поиском опечаток,
+  batch         - WordFilter.check_messages,
+  legacy_regex  - фильтр на регулярках до перехода на автомат,
+  legacy_utils  - check_text_for_bad_words из старого utils.py.
+
+Для каждого движка, размера словаря, стиля и длины считаются
+пропускная способность, p50/p99 задержки и пик выделенной памяти
+на сообщение (tracemalloc), для автомата - еще и время по этапам
+(нормализация, поиск, классификация). Результаты пишутся в JSON,
+и их можно сравнить с прошлым прогоном. Цена поиска опечаток
+печатается отдельно как разница p50 между fuzzy и automaton.
+
+Запуск:
+  python benchmarks/bench_filter.py [--quick] [--output results.json]
+  python benchmarks/bench_filter.py --baseline old.json [--threshold 0.2]
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from common import LETTERS, make_dictionary, percentile
+from config import Config
+from filters import word_filter
+from legacy import LegacyUtilsFilter, LegacyWordFilter
+
+RESULTS_DIR = Path(__file__).parent / 'results'
+
+WORDS = [
+    'блять', 'пизда', 'пиздец', 'ебать', 'хуй', 'мудак', 'гондон', 'сука',
+    'дрочить', 'жопа', 'шлюха', 'пидор', 'дебил', 'чмо', 'говно', 'дерьмо',
+    'залупа', 'срать',
+]
+
+RUSSIAN = (
+    "привет как дела сегодня хорошая погода пойдем гулять вечером завтра "
+    "работа встреча проект отчет спасибо пожалуйста конечно давно видел "
+    "новости интересно смотри ссылку опять опоздал автобус магазин купить "
+    "хлеб молоко чайник посуда скучно весело отпуск море горы поезд"
+).split()
+
+MIXED = (
+    "ok lol thanks meeting zoom link deploy bug fix release chat bot "
+    "hello good morning nice shot top 10 2024 :) ))) 👍 🔥"
+).split()
+
+LENGTHS = {
+    'short': (1, 4),
+    'medium': (5, 20),
+    'long': (40, 80),
+}
+
+STYLES = ['clean', 'mixed', 'plain', 'translit', 'separators', 'repeats', 'spacing', 'typo']
+
+DICTIONARY_SIZES = [len(WORDS), 100, 400]
+
+# Старые фильтры на больших словарях вытесняют кеш регулярок re
+# и работают минутами, поэтому сравниваем их только на малых
+LEGACY_MAX_DICTIONARY = 100
+
+# Чат, в котором включен поиск с опечатками (в БД не сохраняется)
+FUZZY_CHAT_ID = -1
+
+
+def translit(word, rnd):
+    """Заменить буквы на варианты из CHAR_REPLACEMENTS (хотя бы одну)"""
+    result = []
+    for char in word:
+        variants = [v for v in Config.CHAR_REPLACEMENTS.get(char, [char]) if v and v != char]
+        result.append(rnd.choice(variants) if variants and rnd.random() < 0.7 else char)
+    if ''.join(result) == word:
+        variants = [v for v in Config.CHAR_REPLACEMENTS.get(word[0], []) if v and v != word[0]]
+        if variants:
+            result[0] = rnd.choice(variants)
+    return ''.join(result)
+
+
+def separators(word, rnd):
+    return ''.join(char + rnd.choice('.-_') for char in word[:-1]) + word[-1]
+
+
+def repeats(word, rnd):
+    return ''.join(char * rnd.randint(1, 3) for char in word)
+
+
+def spacing(word, rnd):
+    return ' '.join(word)
+
+
+def typo(word, rnd):
+    """Вставить лишнюю букву или переставить две соседние внутри слова"""
+    position = rnd.randint(1, len(word) - 2) if len(word) > 2 else 1
+    if rnd.random() < 0.5:
+        return word[:position] + rnd.choice(LETTERS) + word[position:]
+    return word[:position - 1] + word[position] + word[position - 1] + word[position + 1:]
+
+
+OBFUSCATIONS = {
+    'plain': lambda word, rnd: word,
+    'translit': translit,
+    'separators': separators,
+    'repeats': repeats,
+    'spacing': spacing,
+    'typo': typo,
+}
+
+
+def make_message(style, length, rnd, words):
+    low, high = LENGTHS[length]
+    vocabulary = MIXED + RUSSIAN if style == 'mixed' else RUSSIAN
+    message = [rnd.choice(vocabulary) for _ in range(rnd.randint(low, high))]
+    if style in OBFUSCATIONS:
+        word = OBFUSCATIONS[style](rnd.choice(words), rnd)
+        message.insert(rnd.randrange(len(message) + 1), word)
+    if rnd.random() < 0.3:
+        message[0] = message[0].capitalize()
+    return ' '.join(message)
+
+
+def make_corpus(per_cell, words, seed=1):
+    """{(стиль, длина): [сообщения]}"""
+    rnd = random.Random(seed)
+    return {
+        (style, length): [make_message(style, length, rnd, words) for _ in range(per_cell)]
+        for style in STYLES for length in LENGTHS
+    }
+
+
+def latency_stats(latencies):
+    return {
+        'mean_us': sum(latencies) / len(latencies) * 1e6,
+        'p50_us': percentile(latencies, 0.50) * 1e6,
+        'p99_us': percentile(latencies, 0.99) * 1e6,
+    }
+
+
+def allocations(check, texts, limit=50):
+    """Средний пик выделенной памяти на сообщение, байт"""
+    texts = texts[:limit]
+    tracemalloc.start()
+    try:
+        total = 0
+        for text in texts:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            check(text)
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return total / len(texts)
+
+
+def measure(check, texts):
+    """Задержки каждого сообщения и вердикты"""
+    latencies = []
+    verdicts = []
+    clock = time.perf_counter
+    for text in texts:
+        started = clock()
+        verdict = check(text)
+        latencies.append(clock() - started)
+        verdicts.append(verdict)
+    return latencies, verdicts
+
+
+def measure_stages(texts):
+    """Время этапов автомата: нормализация, поиск, классификация"""
+    normalizer = word_filter.normalizer
+    matcher = word_filter.matcher
+    clock = time.perf_counter
+    stages = {'normalize': [], 'match': [], 'classify': []}
+
+    for text in texts:
+        started = clock()
+        canonical = normalizer.canonical(text)
+        normalized_at = clock()
+        hit = next(matcher.finditer(canonical), None)
+        matched_at = clock()
+        stages['normalize'].append(normalized_at - started)
+        stages['match'].append(matched_at - normalized_at)
+        if hit is not None:
+            start, end, word = hit
+            word_filter.violation_type(normalizer.normalize(text), start, end, word)
+            stages['classify'].append(clock() - matched_at)
+
+    return {
+        stage: dict(latency_stats(latencies), calls=len(latencies))
+        for stage, latencies in stages.items() if latencies
+    }
+
+
+def summarize(engine, size, style, length, latencies, verdicts, elapsed, texts, check=None):
+    detected = sum(1 for verdict in verdicts if verdict[0])
+    result = {
+        'engine': engine,
+        'dictionary': size,
+        'style': style,
+        'length': length,
+        'messages': len(verdicts),
+        'detected': detected,
+        'throughput_msg_s': len(verdicts) / elapsed if elapsed else 0.0,
+        'verdict_types': dict(Counter(verdict[2] for verdict in verdicts if verdict[0])),
+    }
+    if latencies:
+        result.update(latency_stats(latencies))
+    else:
+        result['mean_us'] = elapsed / len(verdicts) * 1e6
+    if check is not None:
+        result['alloc_peak_bytes'] = allocations(check, texts)
+    return result
+
+
+def run_dictionary(size, per_cell, legacy):
+    words = make_dictionary(WORDS, size)
+    corpus = make_corpus(per_cell, WORDS)
+
+    word_filter.base_words = list(words)
+    word_filter.generate_patterns()
+    # Кеш вердиктов отключен: измеряем саму проверку
+    word_filter.verdict_cache.max_entries = 0
+    word_filter.verdict_cache.clear()
+
+    word_filter.set_fuzzy(FUZZY_CHAT_ID, True)
+    engines = {
+        'automaton': word_filter.check_message,
+        'fuzzy': lambda text: word_filter.check_message(text, FUZZY_CHAT_ID),
+    }
+    if legacy and size <= LEGACY_MAX_DICTIONARY:
+        engines['legacy_regex'] = LegacyWordFilter(words).check_message
+        engines['legacy_utils'] = LegacyUtilsFilter(words).check_message
+
+    results = []
+    for (style, length), texts in corpus.items():
+        for engine, check in engines.items():
+            started = time.perf_counter()
+            latencies, verdicts = measure(check, texts)
+            elapsed = time.perf_counter() - started
+            result = summarize(engine, size, style, length, latencies, verdicts, elapsed, texts, check)
+            if engine == 'automaton':
+                result['stages'] = measure_stages(texts)
+            results.append(result)
+
+        started = time.perf_counter()
+        verdicts = list(word_filter.check_messages(texts))
+        elapsed = time.perf_counter() - started
+        results.append(summarize('batch', size, style, length, [], verdicts, elapsed, texts))
+
+    return results
+
+
+def print_results(results):
+    print(f"{'движок':<13} {'слов':>5} {'стиль':<11} {'длина':<7} {'найдено':>8} "
+          f"{'сообщ/с':>9} {'p50 мкс':>9} {'p99 мкс':>9} {'пик Б':>8}")
+    for r in results:
+        print(f"{r['engine']:<13} {r['dictionary']:>5} {r['style']:<11} {r['length']:<7} "
+              f"{r['detected'] / r['messages']:>8.0%} {r['throughput_msg_s']:>9.0f} "
+              f"{r.get('p50_us', r['mean_us']):>9.1f} {r.get('p99_us', r['mean_us']):>9.1f} "
+              f"{r.get('alloc_peak_bytes', 0):>8.0f}")
+
+    print("\nЭтапы автомата (среднее по всем стилям, мкс):")
+    by_size = {}
+    for r in results:
+        for stage, stats in r.get('stages', {}).items():
+            total = by_size.setdefault(r['dictionary'], {}).setdefault(stage, [0.0, 0])
+            total[0] += stats['mean_us'] * stats['calls']
+            total[1] += stats['calls']
+    for size, stages in by_size.items():
+        parts = ', '.join(f"{stage} {total / calls:.1f}" for stage, (total, calls) in stages.items())
+        print(f"  {size:>5} слов: {parts}")
+
+
+def print_fuzzy_overhead(results):
+    """Добавка к p50 от поиска с опечатками по размерам словаря"""
+    by_cell = {
+        (r['engine'], r['dictionary'], r['style'], r['length']): r
+        for r in results
+    }
+    print("\nПоиск с опечатками, добавка к p50 (мкс) и доля найденных опечаток:")
+    for size in DICTIONARY_SIZES:
+        added = []
+        detected = {}
+        for length in LENGTHS:
+            for style in STYLES:
+                base = by_cell.get(('automaton', size, style, length))
+                fuzzy = by_cell.get(('fuzzy', size, style, length))
+                if base is None or fuzzy is None:
+                    continue
+                added.append(fuzzy['p50_us'] - base['p50_us'])
+                if style == 'typo':
+                    detected[length] = (base['detected'] / base['messages'],
+                                        fuzzy['detected'] / fuzzy['messages'])
+        if not added:
+            continue
+        typos = ', '.join(f"{length} {before:.0%} -> {after:.0%}" for length, (before, after) in detected.items())
+        print(f"  {size:>5} слов: в среднем {sum(added) / len(added):+.1f}, "
+              f"максимум {max(added):+.1f}; опечатки: {typos}")
+
+
+def compare(results, baseline, threshold):
+    """Сравнить с прошлым прогоном; возвращает число регрессий"""
+    old = {
+        (r['engine'], r['dictionary'], r['style'], r['length']): r
+        for r in baseline['results']
+    }
+    regressions = 0
+    print(f"\nСравнение с базовым прогоном от {baseline['meta']['date']} (порог {threshold:.0%}):")
+    for r in results:
+        before = old.get((r['engine'], r['dictionary'], r['style'], r['length']))
+        if before is None:
+            continue
+        key = 'p50_us' if 'p50_us' in r and 'p50_us' in before else 'mean_us'
+        change = r[key] / before[key] - 1 if before[key] else 0.0
+        if abs(change) < threshold:
+            continue
+        marker = "РЕГРЕССИЯ" if change > 0 else "ускорение"
+        regressions += change > 0
+        print(f"  {marker:<10} {r['engine']:<13} {r['dictionary']:>5} {r['style']:<11} "
+              f"{r['length']:<7} {key}: {before[key]:.1f} -> {r[key]:.1f} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк фильтра на синтетическом корпусе")
+    parser.add_argument('--quick', action='store_true', help="меньший корпус для быстрой проверки")
+    parser.add_argument('--no-legacy', action='store_true', help="не запускать старые фильтры")
+    parser.add_argument('--output', type=Path, help="файл для результатов JSON")
+    parser.add_argument('--baseline', type=Path, help="результаты прошлого прогона для сравнения")
+    parser.add_argument('--threshold', type=float, default=0.2, help="порог изменения p50")
+    args = parser.parse_args()
+
+    per_cell = 30 if args.quick else 200
+    results = []
+    for size in DICTIONARY_SIZES:
+        print(f"Словарь: {size} слов...", file=sys.stderr)
+        results.extend(run_dictionary(size, per_cell, not args.no_legacy))
+
+    print_results(results)
+    print_fuzzy_overhead(results)
+
+    report = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'messages_per_cell': per_cell,
+            'dictionary_sizes': DICTIONARY_SIZES,
+        },
+        'results': results,
+    }
+
+    output = args.output or RESULTS_DIR / f"filter-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\nРезультаты сохранены: {output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
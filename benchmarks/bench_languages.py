@@ -0,0 +1,96 @@
+"""
+Словари нескольких языков: пропускная способность по языку сообщений.
+
+Корпуса на русском, украинском, английском и смешанные; в каждом
+десятом сообщении запрещенное слово своего языка. Сравниваются выбор
+словарей по алфавиту сообщения (routed) и проверка всеми словарями
+подряд (all). Кеш вердиктов отключен.
+
+Запуск: python benchmarks/bench_languages.py [сообщений на язык]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from config import Config
+from filters import word_filter
+
+DICTIONARIES = {
+    'ru': ["блять", "пизда", "хуй", "сука", "жопа", "залупа", "мудак", "говно", "шлюха", "дебил"],
+    'uk': ["курва", "срака", "гівно", "лайно", "йобаний", "довбойоб", "хуйло", "дупа"],
+    'en': ["fuck", "shit", "bitch", "cunt", "asshole", "dick", "bastard", "whore", "slut", "twat"],
+}
+
+FILLER = {
+    'ru': "привет как дела сегодня хорошая погода пойдем гулять вечером завтра работа встреча проект отчет",
+    'uk': "привіт як справи сьогодні гарна погода підемо гуляти ввечері завтра робота зустріч проєкт звіт",
+    'en': "hello how are you today nice weather let us walk tonight tomorrow work meeting project report",
+}
+
+
+def make_corpus(languages, size, rnd):
+    corpus = []
+    for _ in range(size):
+        words = []
+        for language in languages:
+            filler = FILLER[language].split()
+            words.extend(rnd.choice(filler) for _ in range(rnd.randint(2, 8)))
+        rnd.shuffle(words)
+        if rnd.random() < 0.1:
+            words.insert(rnd.randrange(len(words)), rnd.choice(DICTIONARIES[rnd.choice(languages)]))
+        corpus.append(' '.join(words))
+    return corpus
+
+
+def measure(corpus):
+    started = time.perf_counter()
+    verdicts = [word_filter.check_message(text) for text in corpus]
+    elapsed = time.perf_counter() - started
+    return len(corpus) / elapsed, sum(1 for verdict in verdicts if verdict[0])
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rnd = random.Random(11)
+    corpora = {
+        'ru': make_corpus(['ru'], size, rnd),
+        'uk': make_corpus(['uk'], size, rnd),
+        'en': make_corpus(['en'], size, rnd),
+        'ru+en': make_corpus(['ru', 'en'], size, rnd),
+    }
+
+    word_filter.base_words = list(DICTIONARIES['ru'])
+    word_filter.allowed_words = []
+    word_filter.language_words = {language: list(words) for language, words in DICTIONARIES.items()
+                                  if language != Config.DEFAULT_LANGUAGE}
+    word_filter.language_allowed = {}
+    word_filter.swap_matchers({
+        language: word_filter.build_matcher(*word_filter.language_dictionary(language), language)
+        for language in DICTIONARIES
+    })
+    word_filter.verdict_cache.max_entries = 0
+
+    routed = {name: measure(corpus) for name, corpus in corpora.items()}
+
+    # Все словари для любого сообщения
+    routes = word_filter.routes
+    everything = routes[frozenset()]
+    word_filter.routes = dict.fromkeys(routes, everything)
+    unrouted = {name: measure(corpus) for name, corpus in corpora.items()}
+    word_filter.routes = routes
+
+    print(f"Словари: {', '.join(f'{language} {len(words)}' for language, words in DICTIONARIES.items())}; "
+          f"сообщений на корпус: {size}")
+    print(f"{'корпус':<7} {'словари':<10} {'routed сообщ/с':>15} {'all сообщ/с':>12} {'выигрыш':>8} {'найдено':>8}")
+    for name, corpus in corpora.items():
+        (routed_rate, found), (all_rate, all_found) = routed[name], unrouted[name]
+        route = routes[word_filter.normalizer.scripts(corpus[0])][0]
+        print(f"{name:<7} {route:<10} {routed_rate:>15.0f} {all_rate:>12.0f} "
+              f"{routed_rate / all_rate:>7.2f}x {found:>4}/{all_found}")
+
+
+if __name__ == '__main__':
+    main()
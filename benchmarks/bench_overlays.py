@@ -0,0 +1,122 @@
+"""
+Словари чатов: память и задержка автоматов-надстроек.
+
+Для N чатов с собственными словами сравнивается память двух схем:
+маленький автомат только из слов чата поверх общего (overlay) и
+отдельный полный автомат на чат (общий словарь + слова чата, full).
+Затем замеряется задержка check_message для чата без своих слов и
+для чата со словарем. Кеш вердиктов отключен, слова чатов берутся
+из памяти, а не из БД.
+
+Общий словарь дополняется до заданного размера случайными словами,
+чтобы оценить разницу на словарях в тысячи слов.
+
+Запуск: python benchmarks/bench_overlays.py [чатов] [слов на чат] [слов в общем словаре]
+"""
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import filters
+from common import FILLER
+from filters import word_filter
+
+ALPHABET = 'абвгдежзиклмнопрстуфхцчшэюя'
+
+
+def chat_words(rnd, count):
+    return [''.join(rnd.choice(ALPHABET) for _ in range(rnd.randint(5, 9))) for _ in range(count)]
+
+
+class FakeWords:
+    """Слова чатов вместо таблицы custom_words"""
+
+    def __init__(self, words):
+        self.words = words
+
+    def get_custom_words(self, chat_id=0):
+        return self.words.get(chat_id, [])
+
+
+def allocated(build):
+    """Память, которую удерживают результаты build()"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def latency(texts, chat_id):
+    samples = []
+    for text in texts:
+        started = time.perf_counter()
+        word_filter.check_message(text, chat_id)
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+
+def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    per_chat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    base_size = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    rnd = random.Random(5)
+    words = {chat_id: chat_words(rnd, per_chat) for chat_id in range(1, chats + 1)}
+    allowed = word_filter.allowed_words
+    base = word_filter.base_words + chat_words(rnd, max(0, base_size - len(word_filter.base_words)))
+    word_filter.base_words = base
+    word_filter.generate_patterns()
+
+    # Слова чатов отдаются из памяти вместо БД
+    word_filter.overlays.build = lambda chat_id: (
+        word_filter.build_overlay(chat_id) if chat_id in words else None)
+    filters.db = FakeWords(words)
+
+    overlays, overlay_size = allocated(
+        lambda: [word_filter.build_overlay(chat_id) for chat_id in words])
+    del overlays
+    full, full_size = allocated(
+        lambda: [word_filter.build_matcher(base + chat, allowed) for chat in list(words.values())[:20]])
+    del full
+    full_size = full_size * chats // min(chats, 20)
+
+    print(f"Общий словарь: {len(base)} слов; чатов: {chats}, слов на чат: {per_chat}")
+    print(f"{'схема':<8} {'память, МБ':>11} {'на чат, КБ':>11}")
+    for name, size in (('overlay', overlay_size), ('full', full_size)):
+        print(f"{name:<8} {size / 2**20:>11.1f} {size / chats / 2**10:>11.1f}")
+    print(f"Экономия: {full_size / max(overlay_size, 1):.0f}x (full оценен по 20 чатам)")
+
+    word_filter.overlays.clear()
+    word_filter.verdict_cache.max_entries = 0
+
+    texts = []
+    for _ in range(5000):
+        message = rnd.choices(FILLER, k=rnd.randint(3, 12))
+        if rnd.random() < 0.1:
+            message.insert(rnd.randrange(len(message)), rnd.choice(words[1]))
+        texts.append(' '.join(message))
+
+    cases = (('без слов', None), ('без словаря', chats + 1), ('со словарем', 1))
+    results = {name: [] for name, _ in cases}
+    for _ in range(3):
+        for name, chat_id in cases:
+            results[name].append(latency(texts, chat_id))
+
+    print(f"{'чат':<14} {'p50, мкс':>9} {'p99, мкс':>9} {'найдено':>8}")
+    for name, chat_id in cases:
+        p50, p99 = min(results[name])
+        found = sum(1 for text in texts if word_filter.check_message(text, chat_id)[0])
+        print(f"{name:<14} {p50:>9.1f} {p99:>9.1f} {found:>8}")
+    print(f"Автоматов в памяти: {word_filter.overlays.get_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Повторная проверка истории: масштабирование по процессам и память.
+
+Генерирует экспорт Telegram из N сообщений (каждое десятое с
+нарушением) и прогоняет его через tools/scan_corpus.py с разным числом
+процессов пула. Печатает пропускную способность, ускорение
+относительно одного процесса и пиковую память (ru_maxrss) главного
+процесса и воркеров: она не должна расти вместе с N.
+
+Запуск: python benchmarks/bench_scan.py [сообщений] [макс. процессов]
+"""
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'tools'))
+
+import scan_corpus
+from common import FILLER
+
+BAD = ["сука", "хуй", "пизда", "жопа", "говно", "м.у.д.а.к", "зaлупa"]
+
+
+def write_export(path, size):
+    """Экспорт пишется по сообщению, чтобы генератор сам не держал корпус"""
+    rnd = random.Random(2)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"name": "bench", "type": "public_supergroup", "id": 1, "messages": [\n')
+        for i in range(size):
+            words = rnd.choices(FILLER, k=rnd.randint(3, 20))
+            if rnd.random() < 0.1:
+                words.insert(rnd.randrange(len(words)), rnd.choice(BAD))
+            message = {'id': i, 'type': 'message', 'date': '2024-01-01T00:00:00',
+                       'from': 'user', 'from_id': f'user{i % 500}', 'text': ' '.join(words)}
+            f.write(('' if i == 0 else ',\n') + json.dumps(message, ensure_ascii=False))
+        f.write('\n]}\n')
+
+
+def run(path, workers):
+    started = time.perf_counter()
+    total = violations = 0
+    for verdict in scan_corpus.scan(scan_corpus.read_export(path), workers, 512):
+        total += 1
+        violations += verdict['violation']
+    return total / (time.perf_counter() - started), violations
+
+
+def max_rss():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / 1024, children / 1024
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else multiprocessing.cpu_count()
+    counts = [1]
+    while counts[-1] * 2 <= max_workers:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / 'result.json'
+        # Корпус пишется в отдельном процессе, чтобы не влиять на RSS замера
+        writer = multiprocessing.Process(target=write_export, args=(path, size))
+        writer.start()
+        writer.join()
+        print(f"Сообщений: {size}, файл: {path.stat().st_size / 2**20:.1f} МБ, "
+              f"ядер: {multiprocessing.cpu_count()}")
+
+        print(f"{'процессов':>9} {'сообщ/с':>9} {'ускорение':>10} {'нарушений':>10} {'RSS, МБ':>8} {'воркер, МБ':>11}")
+        single = None
+        for workers in counts:
+            rate, violations = run(path, workers)
+            single = single or rate
+            own, children = max_rss()
+            print(f"{workers:>9} {rate:>9.0f} {rate / single:>9.2f}x {violations:>10} {own:>8.0f} {children:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
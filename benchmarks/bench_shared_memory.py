@@ -0,0 +1,95 @@
+"""
+Память процессов-воркеров с общим (mmap) словарем и без него.
+
+Запускает несколько процессов, каждый загружает словарь и проверяет
+корпус сообщений, затем печатает RSS из /proc/self/status:
+RssAnon - собственная память процесса, RssFile - страницы файлов,
+которые делятся между процессами через страничный кеш.
+
+Запуск (Linux): python benchmarks/bench_shared_memory.py [слов] [процессов]
+"""
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from common import LETTERS, make_words
+
+
+def read_rss():
+    """Показатели памяти процесса в КБ"""
+    result = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ('VmRSS', 'RssAnon', 'RssFile'):
+                result[name] = int(value.split()[0])
+    return result
+
+
+def worker(temp_dir, mode, queue):
+    from config import Config
+
+    Config.BANNED_WORDS_FILE = Path(temp_dir) / 'banned_words.json'
+    Config.MATCHER_CACHE_FILE = Path(temp_dir) / 'banned_words.matcher'
+    Config.MATCHER_SHARED = mode == 'mmap'
+    if mode == 'build':
+        # Свой пустой каталог: автомат собирается в памяти процесса
+        build_dir = Path(temp_dir) / f'build-{os.getpid()}'
+        build_dir.mkdir()
+        Config.MATCHER_CACHE_FILE = build_dir / 'banned_words.matcher'
+
+    from filters import word_filter
+
+    rnd = random.Random(1)
+    before = read_rss()
+    for _ in range(2000):
+        text = ' '.join(''.join(rnd.choice(LETTERS) for _ in range(rnd.randint(3, 9))) for _ in range(8))
+        word_filter.check_message(text)
+
+    queue.put((before, read_rss()))
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    context = multiprocessing.get_context('spawn')
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with open(Path(temp_dir) / 'banned_words.json', 'w', encoding='utf-8') as f:
+            json.dump({'banned_words': make_words(size)}, f, ensure_ascii=False)
+
+        # Первый запуск собирает файл автомата
+        warmup = context.Queue()
+        process = context.Process(target=worker, args=(temp_dir, 'read', warmup))
+        process.start()
+        warmup.get()
+        process.join()
+
+        artifact_size = (Path(temp_dir) / 'banned_words.matcher').stat().st_size
+        print(f"Слов в словаре: {size}, процессов: {processes}, "
+              f"файл автомата: {artifact_size / 1024 / 1024:.1f} МБ")
+        for mode in ('build', 'read', 'mmap'):
+            queue = context.Queue()
+            workers = [context.Process(target=worker, args=(temp_dir, mode, queue))
+                       for _ in range(processes)]
+            for process in workers:
+                process.start()
+            results = [queue.get() for _ in workers]
+            for process in workers:
+                process.join()
+
+            anon = sum(after['RssAnon'] for _, after in results) / len(results)
+            file_pages = sum(after['RssFile'] for _, after in results) / len(results)
+            rss = sum(after['VmRSS'] for _, after in results) / len(results)
+            print(f"  {mode:>5}: VmRSS {rss / 1024:7.1f} МБ, "
+                  f"RssAnon {anon / 1024:7.1f} МБ (своя), RssFile {file_pages / 1024:7.1f} МБ (общая)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Время загрузки словаря: сборка автомата с нуля против
+загрузки скомпилированного файла.
+
+Запуск: python benchmarks/bench_startup.py [слов_в_словаре]
+"""
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from common import make_words
+from config import Config
+from filters import word_filter
+
+def measure(repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        word_filter.load_words()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        Config.BANNED_WORDS_FILE = Path(temp_dir) / 'banned_words.json'
+        Config.MATCHER_CACHE_FILE = Path(temp_dir) / 'banned_words.matcher'
+
+        with open(Config.BANNED_WORDS_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'banned_words': make_words(size)}, f, ensure_ascii=False)
+
+        # Сборка с нуля: файл автомата удаляется перед каждой загрузкой
+        timings = []
+        for _ in range(5):
+            Config.MATCHER_CACHE_FILE.unlink(missing_ok=True)
+            started = time.perf_counter()
+            word_filter.load_words()
+            timings.append(time.perf_counter() - started)
+        cold = min(timings)
+
+        warm = measure()
+        artifact_size = Config.MATCHER_CACHE_FILE.stat().st_size
+
+    print(f"Слов в словаре: {size}, размер файла автомата: {artifact_size / 1024:.0f} КБ")
+    print(f"  сборка с нуля:       {cold * 1000:8.1f} мс")
+    print(f"  загрузка с диска:    {warm * 1000:8.1f} мс")
+    print(f"  ускорение:           {cold / warm:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Поиск словоформ по основам против регулярок и автомата без основ.
+
+Корпус: формы запрещенных слов, которых нет в словаре (падежи,
+множественное число, глагольные формы), и обычные фразы. Для каждого
+способа считаются доля найденных форм, ложные срабатывания и время
+на сообщение.
+
+Запуск: python benchmarks/bench_stems.py [повторов]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from config import Config
+from filters import word_filter
+from legacy import LegacyWordFilter
+
+# В словаре только начальные формы
+BANNED = [
+    "залупа", "пизда", "сука", "жопа", "мудак", "дебил", "шлюха", "гондон",
+    "дрочить", "трахать", "идиот", "кретин", "говно", "дерьмо", "срать",
+]
+
+FORMS = [
+    "залупой", "залупу", "залупиться", "пизды", "пиздой", "пизде", "суки",
+    "сукой", "суками", "жопой", "жопу", "жопе", "мудаки", "мудаками", "мудаку",
+    "дебилы", "дебилов", "дебилом", "шлюхи", "шлюхой", "шлюхам", "гондоны",
+    "гондонов", "дрочил", "дрочит", "дрочишь", "трахал", "трахаешься", "трахают",
+    "идиоты", "идиотов", "идиотка", "кретины", "кретином", "говна", "говном",
+    "дерьма", "дерьмом", "срал", "срет", "сру",
+]
+
+FILLER = "ну ты и {} конечно, уходи"
+
+CLEAN = [
+    "привет как дела", "сегодня хорошая погода", "пойдем гулять вечером",
+    "завтра важная встреча по проекту", "купи хлеба и молока", "спасибо за помощь",
+    "скинь ссылку на отчет", "поезд опаздывает на час", "отличная новость",
+    "у нас в офисе сломался принтер", "кто идет на обед", "с днем рождения",
+    # Совпадают с короткими основами словаря ("сук", "деб")
+    "на старом дубе много сук", "деба в этом году не будет", "много суков на дереве",
+]
+
+
+def evaluate(check, repeats):
+    offending = [FILLER.format(form) for form in FORMS]
+    found = sum(1 for text in offending if check(text)[0])
+    false_positives = sum(1 for text in CLEAN if check(text)[0])
+
+    corpus = offending + CLEAN
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for text in corpus:
+            check(text)
+    elapsed = time.perf_counter() - started
+
+    return found / len(offending), false_positives / len(CLEAN), elapsed / (repeats * len(corpus)) * 1e6
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+
+    word_filter.base_words = list(BANNED)
+    word_filter.generate_patterns()
+    # Кеш вердиктов отключен: измеряем саму проверку
+    word_filter.verdict_cache.max_entries = 0
+
+    results = [("regex", *evaluate(LegacyWordFilter(BANNED).check_message, repeats))]
+
+    Config.FILTER_STEMS = False
+    results.append(("automaton", *evaluate(word_filter.check_message, repeats)))
+
+    Config.FILTER_STEMS = True
+    results.append(("+stems", *evaluate(word_filter.check_message, repeats)))
+
+    print(f"Словарь: {len(BANNED)} начальных форм, основ в индексе: {len(word_filter.stems)}")
+    print(f"Сообщений: {len(FORMS)} со словоформами, {len(CLEAN)} чистых")
+    for name, found, false_positives, per_message in results:
+        print(f"{name:>10}: найдено форм {found:6.1%}, ложных срабатываний {false_positives:5.1%}, "
+              f"{per_message:7.1f} мкс/сообщение")
+
+    missed = [form for form in FORMS if not word_filter.check_message(FILLER.format(form))[0]]
+    if missed:
+        print(f"  не найдены: {', '.join(missed)}")
+
+
+if __name__ == '__main__':
+    main()
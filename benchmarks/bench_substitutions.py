@@ -0,0 +1,82 @@
+"""
+Сравнение старого набора регулярных выражений с автоматом
+на сообщениях с многобуквенными заменами (zh, sch, ya, ts).
+
+Запуск: python benchmarks/bench_substitutions.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from common import make_dictionary
+from config import Config
+from filters import word_filter
+from legacy import LegacyWordFilter
+
+WORDS = [
+    "жопа", "щель", "цель", "ящик", "юла", "чмо", "шлюха", "залупа",
+    "пизда", "сука", "хуй", "мудак", "говно", "дерьмо", "гондон"
+]
+
+FILLER = "привет как дела сегодня хорошая погода пойдем гулять вечером".split()
+
+CLEAN = [
+    "hope you are ok", "the shop is closed", "chat history", "nice shot",
+    "привет как дела", "zoom call at 5", "h0t tea", "yes i know",
+]
+
+
+def obfuscate(word, rnd):
+    """Заменить буквы слова на случайные варианты из CHAR_REPLACEMENTS (ь и ъ могут пропасть)"""
+    result = []
+    for char in word:
+        variants = Config.CHAR_REPLACEMENTS.get(char, [char])
+        result.append(rnd.choice(variants) if variants else char)
+    return ''.join(result)
+
+
+def make_corpus(size, seed=42):
+    rnd = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        words = rnd.sample(FILLER, 5)
+        words.insert(rnd.randrange(len(words)), obfuscate(rnd.choice(WORDS), rnd))
+        corpus.append(' '.join(words))
+    return corpus
+
+
+def run(check, corpus):
+    found = 0
+    started = time.perf_counter()
+    for text in corpus:
+        if check(text)[0]:
+            found += 1
+    elapsed = time.perf_counter() - started
+    return found, elapsed
+
+
+def main():
+    corpus = make_corpus(300)
+    clean = CLEAN * 25
+
+    for size in (len(WORDS), 100, 400):
+        words = make_dictionary(WORDS, size)
+        word_filter.base_words = list(words)
+        word_filter.generate_patterns()
+        legacy = LegacyWordFilter(words)
+
+        print(f"Словарь: {size} слов, сообщений: {len(corpus)} с заменами, {len(clean)} чистых")
+        for name, check in (("regex", legacy.check_message), ("automaton", word_filter.check_message)):
+            found, elapsed = run(check, corpus)
+            false_positives, elapsed_clean = run(check, clean)
+            print(f"{name:>10}: найдено {found / len(corpus):6.1%}, "
+                  f"ложных срабатываний {false_positives / len(clean):6.1%}, "
+                  f"{elapsed / len(corpus) * 1e6:9.1f} мкс/сообщение с заменами, "
+                  f"{elapsed_clean / len(clean) * 1e6:9.1f} мкс/чистое")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Кеш состояния пользователей: попадания, задержка и память при нарушениях по Ципфу.
+
+Запуск: python benchmarks/bench_user_cache.py [пользователей] [нарушений]
+"""
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from itertools import accumulate
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from common import isolate_database
+from config import Config
+
+TEMP_DIR = isolate_database()
+# Меряем кеш, а не fsync каждого increment_warnings
+Config.DB_SYNCHRONOUS = 'OFF'
+
+from database import Database, UserCache, UserState
+
+
+def zipf_offenders(users, count, rnd, exponent=1.1):
+    weights = list(accumulate(1 / (rank ** exponent) for rank in range(1, users + 1)))
+    return rnd.choices(range(users), cum_weights=weights, k=count)
+
+
+def memory_per_user(count=20000):
+    """Память UserCache на одного пользователя"""
+    cache = UserCache(count)
+    gc.collect()
+    tracemalloc.start()
+    for user_id in range(10 ** 9, 10 ** 9 + count):
+        cache.get(user_id, lambda _: UserState(1, 0, False))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / count
+
+
+WINDOW = 200  # по скольким последним предупреждениям в чате нажимают "Подробнее"
+
+
+def run(database, offenders, read_state, rnd):
+    timings = []
+    for index, user_id in enumerate(offenders):
+        database.increment_warnings(user_id)
+        clicked = offenders[max(0, index - rnd.randrange(WINDOW))]
+        started = time.perf_counter()
+        read_state(clicked)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1e6, timings[int(len(timings) * 0.99)] * 1e6
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    violations = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    offenders = zipf_offenders(users, violations, random.Random(4))
+
+    path = TEMP_DIR / 'users.db'
+    database = Database(path)
+    with database.transaction() as cursor:
+        cursor.executemany('INSERT INTO users (user_id, username) VALUES (?, ?)',
+                           [(user_id, f'user{user_id}') for user_id in range(users)])
+
+    print(f"Пользователей: {users}, нарушений: {violations} "
+          f"(разных нарушителей: {len(set(offenders))})")
+    print(f"Память на пользователя в кеше: {memory_per_user():.0f} байт")
+    print(f"{'кеш':>8} {'попаданий':>10} {'p50, мкс':>9} {'p99, мкс':>9}")
+
+    p50, p99 = run(database, offenders, lambda user_id: database.get_user(user_id)[4], random.Random(5))
+    print(f"{'без кеша':>8} {'-':>10} {p50:>9.1f} {p99:>9.1f}")
+
+    for size in (100, 1000, Config.USER_CACHE_SIZE):
+        database.users = UserCache(size)
+        p50, p99 = run(database, offenders, lambda user_id: database.get_user_state(user_id).warnings,
+                       random.Random(5))
+        stats = database.users.get_stats()
+        print(f"{size:>8} {stats['hit_rate']:>10.1%} {p50:>9.1f} {p99:>9.1f}")
+
+    database.close()
+
+
+if __name__ == '__main__':
+    main()
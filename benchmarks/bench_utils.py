@@ -0,0 +1,113 @@
+"""
+utils.py до и после перехода на общий автомат: запуск и задержка.
+
+До - проверка из старого utils.py (LegacyUtilsFilter): при запуске
+словарь разворачивается в варианты написания, каждое сообщение
+дважды сравнивается со всеми вариантами и регулярками. После -
+WordFilter, на котором теперь работает utils.py: автомат собирается
+с нуля (cold) или читается из скомпилированного файла (warm).
+Словарь один и тот же - запрещенные слова общего словаря
+(data/banned_words.json, куда перенесен список старого utils.py).
+Скомпилированный файл пишется во временный каталог. Кеш вердиктов
+отключен.
+
+Запуск: python benchmarks/bench_utils.py [сообщений]
+"""
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from common import FILLER
+from config import Config
+from filters import word_filter
+from legacy import LegacyUtilsFilter
+
+DISGUISES = (
+    lambda word: word,
+    lambda word: '.'.join(word),
+    lambda word: ''.join(char * 2 for char in word),
+    lambda word: word.replace('о', 'o').replace('а', 'a').replace('е', 'e'),
+)
+
+
+def shared_words():
+    """Запрещенные слова общего словаря"""
+    with open(Config.BANNED_WORDS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f).get('banned_words', [])
+
+
+def make_corpus(words, size, rnd):
+    corpus = []
+    for _ in range(size):
+        message = rnd.choices(FILLER, k=rnd.randint(3, 15))
+        if rnd.random() < 0.1:
+            message.insert(rnd.randrange(len(message)), rnd.choice(DISGUISES)(rnd.choice(words).lower()))
+        corpus.append(' '.join(message))
+    return corpus
+
+
+def best_of(action, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = action()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def latency(check, corpus):
+    samples = []
+    found = 0
+    for text in corpus:
+        started = time.perf_counter()
+        found += bool(check(text)[0])
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99)], found
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    words = shared_words()
+    corpus = make_corpus(words, size, random.Random(3))
+
+    legacy_startup, legacy = best_of(lambda: LegacyUtilsFilter([word.lower() for word in words]))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        Config.MATCHER_CACHE_FILE = Path(temp_dir) / 'banned_words.matcher'
+
+        def cold_load():
+            Config.MATCHER_CACHE_FILE.unlink(missing_ok=True)
+            word_filter.load_words()
+
+        cold_startup, _ = best_of(cold_load)
+        warm_startup, _ = best_of(word_filter.load_words)
+    word_filter.verdict_cache.max_entries = 0
+
+    results = {
+        'до (utils)': (legacy_startup, latency(legacy.check_message, corpus)),
+        'после, cold': (cold_startup, latency(word_filter.check_message, corpus)),
+        'после, warm': (warm_startup, None),
+    }
+
+    print(f"Слов: {len(words)} (вариантов в старом utils.py: {len(legacy.bad_words)}); "
+          f"сообщений: {size}")
+    print(f"{'движок':<12} {'запуск, мс':>11} {'p50, мкс':>9} {'p99, мкс':>9} {'найдено':>8}")
+    for name, (startup, timing) in results.items():
+        row = f"{name:<12} {startup * 1000:>11.1f}"
+        if timing is not None:
+            p50, p99, found = timing
+            row += f" {p50:>9.1f} {p99:>9.1f} {found:>8}"
+        print(row)
+
+    legacy_p50 = results['до (utils)'][1][0]
+    print(f"Задержка p50: {legacy_p50 / results['после, cold'][1][0]:.1f}x быстрее")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Общие заготовки бенчмарков и проверок"""
+import random
+import tempfile
+from pathlib import Path
+
+# Буквы случайных слов словаря
+LETTERS = "абвгдежзиклмнопрстуфхцчшщэюя"
+
+# Обычные слова для сообщений без нарушений
+FILLER = ("привет как дела сегодня хорошая погода пойдем гулять вечером "
+          "завтра работа встреча проект отчет спасибо").split()
+
+TEMP_DIR = None
+
+
+def isolate_database() -> Path:
+    """Временный каталог для баз; глобальный db из database.py тоже уходит туда, а не в базу бота"""
+    global TEMP_DIR
+    from config import Config
+
+    if TEMP_DIR is None:
+        TEMP_DIR = tempfile.TemporaryDirectory()
+    Config.DB_PATH = Path(TEMP_DIR.name) / 'global.db'
+    return Path(TEMP_DIR.name)
+
+
+def make_words(size, seed=7):
+    """Случайные слова для большого словаря, без повторов"""
+    rnd = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rnd.choice(LETTERS) for _ in range(rnd.randint(4, 10))))
+    return sorted(words)
+
+
+def make_dictionary(words, size, seed=7):
+    """Словарь из words, дополненный случайными словами до нужного размера"""
+    rnd = random.Random(seed)
+    words = list(words)
+    while len(words) < size:
+        words.append(''.join(rnd.choice(LETTERS) for _ in range(rnd.randint(5, 9))))
+    return words
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
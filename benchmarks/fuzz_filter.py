@@ -0,0 +1,135 @@
+"""
+Проверка худшего времени check_message на враждебных строках.
+
+Генерирует длинные повторы букв, разделителей и неоднозначных замен,
+на которых старые регулярные выражения уходили в возвраты.
+Завершается с кодом 1, если худшая задержка превысила порог.
+
+Затем те же строки проверяются на большом словаре с исключениями
+(LARGE_DICTIONARY слов), и после каждой дописывается запрещенное
+слово: подкладка не должна скрывать его или исчерпывать время
+проверки. Код 1, если слово пропущено или были прерывания.
+
+Запуск: python benchmarks/fuzz_filter.py [порог_мс] [итераций]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from common import make_words
+from config import Config
+from filters import word_filter
+
+MAX_LENGTH = 4096  # Предел длины сообщения в Telegram
+LARGE_DICTIONARY = 20000
+
+WORDS = [
+    "блять", "пизда", "пиздец", "хуй", "сука", "жопа", "щель", "залупа",
+    "мудак", "говно", "проститутка", "шлюха", "дрочить", "ёб", "лох"
+]
+
+ALLOWED = ["херсон", "херувим", "оскорблять", "страхуй", "плох", "блох", "переполох"]
+
+
+def adversarial_cases(rnd):
+    """Набор строк, провоцирующих возвраты и рост числа состояний"""
+    tokens = [v for variants in Config.CHAR_REPLACEMENTS.values() for v in variants if v]
+    separators = [' ', '-', '_', '.', ' ', '\t']
+
+    yield 'а' * MAX_LENGTH
+    yield 'y' * MAX_LENGTH
+    yield '-' * MAX_LENGTH
+    yield ('с' + '-' * 8) * (MAX_LENGTH // 9)
+    yield 'shch' * (MAX_LENGTH // 4)
+    yield 'z*' * (MAX_LENGTH // 2)
+    yield ('п' * 50 + 'и' * 50 + 'з' * 50 + 'д' * 50) * (MAX_LENGTH // 200)
+    yield ''.join(rnd.choice('yiuc') for _ in range(MAX_LENGTH))
+
+    # Почти совпадения: слово без последней буквы через разделители
+    for word in WORDS:
+        stem = ' '.join(word[:-1] * 3)
+        yield (stem + ' ') * (MAX_LENGTH // (len(stem) + 1))
+
+    while True:
+        parts = []
+        size = 0
+        while size < MAX_LENGTH:
+            part = rnd.choice(tokens) * rnd.randint(1, 30)
+            if rnd.random() < 0.5:
+                part += rnd.choice(separators) * rnd.randint(1, 10)
+            parts.append(part)
+            size += len(part)
+        yield ''.join(parts)[:MAX_LENGTH]
+
+
+def check_latency(iterations, threshold) -> bool:
+    """Худшая задержка на маленьком словаре"""
+    word_filter.base_words = list(WORDS)
+    word_filter.generate_patterns()
+
+    rnd = random.Random(1)
+    worst = 0.0
+    worst_text = ''
+
+    for _, text in zip(range(iterations), adversarial_cases(rnd)):
+        started = time.perf_counter()
+        word_filter.check_message(text)
+        elapsed = (time.perf_counter() - started) * 1000
+        if elapsed > worst:
+            worst, worst_text = elapsed, text
+
+    print(f"Строк: {iterations}, худшая задержка: {worst:.2f} мс (порог {threshold:.2f} мс)")
+    print(f"Худший вход: {worst_text[:60]!r}...")
+
+    if worst > threshold:
+        print("❌ Порог превышен")
+        return False
+    print("✅ В пределах порога")
+    return True
+
+
+def check_padding(iterations) -> bool:
+    """Запрещенное слово после подкладки на большом словаре"""
+    word_filter.base_words = make_words(LARGE_DICTIONARY) + WORDS
+    word_filter.allowed_words = list(ALLOWED)
+    word_filter.generate_patterns()
+    word_filter.stats.reset()
+
+    rnd = random.Random(2)
+    missed = []
+    for i, padding in zip(range(iterations), adversarial_cases(rnd)):
+        word = WORDS[i % len(WORDS)]
+        text = padding[:MAX_LENGTH - len(word) - 1] + ' ' + word
+        if not word_filter.check_message(text)[0]:
+            missed.append(text)
+
+    timeouts = word_filter.stats.timeouts
+    print(f"Словарь {len(word_filter.base_words)} слов, строк с подкладкой: {iterations}, "
+          f"пропущено: {len(missed)}, прерываний: {timeouts}")
+    for text in missed[:3]:
+        print(f"  пропуск: {text[:40]!r}...{text[-20:]!r}")
+
+    if missed or timeouts:
+        print("❌ Подкладка скрывает слово или исчерпывает время")
+        return False
+    print("✅ Слово найдено во всех строках")
+    return True
+
+
+def main():
+    threshold = float(sys.argv[1]) if len(sys.argv) > 1 else Config.FILTER_TIME_BUDGET * 1000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    # Вердикты одинаковых строк не берем из кеша
+    word_filter.verdict_cache.max_entries = 0
+    latency_ok = check_latency(iterations, threshold)
+    padding_ok = check_padding(iterations)
+    if not (latency_ok and padding_ok):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
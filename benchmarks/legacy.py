@@ -0,0 +1,187 @@
+"""
+Эталонные реализации старого фильтра на регулярных выражениях и
+старого слоя SQLite.
+
+Используются только в бенчмарках для сравнения с текущим кодом.
+"""
+import re
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from config import Config
+
+
+class LegacyWordFilter:
+    """Фильтр в том виде, в котором он был до перехода на автомат"""
+
+    def __init__(self, words: List[str]):
+        self.base_words = list(words)
+        self.patterns = []
+        self.generate_patterns()
+
+    def generate_patterns(self):
+        self.patterns = []
+
+        for word in self.base_words:
+            pattern_parts = []
+            for char in word:
+                if char in Config.CHAR_REPLACEMENTS:
+                    escaped = [re.escape(r) for r in Config.CHAR_REPLACEMENTS[char]]
+                    pattern_parts.append(f'[{"".join(escaped)}]')
+                else:
+                    pattern_parts.append(re.escape(char))
+
+            final_pattern = ''
+            for part in pattern_parts:
+                final_pattern += f'{part}+[\\s\\-_\\.]*'
+
+            self.patterns.append(final_pattern.rstrip(r'[\s\-_\.]*'))
+
+    def check_message(self, text: str) -> Tuple[bool, str, str]:
+        text_lower = text.lower()
+
+        for i, pattern in enumerate(self.patterns):
+            if re.search(pattern, text_lower, re.IGNORECASE):
+                return True, self.base_words[i], "pattern_match"
+
+        text_no_spaces = re.sub(r'[\s\-_\.]', '', text_lower)
+        for word in self.base_words:
+            if len(word) > 3 and word in text_no_spaces:
+                return True, word, "no_spaces"
+
+        translit = {'a': 'а', 'b': 'в', 'c': 'с', 'e': 'е', 'k': 'к', 'm': 'м',
+                    'o': 'о', 'p': 'р', 't': 'т', 'x': 'х', 'y': 'у'}
+        variants = [text_lower]
+        for eng, rus in translit.items():
+            variant = text_lower.replace(eng, rus)
+            if variant != text_lower:
+                variants.append(variant)
+        for variant in variants:
+            for word in self.base_words:
+                if word in variant:
+                    return True, word, "translit"
+
+        spaced_text = ' '.join(text_lower)
+        for word in self.base_words:
+            if ' '.join(word) in spaced_text:
+                return True, word, "spaced"
+
+        return False, "", ""
+
+
+class LegacyUtilsFilter:
+    """
+    Проверка из старого utils.py (check_text_for_bad_words) со своим словарем
+
+    Повторяет старый модуль один в один, но принимает список слов,
+    чтобы сравнивать движки на словарях одного размера.
+    """
+
+    def __init__(self, words: List[str]):
+        self.base_words = list(words)
+
+        self.bad_words = []
+        for base_word in self.base_words:
+            self.bad_words.extend(self.generate_word_variants(base_word))
+
+        self.extended_patterns = []
+        for base_word in self.base_words:
+            pattern = ''
+            for char in base_word:
+                if char in Config.CHAR_REPLACEMENTS:
+                    possible_chars = Config.CHAR_REPLACEMENTS[char]
+                    pattern += f'[{"".join(possible_chars)}]'
+                else:
+                    pattern += char
+                pattern += r'[\s\-_\.]*'
+
+            self.extended_patterns.append(pattern[:-len(r'[\s\-_\.]*')])
+
+    @staticmethod
+    def generate_word_variants(word: str) -> List[str]:
+        variants = {word}
+
+        for rus_char, eng_chars in Config.CHAR_REPLACEMENTS.items():
+            if rus_char in word:
+                for eng_char in eng_chars:
+                    variants.add(word.replace(rus_char, eng_char))
+
+        for i in range(len(word)):
+            if word[i] in Config.CHAR_REPLACEMENTS:
+                for replacement in Config.CHAR_REPLACEMENTS[word[i]]:
+                    variants.add(word[:i] + replacement + word[i + 1:])
+
+        return list(variants)
+
+    def check_message(self, text: str) -> Tuple[bool, str, str]:
+        text_lower = text.lower()
+
+        for word in self.bad_words:
+            if word in text_lower:
+                return True, word, "pattern_match"
+
+        for i, pattern in enumerate(self.extended_patterns):
+            if re.search(pattern, text_lower, re.IGNORECASE):
+                return True, self.base_words[i], "spaced"
+
+        text_without_spaces = re.sub(r'[\s\-_\.]', '', text_lower)
+        for word in self.bad_words:
+            if len(word) > 3 and word in text_without_spaces:
+                return True, word, "no_spaces"
+
+        for base_word in self.base_words:
+            if len(base_word) > 3:
+                pattern = ''.join(f'{re.escape(char)}+' for char in base_word)
+                match = re.search(pattern, text_lower, re.IGNORECASE)
+                if match and abs(len(match.group()) - len(base_word)) <= 3:
+                    return True, base_word, "repeats"
+
+        return False, "", ""
+
+
+class LegacyDatabase:
+    """
+    Database до пула соединений: одно соединение на все потоки без
+    блокировки, журнал по умолчанию (rollback) и synchronous = FULL
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+
+    def get_user(self, user_id):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
+        return cursor.fetchone()
+
+    def add_user(self, user_id, username, first_name, last_name):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT OR IGNORE INTO users
+            (user_id, username, first_name, last_name, join_date, last_activity)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, username, first_name, last_name, datetime.now(), datetime.now()))
+        self.conn.commit()
+
+    def update_warnings(self, user_id, warnings):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            UPDATE users SET warnings = ?, last_activity = ? WHERE user_id = ?
+        ''', (warnings, datetime.now(), user_id))
+        self.conn.commit()
+
+    def add_moderation_log(self, user_id, chat_id, action, reason, message_text):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT INTO moderation_logs
+            (user_id, chat_id, action, reason, message_text, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, chat_id, action, reason, message_text, datetime.now()))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
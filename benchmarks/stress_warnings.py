@@ -0,0 +1,80 @@
+"""
+Нагрузочная проверка счетчика предупреждений: код 1, если прибавки потеряны.
+
+Запуск: python benchmarks/stress_warnings.py [потоков] [прибавок на поток]
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from common import isolate_database
+
+TEMP_DIR = isolate_database()
+
+from database import Database
+
+USER_ID = 42
+
+
+def read_modify_write(database):
+    user = database.get_user(USER_ID)
+    database.update_warnings(USER_ID, (user[4] if user else 0) + 1)
+    return None
+
+
+def hammer(database, increment, threads, per_thread):
+    returned = []
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        barrier.wait()
+        values = [increment(database) for _ in range(per_thread)]
+        returned.extend(value for value in values if value is not None)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    database.flush()
+    elapsed = time.perf_counter() - started
+
+    database.users.clear()
+    return database.get_user(USER_ID)[4], returned, elapsed
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    expected = threads * per_thread
+    methods = {
+        'get+update': read_modify_write,
+        'increment': lambda database: database.increment_warnings(USER_ID),
+    }
+
+    print(f"Потоков: {threads}, прибавок: {expected}")
+    print(f"{'способ':<11} {'итог':>7} {'потеряно':>9} {'прибавок/с':>11} {'повторы':>8}")
+    failed = False
+    for name, increment in methods.items():
+        database = Database(TEMP_DIR / f'{name}.db')
+        database.add_user(USER_ID, 'target', 'Имя', None)
+        database.flush()
+        total, returned, elapsed = hammer(database, increment, threads, per_thread)
+        database.close()
+
+        duplicates = len(returned) - len(set(returned)) if returned else '-'
+        print(f"{name:<11} {total:>7} {expected - total:>9} {expected / elapsed:>11.0f} {duplicates:>8}")
+        if name == 'increment' and (total != expected or sorted(returned) != list(range(1, expected + 1))):
+            failed = True
+
+    if failed:
+        print("increment_warnings потерял прибавки")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,7 @@ sys.path.insert(0, str(Path(__file__).parent / 'src'))
 from telebot import TeleBot
 from config import Config
 from database import db
+from filters import word_filter
 from handlers import MessageHandler
 
 # Настройка логирования
@@ -50,6 +51,9 @@ def main():
     # Инициализируем обработчики
     handler = MessageHandler(bot)
 
+    # Следим за изменениями словаря без перезапуска
+    word_filter.start_watcher()
+
     logger.info("=" * 60)
     logger.info("🤖 Умный бот-модератор запускается...")
     logger.info(f"⚙️  База данных: {Config.DB_PATH}")
@@ -65,6 +69,8 @@ def main():
         raise
 
     finally:
+        word_filter.stop_watcher()
+
         # Закрываем соединение с БД
         db.close()
         logger.info("📴 Бот остановлен")
@@ -12,6 +12,23 @@ class Config:
 
     # Настройки базы данных
     DB_PATH = Path(__file__).parent.parent / 'data' / 'users_data.db'
+    # WAL: чтение не блокируется записью; при NORMAL fsync делается на
+    # контрольных точках, а не на каждом коммите (сбой питания может
+    # откатить последние коммиты, но не повредить базу)
+    DB_JOURNAL_MODE = 'WAL'
+    DB_SYNCHRONOUS = 'NORMAL'
+    DB_BUSY_TIMEOUT = 5.0  # Секунд ожидания занятой базы
+    # Фоновая запись: пользователи, предупреждения и лог модерации
+    # коммитятся группами. При сбое процесса теряется не больше
+    # DB_COMMIT_INTERVAL секунд записей; False - писать сразу
+    DB_WRITE_BEHIND = True
+    DB_COMMIT_BATCH = 500  # Запросов в одной транзакции
+    DB_COMMIT_INTERVAL = 0.05  # Секунд ожидания группы после первого запроса
+    DB_WRITE_QUEUE = 10000  # Запросов в очереди, дальше запись ждет диск
+    USER_CACHE_SIZE = 50000  # Пользователей в кеше предупреждений и наказаний
+    # Только чтение: без миграций и фоновой записи (процессы
+    # tools/scan_corpus.py, которые не должны менять базу бота)
+    DB_READ_ONLY = False
 
     # Настройки модерации
     MAX_WARNINGS = 5
@@ -23,10 +40,64 @@ class Config:
         5: 86400  # Пятое - бан на сутки
     }
 
+    # Ограничения проверки сообщения
+    FILTER_TIME_BUDGET = 0.05  # Секунд на одно сообщение
+    FILTER_MAX_STATES = 1000  # Активных состояний автомата на символ
+
+    # Словари языков: основной - banned_words, остальные - раздел languages
+    # в banned_words.json. Для каждого языка указаны алфавиты сообщений,
+    # на которых проверяется его словарь (latin - и любые другие буквы).
+    # Русский проверяется и на латинице: транслит ("suka", "xyй")
+    DEFAULT_LANGUAGE = 'ru'
+    LANGUAGE_SCRIPTS = {
+        'ru': ('cyrillic', 'latin'),
+        'uk': ('cyrillic',),
+        'en': ('latin',),
+    }
+
+    # Словари чатов (/addword): автоматы загружаются при первом сообщении
+    # чата и выгружаются, если чат молчит дольше CHAT_OVERLAY_IDLE секунд
+    CHAT_OVERLAY_MAX = 10000
+    CHAT_OVERLAY_IDLE = 3600
+
+    # Поиск словоформ по основам слов (стеммер)
+    FILTER_STEMS = True
+    STEM_MIN_LENGTH = 3  # Более короткие основы дают ложные срабатывания
+    # Основа короче сама часто обычное слово ("сук" от "сука"): по ней
+    # засчитываются только слова сообщения не короче слова словаря
+    STEM_SHORT_LENGTH = 4
+    # Обычные слова с той же короткой основой, что у слова словаря
+    # ("суков" - от "сук", как и "сука"): по основе не засчитываются
+    STEM_COMMON_WORDS = ('суков', 'суком')
+    STEM_CACHE_SIZE = 65536  # Основ слов сообщений в памяти
+
+    # Поиск слов с опечатками; включается командой /fuzzy для каждого чата
+    FUZZY_DEFAULT = False  # Для чатов без настройки
+    FUZZY_MIN_LENGTH = 5  # Более короткие слова не ищутся с опечатками
+    FUZZY_LONG_LENGTH = 8  # С этой длины допускаются две правки вместо одной
+    FUZZY_CACHE_SIZE = 65536  # Проверенных слов сообщений в памяти
+
+    # Доля проверок, для которых замеряется время этапов (0 - не замерять)
+    FILTER_STATS_SAMPLE_RATE = 0.01
+
+    # Кеш вердиктов для повторяющихся сообщений
+    VERDICT_CACHE_ENTRIES = 10000
+    VERDICT_CACHE_BYTES = 4 * 1024 * 1024
+
+    # Интервал проверки изменений banned_words.json (секунд)
+    WORDS_RELOAD_INTERVAL = 5
+
     # Пути к файлам
     BANNED_WORDS_FILE = Path(__file__).parent.parent / 'data' / 'banned_words.json'
+    MATCHER_CACHE_FILE = Path(__file__).parent.parent / 'data' / 'banned_words.matcher'
+    # Похожие символы Unicode и невидимые знаки (tools/build_confusables.py)
+    CONFUSABLES_FILE = Path(__file__).parent.parent / 'data' / 'confusables.json'
     LOGS_DIR = Path(__file__).parent.parent / 'data' / 'logs'
 
+    # Отображать скомпилированный словарь в память (mmap), чтобы несколько
+    # процессов бота делили одну физическую копию
+    MATCHER_SHARED = True
+
     # Настройки логирования
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
@@ -42,7 +113,7 @@ class Config:
         'ж': ['ж', 'zh', 'z*'],
         'з': ['з', 'z', '3'],
         'и': ['и', 'i', 'u'],
-        'й': ['й', 'j', 'y', 'i'],
+        'й': ['й', 'j', 'y', 'i', 'и'],
         'к': ['к', 'k'],
         'л': ['л', 'l'],
         'м': ['м', 'm'],
@@ -1,79 +1,361 @@
+import atexit
+import os
+import queue
 import sqlite3
 import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
 from config import Config
+from migrations import SCHEMA_VERSION, migrate
 
 logger = logging.getLogger(__name__)
 
+# UPDATE ... RETURNING появился в SQLite 3.35
+RETURNING_SUPPORTED = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+class WriteBehind:
+    """Фоновая запись: группа до batch_size запросов или interval секунд коммитится одной транзакцией"""
+
+    STOP = object()
+
+    def __init__(self, database, batch_size: int, interval: float, max_pending: int):
+        self.database = database
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue = queue.Queue(max_pending)
+        self.commits = 0
+        self.written = 0
+        self.thread = threading.Thread(target=self.run, name='db-writer', daemon=True)
+        self.thread.start()
+        # Поток фоновый: без остановки при выходе хвост очереди потеряется
+        atexit.register(self.stop)
+
+    def put(self, sql: str, params: tuple, done=None):
+        """Поставить запрос в очередь (ждет, если она полна); done() вызывается после коммита"""
+        self.queue.put((sql, params, done))
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            job = self.queue.get()
+            if job is self.STOP:
+                self.queue.task_done()
+                break
+
+            batch = [job]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    job = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if job is self.STOP:
+                    self.queue.task_done()
+                    stopping = True
+                    break
+                batch.append(job)
+
+            self.commit(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    def commit(self, batch: list):
+        try:
+            with self.database.transaction() as cursor:
+                for sql, params, _ in batch:
+                    cursor.execute(sql, params)
+        except sqlite3.Error as e:
+            # Группа откатилась: повторяем по одному, чтобы ошибка одного
+            # запроса не потеряла остальные
+            logger.error(f"Ошибка группового коммита ({len(batch)} запросов): {e}")
+            for sql, params, _ in batch:
+                try:
+                    with self.database.transaction() as cursor:
+                        cursor.execute(sql, params)
+                except sqlite3.Error as e:
+                    logger.error(f"Запрос не записан: {e}")
+        self.commits += 1
+        self.written += len(batch)
+
+        for _, _, done in batch:
+            if done is not None:
+                done()
+
+    def flush(self):
+        """Дождаться записи всего, что уже в очереди"""
+        if self.thread.is_alive():
+            self.queue.join()
+
+    def stop(self):
+        """Записать очередь и остановить поток"""
+        if self.thread.is_alive():
+            self.queue.put(self.STOP)
+            self.thread.join()
+
+    def get_stats(self) -> dict:
+        return {
+            'pending': self.queue.qsize(),
+            'commits': self.commits,
+            'written': self.written,
+        }
+
+
+class UserState:
+    """Горячее состояние пользователя для лестницы наказаний"""
+
+    __slots__ = ('warnings', 'muted_until', 'is_banned')
+
+    def __init__(self, warnings: int = 0, muted_until: int = 0, is_banned: bool = False):
+        self.warnings = warnings
+        self.muted_until = muted_until
+        self.is_banned = is_banned
+
+
+class UserCache:
+    """LRU-кеш состояния пользователей (запись сквозная, через Database)"""
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self.entries = OrderedDict()  # user_id -> UserState
+        self.loading = {}  # user_id -> [обновления, пришедшие во время загрузки, ...]
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, user_id: int, load) -> UserState:
+        with self.lock:
+            state = self.entries.get(user_id)
+            if state is not None:
+                self.hits += 1
+                self.entries.move_to_end(user_id)
+                return state
+
+            self.misses += 1
+            updates = {}
+            self.loading.setdefault(user_id, []).append(updates)
+
+        # БД читаем без блокировки кеша; update() тем временем пишет в updates
+        try:
+            state = load(user_id)
+        except BaseException:
+            with self.lock:
+                self.loaded(user_id, updates)
+            raise
+
+        with self.lock:
+            self.loaded(user_id, updates)
+            # Пока читали, пользователя мог положить другой поток
+            cached = self.entries.get(user_id)
+            if cached is not None:
+                self.entries.move_to_end(user_id)
+                return cached
+            for name, value in updates.items():
+                setattr(state, name, value)
+            self.entries[user_id] = state
+            self.trim()
+            return state
+
+    def loaded(self, user_id: int, updates: dict):
+        """Загрузка закончилась: обновления для нее больше не копим"""
+        waiting = self.loading[user_id]
+        waiting[:] = [values for values in waiting if values is not updates]
+        if not waiting:
+            del self.loading[user_id]
+
+    def seed(self, user_id: int, state: UserState):
+        """Положить состояние, только что прочитанное при записи"""
+        with self.lock:
+            cached = self.entries.get(user_id)
+            if cached is not None:
+                # Мут и бан в кеше могут быть новее БД: их запись еще в очереди
+                cached.warnings = state.warnings
+                self.entries.move_to_end(user_id)
+                return
+            self.entries[user_id] = state
+            self.trim()
+
+    def trim(self):
+        while len(self.entries) > self.max_users:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def update(self, user_id: int, **values):
+        """Обновить закешированное состояние; незагруженное не трогаем"""
+        with self.lock:
+            state = self.entries.get(user_id)
+            if state is not None:
+                for name, value in values.items():
+                    setattr(state, name, value)
+            for updates in self.loading.get(user_id, ()):
+                updates.update(values)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'users': len(self.entries),
+                'max_users': self.max_users,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
 
 class Database:
-    def __init__(self):
+    """Хранилище бота в SQLite: одно соединение пишет под блокировкой, читатели у каждого потока свои"""
+
+    def __init__(self, path=None, read_only=None):
+        self.path = path or Config.DB_PATH
+        self.read_only = Config.DB_READ_ONLY if read_only is None else read_only
         self.conn = None
+        self.write_lock = threading.RLock()
+        self.local = threading.local()
+        self.readers = []  # потоков обработчиков у telebot фиксированное число
+        self.readers_lock = threading.Lock()
+        # user_id -> [предупреждений, запросов в очереди, Event "очередь дописана"]
+        self.pending_warnings = {}
+        self.users = UserCache(Config.USER_CACHE_SIZE)
+        self.writer = None
+        if self.read_only:
+            self.check_schema()
+            return
+
         self.init_db()
+        if Config.DB_WRITE_BEHIND:
+            self.writer = WriteBehind(
+                self, Config.DB_COMMIT_BATCH, Config.DB_COMMIT_INTERVAL, Config.DB_WRITE_QUEUE
+            )
+
+    def connect(self):
+        """Новое соединение с настройками журнала и ожидания блокировок"""
+        if self.read_only:
+            if not os.path.exists(self.path):
+                conn = sqlite3.connect(':memory:', check_same_thread=False)
+                migrate(conn)
+                return conn
+            uri = f'{Path(self.path).resolve().as_uri()}?mode=ro'
+            return sqlite3.connect(uri, uri=True, timeout=Config.DB_BUSY_TIMEOUT, check_same_thread=False)
+
+        # timeout - это busy_timeout SQLite: сколько ждать чужую блокировку
+        conn = sqlite3.connect(self.path, timeout=Config.DB_BUSY_TIMEOUT, check_same_thread=False)
+        conn.execute(f'PRAGMA synchronous = {Config.DB_SYNCHRONOUS}')
+        return conn
+
+    def check_schema(self):
+        """Предупредить, если базу только читаем, а схема не та"""
+        if not os.path.exists(self.path):
+            logger.warning(f"База {self.path} не найдена, читается пустая схема")
+            return
+        try:
+            version = self.reader().execute('PRAGMA user_version').fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка чтения базы {self.path}: {e}")
+            return
+        if version != SCHEMA_VERSION:
+            logger.warning(f"Схема базы {self.path} версии {version}, код ждет {SCHEMA_VERSION}: "
+                           f"запустите бота, чтобы применить миграции")
+
+    def reader(self):
+        """Соединение для чтения, свое у каждого потока"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.connect()
+            conn.execute('PRAGMA query_only = ON')
+            self.local.conn = conn
+            # Не write_lock: первое чтение потока не ждет чужую запись
+            with self.readers_lock:
+                self.readers.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Запись под блокировкой: коммит в конце или откат при ошибке"""
+        if self.read_only:
+            raise sqlite3.OperationalError("База открыта только для чтения")
+        with self.write_lock:
+            cursor = self.conn.cursor()
+            try:
+                yield cursor
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+            finally:
+                # Незакрытый курсор держит запрос и не дает закрыть базу
+                cursor.close()
+
+    def write(self, sql: str, params: tuple, done=None):
+        """Запись через очередь или сразу, если фоновая запись выключена"""
+        if self.writer is not None:
+            self.writer.put(sql, params, done)
+            return
+
+        with self.transaction() as cursor:
+            cursor.execute(sql, params)
+        if done is not None:
+            done()
+
+    def flush(self):
+        """Дождаться записи очереди на диск"""
+        if self.writer is not None:
+            self.writer.flush()
 
     def init_db(self):
         """Инициализация базы данных"""
         try:
-            self.conn = sqlite3.connect(Config.DB_PATH, check_same_thread=False)
-            cursor = self.conn.cursor()
+            self.conn = self.connect()
+            mode = self.conn.execute(f'PRAGMA journal_mode = {Config.DB_JOURNAL_MODE}').fetchone()[0]
+            if mode.lower() != Config.DB_JOURNAL_MODE.lower():
+                logger.warning(f"Режим журнала {Config.DB_JOURNAL_MODE} недоступен, используется {mode}")
 
-            # Таблица пользователей
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id INTEGER PRIMARY KEY,
-                    username TEXT,
-                    first_name TEXT,
-                    last_name TEXT,
-                    warnings INTEGER DEFAULT 0,
-                    muted_until INTEGER DEFAULT 0,
-                    is_banned BOOLEAN DEFAULT FALSE,
-                    join_date TIMESTAMP,
-                    last_activity TIMESTAMP
-                )
-            ''')
-
-            # Таблица логов модерации
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS moderation_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    chat_id INTEGER,
-                    action TEXT,
-                    reason TEXT,
-                    message_text TEXT,
-                    timestamp TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-
-            # Таблица кастомных слов
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS custom_words (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    word TEXT UNIQUE,
-                    added_by INTEGER,
-                    added_at TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE
-                )
-            ''')
-
-            self.conn.commit()
-            logger.info("База данных инициализирована")
+            # Таблицы и индексы создаются миграциями по PRAGMA user_version
+            version = migrate(self.conn)
+            logger.info(f"База данных инициализирована (схема версии {version})")
 
         except Exception as e:
             logger.error(f"Ошибка инициализации БД: {e}")
 
     def get_user(self, user_id):
         """Получить информацию о пользователе"""
-        cursor = self.conn.cursor()
+        cursor = self.reader().cursor()
         cursor.execute('''
             SELECT * FROM users WHERE user_id = ?
         ''', (user_id,))
-        return cursor.fetchone()
+        user = cursor.fetchone()
+
+        # Предупреждения, которые еще ждут в очереди записи
+        pending = self.pending_warnings.get(user_id)
+        if user is not None and pending is not None:
+            user = user[:4] + (pending[0],) + user[5:]
+        return user
+
+    def load_user_state(self, user_id):
+        user = self.get_user(user_id)
+        if user is None:
+            return UserState()
+        return UserState(user[4] or 0, user[5] or 0, bool(user[6]))
+
+    def get_user_state(self, user_id):
+        """Предупреждения, мут и бан пользователя (из кеша, при промахе - из БД)"""
+        return self.users.get(user_id, self.load_user_state)
 
     def get_user_by_username(self, username):
         """Получить информацию о пользователе по username"""
-        cursor = self.conn.cursor()
+        cursor = self.reader().cursor()
         cursor.execute('''
             SELECT * FROM users WHERE username = ?
         ''', (username,))
@@ -81,38 +363,99 @@ class Database:
 
     def add_user(self, user_id, username, first_name, last_name):
         """Добавить нового пользователя"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
+        self.write('''
             INSERT OR IGNORE INTO users 
             (user_id, username, first_name, last_name, join_date, last_activity)
             VALUES (?, ?, ?, ?, ?, ?)
         ''', (user_id, username, first_name, last_name,
               datetime.now(), datetime.now()))
-        self.conn.commit()
 
     def update_warnings(self, user_id, warnings):
         """Обновить количество предупреждений"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
+        with self.write_lock:
+            pending = self.pending_warnings.setdefault(user_id, [warnings, 0, threading.Event()])
+            pending[0] = warnings
+            pending[1] += 1
+            self.users.update(user_id, warnings=warnings)
+
+        def done():
+            with self.write_lock:
+                pending[1] -= 1
+                if pending[1] == 0:
+                    del self.pending_warnings[user_id]
+                    pending[2].set()
+
+        self.write('''
             UPDATE users 
             SET warnings = ?, last_activity = ?
             WHERE user_id = ?
-        ''', (warnings, datetime.now(), user_id))
-        self.conn.commit()
+        ''', (warnings, datetime.now(), user_id), done)
+
+    def wait_warnings(self, user_id):
+        """Дождаться записи предупреждений пользователя, ждущих в очереди"""
+        while self.writer is not None and self.writer.thread.is_alive():
+            with self.write_lock:
+                pending = self.pending_warnings.get(user_id)
+            if pending is None:
+                return
+            # С таймаутом: остановленный поток очередь уже не дописывает
+            pending[2].wait(1.0)
+
+    def increment_warnings(self, user_id, username=None, first_name=None, last_name=None):
+        """Атомарно добавить предупреждение и вернуть новое количество"""
+        # Мимо очереди: ждем только ее записи предупреждений этого пользователя
+        self.wait_warnings(user_id)
+
+        now = datetime.now()
+        upsert = '''
+            INSERT INTO users (user_id, username, first_name, last_name, warnings, join_date, last_activity)
+            VALUES (?, ?, ?, ?, 1, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                warnings = warnings + 1, last_activity = excluded.last_activity
+        '''
+        params = (user_id, username, first_name, last_name, now, now)
+        # Кеш обновляется под той же блокировкой, что и коммит, - в порядке
+        # коммитов, и более старый счетчик не перетрет новый
+        with self.write_lock:
+            with self.transaction() as cursor:
+                if RETURNING_SUPPORTED:
+                    cursor.execute(upsert + ' RETURNING warnings, muted_until, is_banned', params)
+                else:
+                    # Старый SQLite: чтение в той же транзакции под блокировкой писателя
+                    cursor.execute(upsert, params)
+                    cursor.execute('SELECT warnings, muted_until, is_banned FROM users WHERE user_id = ?',
+                                   (user_id,))
+                warnings, muted_until, is_banned = cursor.fetchone()
+            self.users.seed(user_id, UserState(warnings, muted_until or 0, bool(is_banned)))
+        return warnings
+
+    def update_punishment(self, user_id, muted_until=None, is_banned=None):
+        """Записать мут (время окончания, 0 - снят) и/или бан пользователя"""
+        values = {}
+        if muted_until is not None:
+            values['muted_until'] = muted_until
+        if is_banned is not None:
+            values['is_banned'] = is_banned
+        if not values:
+            return
+
+        self.users.update(user_id, **values)
+        assignments = ', '.join(f'{name} = ?' for name in values)
+        self.write(f'''
+            UPDATE users SET {assignments}, last_activity = ? WHERE user_id = ?
+        ''', (*values.values(), datetime.now(), user_id))
 
     def add_moderation_log(self, user_id, chat_id, action, reason, message_text):
         """Добавить запись в лог модерации"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
+        self.write('''
             INSERT INTO moderation_logs 
             (user_id, chat_id, action, reason, message_text, timestamp)
             VALUES (?, ?, ?, ?, ?, ?)
         ''', (user_id, chat_id, action, reason, message_text, datetime.now()))
-        self.conn.commit()
 
     def get_moderation_stats(self):
         """Получить статистику модерации"""
-        cursor = self.conn.cursor()
+        cursor = self.reader().cursor()
         cursor.execute('SELECT COUNT(*) FROM moderation_logs')
         total_actions = cursor.fetchone()[0]
 
@@ -128,29 +471,81 @@ class Database:
             'custom_words': custom_words
         }
 
-    def add_custom_word(self, word, added_by):
-        """Добавить кастомное запрещенное слово"""
-        cursor = self.conn.cursor()
-        try:
+    def get_user_logs(self, user_id, limit=5):
+        """Последние действия модерации с пользователем"""
+        cursor = self.reader().cursor()
+        cursor.execute('''
+            SELECT action, reason, chat_id, timestamp FROM moderation_logs
+            WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?
+        ''', (user_id, limit))
+        return cursor.fetchall()
+
+    def count_chat_actions(self, chat_id, since):
+        """Число действий модерации в чате начиная с момента since"""
+        cursor = self.reader().cursor()
+        cursor.execute('''
+            SELECT COUNT(*) FROM moderation_logs WHERE chat_id = ? AND timestamp >= ?
+        ''', (chat_id, since))
+        return cursor.fetchone()[0]
+
+    def add_custom_word(self, word, added_by, chat_id=0):
+        """Добавить кастомное запрещенное слово (chat_id = 0 - для всех чатов)"""
+        with self.transaction() as cursor:
+            try:
+                cursor.execute('''
+                    INSERT INTO custom_words (word, chat_id, added_by, added_at)
+                    VALUES (?, ?, ?, ?)
+                ''', (word, chat_id, added_by, datetime.now()))
+                return True
+            except sqlite3.IntegrityError:
+                # Слово уже было и могло быть отключено через /delword
+                cursor.execute('''
+                    UPDATE custom_words SET is_active = TRUE, added_by = ?, added_at = ?
+                    WHERE word = ? AND chat_id = ? AND is_active = FALSE
+                ''', (added_by, datetime.now(), word, chat_id))
+                return cursor.rowcount > 0
+
+    def remove_custom_word(self, word, chat_id=0):
+        """Отключить кастомное запрещенное слово"""
+        with self.transaction() as cursor:
             cursor.execute('''
-                INSERT INTO custom_words (word, added_by, added_at)
-                VALUES (?, ?, ?)
-            ''', (word, added_by, datetime.now()))
-            self.conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
-
-    def get_custom_words(self):
-        """Получить все кастомные слова"""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT word FROM custom_words WHERE is_active = 1')
+                UPDATE custom_words SET is_active = FALSE
+                WHERE word = ? AND chat_id = ? AND is_active = TRUE
+            ''', (word, chat_id))
+            return cursor.rowcount > 0
+
+    def get_custom_words(self, chat_id=0):
+        """Получить кастомные слова чата (chat_id = 0 - общие)"""
+        cursor = self.reader().cursor()
+        cursor.execute('SELECT word FROM custom_words WHERE chat_id = ? AND is_active = 1', (chat_id,))
         return [row[0] for row in cursor.fetchall()]
 
+    def set_fuzzy_matching(self, chat_id, enabled):
+        """Включить или отключить поиск с опечатками в чате"""
+        with self.transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO chat_settings (chat_id, fuzzy_matching) VALUES (?, ?)
+                ON CONFLICT(chat_id) DO UPDATE SET fuzzy_matching = excluded.fuzzy_matching
+            ''', (chat_id, enabled))
+
+    def get_fuzzy_matching(self):
+        """Настройки поиска с опечатками: chat_id -> включен ли"""
+        cursor = self.reader().cursor()
+        cursor.execute('SELECT chat_id, fuzzy_matching FROM chat_settings WHERE fuzzy_matching IS NOT NULL')
+        return {chat_id: bool(enabled) for chat_id, enabled in cursor.fetchall()}
+
     def close(self):
-        """Закрыть соединение с БД"""
-        if self.conn:
-            self.conn.close()
+        """Записать очередь и закрыть соединения с БД"""
+        if self.writer is not None:
+            self.writer.stop()
+            self.writer = None
+        with self.write_lock, self.readers_lock:
+            for conn in self.readers:
+                conn.close()
+            self.readers = []
+            self.local = threading.local()
+            if self.conn:
+                self.conn.close()
 
 
 # Глобальный экземпляр БД
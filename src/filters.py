@@ -1,43 +1,573 @@
-import re
+import hashlib
 import json
 import logging
-from typing import List, Tuple
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from itertools import combinations, islice
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
 from config import Config
 from database import db
+from fuzzy import FuzzyIndex
+from matcher import FORMAT_VERSION, TimeBudgetExceeded, TokenTables, WordMatcher
+from normalizer import BATCH_SEPARATOR, SCRIPTS, NormalizedText, TextNormalizer, load_confusables
+from stemmer import stem
 
 logger = logging.getLogger(__name__)
 
 
+class VerdictCache:
+    """
+    LRU-кеш вердиктов по хешу нормализованного текста
+
+    Хранится найденный фрагмент (начало, конец, слово) или пустой кортеж.
+    Тип нарушения зависит от разделителей в исходном тексте, поэтому он
+    вычисляется для каждого сообщения заново.
+
+    Запись действительна только для того поколения словаря, при котором
+    она сделана, и для того же набора языков. Размер ограничен числом
+    записей и примерным объемом.
+    """
+
+    # Примерные накладные расходы на запись: узел OrderedDict, кортежи
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # ключ -> (поколение, вердикт, размер)
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(normalized_text: str, route: str = '') -> bytes:
+        """Ключ записи; route - языки, словарями которых проверялся текст"""
+        data = f'{route}\0{normalized_text}'.encode('utf-8')
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def get(self, key: bytes, generation: int) -> Optional[tuple]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != generation:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: bytes, generation: int, verdict: tuple):
+        if self.max_entries <= 0:
+            return
+
+        size = self.ENTRY_OVERHEAD + sys.getsizeof(key) + sum(map(sys.getsizeof, verdict))
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size_bytes -= old[2]
+
+            self.entries[key] = (generation, verdict, size)
+            self.size_bytes += size
+
+            while self.entries and (len(self.entries) > self.max_entries
+                                    or self.size_bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.size_bytes -= evicted_size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size_bytes = 0
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+class AllowBoundaries:
+    """
+    Проверки совпадения по исходному тексту
+
+    Исключение не перекрывает запрещенное слово, если то отделено
+    разделителем внутри исключения: "херсон" да, "хер сон" нет.
+    in_scripts - задело ли совпадение буквы нужного алфавита. Разметка
+    исходного текста строится только при первом обращении.
+
+    texts и starts - сообщения и их начала в проверяемом буфере (для
+    пакетной проверки склеенных сообщений). used - номера сообщений,
+    для которых проверка вызывалась.
+    """
+
+    def __init__(self, normalizer: TextNormalizer, texts: list, starts: list = (0,)):
+        self.normalizer = normalizer
+        self.texts = texts
+        self.starts = starts
+        self.normalized = {}
+        self.used = set()
+
+    def markup(self, start: int) -> Tuple[int, NormalizedText]:
+        """Номер сообщения с позицией start и его разметка"""
+        index = bisect_right(self.starts, start) - 1
+        self.used.add(index)
+
+        normalized = self.normalized.get(index)
+        if normalized is None:
+            normalized = self.normalized[index] = self.normalizer.normalize(self.texts[index])
+        return index, normalized
+
+    def in_scripts(self, start: int, end: int, scripts: frozenset) -> bool:
+        """Есть ли в исходном тексте совпадения буквы из scripts"""
+        index, normalized = self.markup(start)
+        offset = self.starts[index]
+        offsets = normalized.offsets
+        span = self.texts[index][offsets[start - offset]:offsets[end - offset - 1] + 1]
+        return bool(self.normalizer.scripts(span) & scripts)
+
+    def __call__(self, allow_start: int, allow_end: int, start: int, end: int) -> bool:
+        index, normalized = self.markup(start)
+        offset = self.starts[index]
+        gaps = normalized.gaps
+        if start > allow_start and gaps[start - offset]:
+            return False
+        if end < allow_end and gaps[end - offset]:
+            return False
+        return True
+
+
+class ChatOverlays:
+    """
+    Словари чатов поверх общего автомата
+
+    Для чата держится маленький автомат только из его слов, общий
+    автомат не копируется. Автомат собирается при первой проверке
+    сообщения чата (build(chat_id) возвращает автомат или None, если
+    своих слов нет) и выгружается, когда чат долго молчит или чатов
+    больше max_chats.
+
+    Сборка (чтение слов из БД) идет без блокировки, поэтому холодный
+    чат не задерживает проверку в остальных. Если за время сборки
+    словари менялись (discard, clear), собранный автомат используется
+    один раз и не сохраняется.
+    """
+
+    def __init__(self, build, max_chats: int, idle_seconds: float):
+        self.build = build
+        self.max_chats = max_chats
+        self.idle_seconds = idle_seconds
+        self.entries = OrderedDict()  # chat_id -> (автомат или None, время обращения)
+        self.builds = 0
+        self.epoch = 0  # Растет при каждом discard и clear
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, chat_id: int) -> Optional[WordMatcher]:
+        now = time.monotonic()
+        with self.lock:
+            self.evict(now)
+            entry = self.entries.get(chat_id)
+            if entry is not None:
+                self.entries[chat_id] = (entry[0], now)
+                self.entries.move_to_end(chat_id)
+                return entry[0]
+            epoch = self.epoch
+
+        try:
+            matcher = self.build(chat_id)
+        except Exception as e:
+            logger.error(f"Ошибка загрузки слов чата {chat_id}: {e}")
+            return None
+
+        with self.lock:
+            self.builds += 1
+            if self.epoch == epoch:
+                # Чат мог собрать параллельный поток: оставляем его автомат
+                entry = self.entries.setdefault(chat_id, (matcher, now))
+                matcher = entry[0]
+                self.evict(now)
+        return matcher
+
+    def evict(self, now: float):
+        """Выгрузить долго молчащие чаты и лишние сверх max_chats (под блокировкой)"""
+        # Самые давние обращения в начале
+        while self.entries:
+            _, (_, last_used) = next(iter(self.entries.items()))
+            if len(self.entries) <= self.max_chats and now - last_used < self.idle_seconds:
+                break
+            self.entries.popitem(last=False)
+
+    def discard(self, chat_id: int):
+        """Выгрузить автомат чата; при следующем сообщении он соберется заново"""
+        with self.lock:
+            self.entries.pop(chat_id, None)
+            self.epoch += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.epoch += 1
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {
+                'chats': len(self.entries),
+                'with_words': sum(1 for matcher, _ in self.entries.values() if matcher is not None),
+                'builds': self.builds,
+            }
+
+
+class StageTimer:
+    """Замер этапов одной проверки"""
+
+    __slots__ = ('started', 'last', 'marks')
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.marks = []
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.marks.append((stage, now - self.last))
+        self.last = now
+
+
+class FilterStats:
+    """
+    Счетчики проверок сообщений
+
+    Каждая проверка увеличивает общий счетчик, каждое нарушение - счетчики
+    типа и сработавшего слова. Время этапов (normalize, cache, match,
+    classify) и гистограмма задержек собираются только для каждой N-й
+    проверки, чтобы замеры не замедляли сам фильтр.
+    """
+
+    STAGES = ('normalize', 'cache', 'match', 'chat', 'classify', 'stem', 'fuzzy')
+
+    # Верхние границы корзин гистограммы задержек, мкс
+    BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+    def __init__(self, sample_rate: float):
+        self.sample_every = round(1 / sample_rate) if sample_rate > 0 else 0
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            # Общий счетчик обновляется без блокировки: при гонке потоков
+            # он может немного отстать, для статистики это допустимо
+            self.messages = 0
+            self.sampled = 0
+            self.timeouts = 0
+            self.stage_calls = dict.fromkeys(self.STAGES, 0)
+            self.stage_time = dict.fromkeys(self.STAGES, 0.0)
+            self.histogram = [0] * (len(self.BUCKETS) + 1)
+            self.verdicts = Counter()
+            self.words = Counter()
+
+    def start(self) -> Optional[StageTimer]:
+        """Учесть проверку; для попавших в выборку вернуть таймер этапов"""
+        self.messages += 1
+        if self.sample_every and self.messages % self.sample_every == 0:
+            return StageTimer()
+        return None
+
+    def record(self, verdict: Tuple[bool, str, str], timer: Optional[StageTimer] = None):
+        found, word, violation_type = verdict
+        if not found and timer is None:
+            return
+
+        with self.lock:
+            if found:
+                self.verdicts[violation_type] += 1
+                self.words[word] += 1
+
+            if timer is not None:
+                self.sampled += 1
+                for stage, seconds in timer.marks:
+                    self.stage_calls[stage] += 1
+                    self.stage_time[stage] += seconds
+                elapsed_us = (timer.last - timer.started) * 1e6
+                self.histogram[bisect_left(self.BUCKETS, elapsed_us)] += 1
+
+    def record_batch(self, verdicts: list):
+        """Учесть вердикты пакетной проверки (без замеров времени)"""
+        self.messages += len(verdicts)
+        for verdict in verdicts:
+            if verdict[0]:
+                self.record(verdict)
+
+    def record_timeout(self):
+        with self.lock:
+            self.timeouts += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Верхняя граница корзины, в которую попадает квантиль, мкс
+
+        None - замеров еще нет, inf - квантиль за последней границей.
+        """
+        total = sum(self.histogram)
+        if not total:
+            return None
+
+        seen = 0
+        for bound, count in zip(self.BUCKETS, self.histogram):
+            seen += count
+            if seen >= q * total:
+                return bound
+        return float('inf')
+
+    def get_stats(self, top: int = 10) -> dict:
+        with self.lock:
+            total_time = sum(self.stage_time.values())
+            hits = sum(self.verdicts.values())
+            return {
+                'messages': self.messages,
+                'sampled': self.sampled,
+                'sample_every': self.sample_every,
+                'timeouts': self.timeouts,
+                'hits': hits,
+                'hit_rate': hits / self.messages if self.messages else 0.0,
+                'verdicts': dict(self.verdicts),
+                'top_words': self.words.most_common(top),
+                'stages': {
+                    stage: {
+                        'calls': self.stage_calls[stage],
+                        'total_ms': self.stage_time[stage] * 1000,
+                        'mean_us': (self.stage_time[stage] / self.stage_calls[stage] * 1e6
+                                    if self.stage_calls[stage] else 0.0),
+                        'share': self.stage_time[stage] / total_time if total_time else 0.0,
+                    }
+                    for stage in self.STAGES
+                },
+                'histogram': list(zip(self.BUCKETS + (None,), self.histogram)),
+                'p50_us': self.percentile(0.5),
+                'p99_us': self.percentile(0.99),
+            }
+
+
 class WordFilter:
     def __init__(self):
+        # Основной язык (Config.DEFAULT_LANGUAGE): слова из файла и кастомные
         self.base_words = []
-        self.patterns = []
+        self.file_words = set()
+        # Исключения: слова, внутри которых запрещенное слово не нарушение
+        self.allowed_words = []
+        # Остальные языки: язык -> слова и исключения из banned_words.json
+        self.language_words = {}
+        self.language_allowed = {}
+        # Основа -> [[запрещенное слово, наименьшая длина слова сообщения], ...]:
+        # одна запись покрывает все словоформы. Основы исключений в индекс
+        # не попадают
+        self.stems = {}
+        self.allowed_stems = set()
+        self.stem_exceptions = frozenset(Config.STEM_COMMON_WORDS)
+        self.stem = lru_cache(maxsize=Config.STEM_CACHE_SIZE)(stem)
+        # Индекс опечаток строится при первой проверке в чате, где он включен
+        self.fuzzy = None  # (поколение, FuzzyIndex)
+        self.fuzzy_chats = db.get_fuzzy_matching()
+        # Слова чатов: свой маленький автомат поверх общего. Он включает
+        # исключения основного словаря, с которыми был собран
+        self.overlays = ChatOverlays(self.build_overlay, Config.CHAT_OVERLAY_MAX, Config.CHAT_OVERLAY_IDLE)
+        self.overlays_allowed = ()
+        confusables = load_confusables(Config.CONFUSABLES_FILE)
+        self.normalizer = TextNormalizer(Config.CHAR_REPLACEMENTS, **confusables)
+        # Ключи слов в автомате зависят и от таблицы похожих символов
+        self.confusables_hash = hashlib.sha256(
+            json.dumps(confusables, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        # Таблицы токенов общие для всех автоматов: основной алфавит и
+        # классы в обе стороны для словарей на латинице
+        self.token_tables = {
+            False: TokenTables(self.normalizer.char_classes, self.normalizer.sequences),
+            True: TokenTables(self.normalizer.mirrored_classes, self.normalizer.sequences),
+        }
+        # Словарь языка, проверяемый не на всех алфавитах, сопоставляется
+        # и с похожими буквами других (зеркальные классы). Его совпадение
+        # засчитывается, только если задело буквы алфавита языка: иначе
+        # "диск" в сообщении "диск OK" совпал бы с английским словом
+        self.span_scripts = {
+            language: frozenset(scripts) for language, scripts in Config.LANGUAGE_SCRIPTS.items()
+            if language != Config.DEFAULT_LANGUAGE and set(scripts) != set(SCRIPTS)
+        }
+        # Автомат каждого языка и маршруты: алфавиты сообщения -> словари
+        self.matchers = {Config.DEFAULT_LANGUAGE: WordMatcher()}
+        self.routes = self.build_routes(self.matchers)
+        # Блокировка только для изменений словаря, проверка идет без нее
+        self.lock = threading.Lock()
+
+        # Поколение словаря растет при каждой замене автомата
+        self.generation = 0
+        self.verdict_cache = VerdictCache(Config.VERDICT_CACHE_ENTRIES, Config.VERDICT_CACHE_BYTES)
+        self.stats = FilterStats(Config.FILTER_STATS_SAMPLE_RATE)
+
+        # Отслеживание изменений banned_words.json
+        self.words_file_mtime = None
+        self.watcher = None
+        self.watcher_stop = threading.Event()
+        self.metrics = {
+            'reloads': 0,
+            'reload_errors': 0,
+            'last_reload_seconds': 0.0,
+            'last_reload_at': None,
+            'dictionary_size': 0,
+        }
+
         self.load_words()
 
     def load_words(self):
         """Загрузить запрещенные слова из файла и БД"""
+        started = time.perf_counter()
         try:
+            # Время изменения берем до чтения, а запоминаем после успешной
+            # загрузки: неудачную watcher повторит, а правка во время
+            # чтения вызовет еще одну перезагрузку
+            mtime = os.stat(Config.BANNED_WORDS_FILE).st_mtime_ns
+
             # Загружаем базовые слова из JSON
             with open(Config.BANNED_WORDS_FILE, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                self.base_words = data.get('banned_words', [])
+                file_words = data.get('banned_words', [])
+                allowed_words = data.get('allowed_words', [])
+                languages = {
+                    language: entry for language, entry in data.get('languages', {}).items()
+                    if language != Config.DEFAULT_LANGUAGE
+                }
 
             # Добавляем кастомные слова из БД
             custom_words = db.get_custom_words()
-            self.base_words.extend(custom_words)
 
-            # Генерируем паттерны
-            self.generate_patterns()
+            # Скомпилированные словари с диска, если входные данные не менялись
+            keys = {Config.DEFAULT_LANGUAGE: self.dictionary_key(file_words, custom_words, allowed_words)}
+            allowed = {Config.DEFAULT_LANGUAGE: allowed_words}
+            for language, entry in languages.items():
+                keys[language] = self.dictionary_key(
+                    entry.get('banned_words', []), [], entry.get('allowed_words', []), language
+                )
+                allowed[language] = entry.get('allowed_words', [])
+            loaded = {
+                language: self.load_matcher(key, language, [key for word in allowed[language]
+                                                            for key in self.normalizer.word_keys(word)])
+                for language, key in keys.items()
+            }
+
+            with self.lock:
+                self.file_words = {word.lower() for word in file_words}
+                self.base_words = [word.lower() for word in file_words + custom_words]
+                self.allowed_words = [word.lower() for word in allowed_words]
+                self.language_words = {
+                    language: [word.lower() for word in entry.get('banned_words', [])]
+                    for language, entry in languages.items()
+                }
+                self.language_allowed = {
+                    language: [word.lower() for word in entry.get('allowed_words', [])]
+                    for language, entry in languages.items()
+                }
+
+                # Основы тоже сохраняются на диск: пересчет всего словаря
+                # дольше загрузки автомата
+                stems_key = keys[Config.DEFAULT_LANGUAGE]
+                stems = self.load_stems(stems_key)
+                if stems is None:
+                    self.stems, self.allowed_stems = self.build_stems()
+                    self.save_stems(stems_key)
+                else:
+                    self.stems, self.allowed_stems = stems
 
-            logger.info(f"Загружено {len(self.base_words)} запрещенных слов")
+                # Языки, которых больше нет в файле, уходят вместе с автоматами
+                matchers = {}
+                for language, matcher in loaded.items():
+                    if matcher is None:
+                        matcher = self.build_matcher(*self.language_dictionary(language), language)
+                    matchers[language] = matcher
+                self.swap_matchers(matchers)
+
+                # Собранные заново сохраняем для следующего запуска
+                for language, matcher in loaded.items():
+                    if matcher is None:
+                        self.save_matcher(keys[language], language)
+
+            self.words_file_mtime = mtime
+            self.metrics['reloads'] += 1
+            self.metrics['last_reload_seconds'] = time.perf_counter() - started
+            self.metrics['last_reload_at'] = time.time()
+            self.metrics['dictionary_size'] = sum(map(len, self.matchers.values()))
+
+            languages = ''.join(f", {language}: {len(words)}" for language, words in self.language_words.items())
+            logger.info(f"Загружено {len(self.base_words)} запрещенных слов{languages} "
+                        f"за {self.metrics['last_reload_seconds'] * 1000:.1f} мс")
 
         except FileNotFoundError:
             # Создаем файл с базовыми словами если не существует
             self.create_default_words_file()
             self.load_words()
         except Exception as e:
+            self.metrics['reload_errors'] += 1
             logger.error(f"Ошибка загрузки слов: {e}")
 
+    def start_watcher(self, interval: float = None):
+        """Запустить фоновое отслеживание изменений файла словаря"""
+        if self.watcher and self.watcher.is_alive():
+            return
+
+        self.watcher_stop.clear()
+        self.watcher = threading.Thread(
+            target=self.watch_words_file,
+            args=(interval or Config.WORDS_RELOAD_INTERVAL,),
+            name='words-watcher',
+            daemon=True
+        )
+        self.watcher.start()
+
+    def stop_watcher(self):
+        """Остановить отслеживание файла словаря"""
+        self.watcher_stop.set()
+        if self.watcher:
+            self.watcher.join()
+
+    def watch_words_file(self, interval: float):
+        """Опрашивать время изменения файла и перезагружать словарь"""
+        while not self.watcher_stop.wait(interval):
+            try:
+                mtime = os.stat(Config.BANNED_WORDS_FILE).st_mtime_ns
+            except OSError:
+                continue
+
+            if mtime != self.words_file_mtime:
+                logger.info("Файл запрещенных слов изменен, перезагружаем словарь")
+                # Новый автомат собирается в этом потоке и подменяется целиком
+                self.load_words()
+
+    def get_metrics(self) -> dict:
+        """Метрики словаря и его перезагрузок"""
+        metrics = dict(self.metrics)
+        matchers = self.matchers
+        metrics['dictionary_size'] = sum(map(len, matchers.values()))
+        metrics['languages'] = {language: len(matcher) for language, matcher in matchers.items()}
+        metrics['generation'] = self.generation
+        metrics['verdict_cache'] = self.verdict_cache.get_stats()
+        metrics['chat_overlays'] = self.overlays.get_stats()
+        return metrics
+
+    def get_stats(self, top: int = 10) -> dict:
+        """Статистика проверок: этапы, типы нарушений, сработавшие слова"""
+        return self.stats.get_stats(top)
+
     def create_default_words_file(self):
         """Создать файл с базовыми запрещенными словами"""
         default_words = [
@@ -51,110 +581,620 @@ class WordFilter:
             "срать", "срань", "залупа"
         ]
 
+        # Обычные слова, внутри которых встречаются запрещенные
+        default_allowed = [
+            "херсон", "херес", "херувим", "оскорблять", "употреблять", "истреблять",
+            "колебать", "колебал", "хлебать", "хлебал", "страхуй", "страхуё",
+            "плох", "блох", "лохмат", "лохан", "переполох", "всполох", "жидк", "залп",
+        ]
+
+        # Словари других языков, проверяются по алфавиту сообщения
+        default_languages = {
+            "uk": {
+                "banned_words": [
+                    "курва", "срака", "гівно", "лайно", "йобаний", "довбойоб",
+                    "підар", "хуйло", "сраний", "дупа"
+                ],
+            },
+            "en": {
+                "banned_words": [
+                    "fuck", "shit", "bitch", "cunt", "asshole", "dick", "bastard",
+                    "whore", "slut", "motherfucker", "faggot", "retard", "wanker", "twat"
+                ],
+                "allowed_words": ["scunthorpe", "dickens", "dickinson", "retardant"],
+            },
+        }
+
         data = {
             "banned_words": default_words,
+            "allowed_words": default_allowed,
+            "languages": default_languages,
             "version": "1.0",
             "description": "База запрещенных слов для бота-модератора"
         }
 
-        with open(Config.BANNED_WORDS_FILE, 'w', encoding='utf-8') as f:
+        # Несколько процессов могут создавать файл одновременно: пишем
+        # рядом и подменяем, чтобы никто не прочитал его наполовину
+        path = Path(Config.BANNED_WORDS_FILE)
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+
+    def matcher_options(self, language: str = None) -> dict:
+        """Параметры автомата, общие для сборки и загрузки с диска"""
+        # Словари других языков могут быть на латинице
+        mirrored = bool(language) and language != Config.DEFAULT_LANGUAGE
+        return {
+            'tables': self.token_tables[mirrored],
+            'repeats': True,
+            'max_states': Config.FILTER_MAX_STATES,
+        }
+
+    def dictionary_key(self, file_words, custom_words, allowed_words=(), language=None) -> bytes:
+        """Хеш словаря и правил нормализации для файла автомата"""
+        data = json.dumps(
+            [FORMAT_VERSION, Config.CHAR_REPLACEMENTS, sorted(self.normalizer.optional),
+             self.confusables_hash, sorted(file_words),
+             sorted(custom_words), sorted(allowed_words), language or Config.DEFAULT_LANGUAGE],
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(data.encode('utf-8')).digest()
+
+    @property
+    def matcher(self) -> WordMatcher:
+        """Автомат основного языка"""
+        return self.matchers[Config.DEFAULT_LANGUAGE]
+
+    def language_dictionary(self, language: str) -> Tuple[list, list]:
+        """Запрещенные слова и исключения языка"""
+        if language == Config.DEFAULT_LANGUAGE:
+            return self.base_words, self.allowed_words
+        return self.language_words.get(language, []), self.language_allowed.get(language, [])
+
+    def build_matcher(self, words: list, allowed_words: list, language: str = None) -> WordMatcher:
+        """Собрать автомат поиска по словарю одного языка"""
+        matcher = WordMatcher(**self.matcher_options(language))
+        for word in words:
+            for key in self.normalizer.word_keys(word):
+                matcher.add(key, word.lower())
+        # Исключения после запрещенных: при совпадении ключей побеждает запрет
+        for word in allowed_words:
+            for key in self.normalizer.word_keys(word):
+                matcher.add(key, word.lower(), allowed=True)
+        return matcher
 
     def generate_patterns(self):
-        """Сгенерировать паттерны для поиска"""
-        self.patterns = []
+        """Собрать автомат и основы по основному словарю"""
+        self.stems, self.allowed_stems = self.build_stems()
+        self.swap_matcher(self.build_matcher(self.base_words, self.allowed_words))
+
+    def swap_matcher(self, matcher: WordMatcher, language: str = None):
+        """Подменить автомат одного языка (по умолчанию основного)"""
+        matchers = dict(self.matchers)
+        matchers[language or Config.DEFAULT_LANGUAGE] = matcher
+        self.swap_matchers(matchers)
 
+    def swap_matchers(self, matchers: dict):
+        """Подменить автоматы целиком: читатели видят старый набор или новый"""
+        self.matchers = matchers
+        self.routes = self.build_routes(matchers)
+        # Автоматы чатов не зависят от общего словаря, кроме исключений:
+        # выгружаем их, только если исключения изменились
+        allowed = tuple(self.allowed_words)
+        if allowed != self.overlays_allowed:
+            self.overlays_allowed = allowed
+            self.overlays.clear()
+        # Поколение меняем после автоматов: проверка читает их в обратном
+        # порядке, поэтому вердикт нового автомата не попадет в кеш старого
+        self.generation += 1
+
+    def build_routes(self, matchers: dict) -> dict:
+        """
+        Алфавиты сообщения -> (метка, ((язык, автомат), ...))
+
+        Основной язык проверяется первым, остальные по алфавиту. Сообщение
+        без букв (цифры, символы) проверяется всеми словарями.
+        """
+        languages = sorted(matchers, key=lambda language: (language != Config.DEFAULT_LANGUAGE, language))
+        routes = {}
+        for size in range(len(SCRIPTS) + 1):
+            for scripts in map(frozenset, combinations(SCRIPTS, size)):
+                selected = [
+                    language for language in languages
+                    if not scripts or scripts & set(Config.LANGUAGE_SCRIPTS.get(language, SCRIPTS))
+                ]
+                routes[scripts] = (
+                    ','.join(selected),
+                    tuple((language, matchers[language]) for language in selected),
+                )
+        return routes
+
+    def stem_entry(self, word: str) -> Optional[tuple]:
+        """Основа слова словаря и его запись в индексе или None"""
+        tokens = self.normalizer.tokens(word)
+        if len(tokens) != 1:
+            return None
+        word_stem = self.stem(tokens[0])
+        if len(word_stem) < Config.STEM_MIN_LENGTH:
+            return None
+        short = len(word_stem) < Config.STEM_SHORT_LENGTH
+        return word_stem, [word, len(tokens[0]) if short else len(word_stem)]
+
+    def build_stems(self) -> Tuple[dict, set]:
+        """Индекс основ запрещенных слов по текущему словарю и основы исключений"""
+        # Основы исключений не считаются нарушением
+        allowed = {self.stem(token) for word in self.allowed_words for token in self.normalizer.tokens(word)}
+        stems = {}
         for word in self.base_words:
-            # Паттерн с учетом замены букв
-            pattern_parts = []
-            for char in word:
-                if char in Config.CHAR_REPLACEMENTS:
-                    replacements = Config.CHAR_REPLACEMENTS[char]
-                    # Экранируем специальные символы
-                    escaped = [re.escape(r) for r in replacements]
-                    pattern_parts.append(f'[{"".join(escaped)}]')
-                else:
-                    pattern_parts.append(re.escape(char))
+            entry = self.stem_entry(word)
+            if entry is not None and entry[0] not in allowed:
+                stems.setdefault(entry[0], []).append(entry[1])
+        return stems, allowed
+
+    def add_stem(self, word: str):
+        """Добавить основу одного слова; остальной индекс не пересчитывается"""
+        entry = self.stem_entry(word)
+        if entry is not None and entry[0] not in self.allowed_stems:
+            # Список подменяется целиком: проверка читает индекс без блокировки
+            self.stems[entry[0]] = [*self.stems.get(entry[0], ()), entry[1]]
+
+    def remove_stem(self, word: str):
+        """Убрать основу одного слова; другие слова с той же основой остаются"""
+        entry = self.stem_entry(word)
+        if entry is None:
+            return
+        left = [item for item in self.stems.get(entry[0], ()) if item[0] != word]
+        if left:
+            self.stems[entry[0]] = left
+        else:
+            self.stems.pop(entry[0], None)
+
+    def stems_file(self) -> Path:
+        """Файл индекса основ рядом со скомпилированным словарем"""
+        return Path(Config.MATCHER_CACHE_FILE).with_suffix('.stems')
 
-            # Добавляем возможность разделителей между символами
-            pattern = r'[\s\-_\.]*'.join(pattern_parts)
+    def stems_settings(self, key: bytes) -> list:
+        return [key.hex(), Config.STEM_MIN_LENGTH, Config.STEM_SHORT_LENGTH]
 
-            # Добавляем возможность повторения символов (ппривветт)
-            final_pattern = ''
-            for part in pattern_parts:
-                final_pattern += f'{part}+[\s\-_\.]*'
+    def load_stems(self, key: bytes) -> Optional[Tuple[dict, set]]:
+        """Индекс основ с диска или None, если он собран из других данных"""
+        try:
+            with open(self.stems_file(), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('settings') != self.stems_settings(key):
+                return None
+            return data['stems'], set(data['allowed'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save_stems(self, key: bytes):
+        """Сохранить индекс основ; запись атомарная, как у автомата"""
+        path = self.stems_file()
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'settings': self.stems_settings(key),
+                    'stems': self.stems,
+                    'allowed': sorted(self.allowed_stems),
+                }, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить индекс основ: {e}")
+
+    def find_stem(self, tokens: list) -> Optional[str]:
+        """Запрещенное слово, основа которого совпала с основой слова сообщения"""
+        stems = self.stems
+        if not stems:
+            return None
+
+        min_length = Config.STEM_MIN_LENGTH
+        for token in tokens:
+            if len(token) >= min_length and token not in self.stem_exceptions:
+                for word, word_length in stems.get(self.stem(token), ()):
+                    if len(token) >= word_length:
+                        return word
+        return None
 
-            self.patterns.append(final_pattern.rstrip(r'[\s\-_\.]*'))
+    def build_overlay(self, chat_id: int) -> Optional[WordMatcher]:
+        """Автомат из слов чата или None, если своих слов у чата нет"""
+        words = [word.lower() for word in db.get_custom_words(chat_id)]
+        if not words:
+            return None
+        # Из исключений нужны только те, внутри которых есть слово чата:
+        # остальные ничего не перекрывают, а автомат раздувают
+        matcher = self.build_matcher(words, [])
+        allowed = [word for word in self.allowed_words
+                   if next(matcher.finditer(self.normalizer.canonical(word)), None)]
+        return self.build_matcher(words, allowed) if allowed else matcher
+
+    def chat_hit(self, chat_id: int, canonical: str, text: str, deadline: float) -> tuple:
+        """Совпадение по словарю чата или пустой кортеж; в кеш не попадает"""
+        overlay = self.overlays.get(chat_id)
+        if overlay is None:
+            return ()
+        for hit in overlay.finditer(canonical, deadline, allow_check=AllowBoundaries(self.normalizer, [text])):
+            return hit
+        return ()
+
+    def reload_chat_words(self, chat_id: int):
+        """Слова чата изменились в БД: автомат соберется при следующем сообщении"""
+        self.overlays.discard(chat_id)
+
+    def fuzzy_index(self) -> FuzzyIndex:
+        """Индекс опечаток для текущего поколения словаря"""
+        generation = self.generation
+        fuzzy = self.fuzzy
+        if fuzzy is not None and fuzzy[0] == generation:
+            return fuzzy[1]
+
+        index = FuzzyIndex(
+            Config.FUZZY_MIN_LENGTH, Config.FUZZY_LONG_LENGTH,
+            allowed=[token for word in self.allowed_words for token in self.normalizer.tokens(word)],
+            cache_size=Config.FUZZY_CACHE_SIZE,
+        )
+        for word in self.base_words:
+            tokens = self.normalizer.tokens(word)
+            if len(tokens) == 1:
+                index.add(tokens[0], word)
 
-    def check_message(self, text: str) -> Tuple[bool, str, str]:
+        self.fuzzy = (generation, index)
+        return index
+
+    def fuzzy_enabled(self, chat_id: Optional[int]) -> bool:
+        return self.fuzzy_chats.get(chat_id, Config.FUZZY_DEFAULT)
+
+    def set_fuzzy(self, chat_id: int, enabled: bool):
+        """Включить или отключить поиск с опечатками в чате (настройка в БД ведется отдельно)"""
+        self.fuzzy_chats[chat_id] = enabled
+
+    def matcher_file(self, language: str = None) -> Path:
+        """Файл скомпилированного словаря языка"""
+        path = Path(Config.MATCHER_CACHE_FILE)
+        if not language or language == Config.DEFAULT_LANGUAGE:
+            return path
+        return path.with_name(f'{path.stem}.{language}{path.suffix}')
+
+    def load_matcher(self, key: bytes, language: str = None, allowed_keys: Iterable[str] = ()):
+        """Загрузить скомпилированный автомат с диска или вернуть None"""
+        return WordMatcher.load(
+            self.matcher_file(language), key,
+            shared=Config.MATCHER_SHARED,
+            allowed_keys=allowed_keys,
+            **self.matcher_options(language)
+        )
+
+    def save_matcher(self, key: bytes, language: str = None):
+        """Сохранить скомпилированный автомат рядом со словарем"""
+        built = self.matchers[language or Config.DEFAULT_LANGUAGE]
+        try:
+            built.dump(self.matcher_file(language), key)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить скомпилированный словарь: {e}")
+            return
+
+        # Переходим на общую для процессов копию из файла
+        if Config.MATCHER_SHARED:
+            matcher = self.load_matcher(key, language, built.allowed_keys)
+            if matcher is not None:
+                self.swap_matcher(matcher, language)
+
+    def check_message(self, text: str, chat_id: Optional[int] = None) -> Tuple[bool, str, str]:
         """
         Проверить сообщение на наличие запрещенных слов
 
+        chat_id нужен для словаря и настроек чата (поиск с опечатками).
         Возвращает: (найдено_ли, слово, тип_нарушения)
         """
-        text_lower = text.lower()
+        timer = self.stats.start()
+        deadline = time.perf_counter() + Config.FILTER_TIME_BUDGET
+        canonical = self.normalizer.canonical(text)
+        if timer:
+            timer.mark('normalize')
 
-        # 1. Проверка по паттернам
-        for i, pattern in enumerate(self.patterns):
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                return True, self.base_words[i], "pattern_match"
+        # Одинаковый после нормализации текст (копипаста при рейдах)
+        # проверяется один раз за поколение словаря. Словари языков
+        # выбираются по алфавитам исходного текста
+        generation = self.generation
+        route, languages = self.routes[self.normalizer.scripts(text)]
+        cache_key = self.verdict_cache.make_key(canonical, route)
+        hit = self.verdict_cache.get(cache_key, generation)
+        if timer:
+            timer.mark('cache')
 
-        # 2. Проверка без пробелов
-        text_no_spaces = re.sub(r'[\s\-_\.]', '', text_lower)
-        for word in self.base_words:
-            if len(word) > 3 and word in text_no_spaces:
-                return True, word, "no_spaces"
-
-        # 3. Проверка на транслит
-        translit_variants = self.generate_translit_variants(text_lower)
-        for variant in translit_variants:
-            for word in self.base_words:
-                if word in variant:
-                    return True, word, "translit"
-
-        # 4. Проверка на разбиение слова (п р и в е т)
-        spaced_text = ' '.join(text_lower)
-        for word in self.base_words:
-            spaced_word = ' '.join(word)
-            if spaced_word in spaced_text:
-                return True, word, "spaced"
+        try:
+            if hit is None:
+                hit = ()
+                boundaries = AllowBoundaries(self.normalizer, [text])
+                for language, matcher in languages:
+                    hit = self.first_hit(matcher, canonical, deadline, boundaries, self.span_scripts.get(language))
+                    if hit:
+                        break
+                # Решение по исключению и алфавиту зависит от исходного
+                # текста, поэтому такой вердикт не кешируется
+                if not boundaries.used:
+                    self.verdict_cache.put(cache_key, generation, hit)
+                if timer:
+                    timer.mark('match')
+
+            # Слова чата ищутся после общего словаря
+            if not hit and chat_id is not None:
+                hit = self.chat_hit(chat_id, canonical, text, deadline)
+                if timer:
+                    timer.mark('chat')
+        except TimeBudgetExceeded as e:
+            # Длинной подкладкой нельзя пронести слово непроверенным:
+            # досматриваем без неоднозначных замен, это всегда быстро
+            logger.warning(f"Проверка сообщения прервана, проверяем без замен: {e}")
+            self.stats.record_timeout()
+            hit = self.exact_hit(text, canonical, languages, chat_id)
+
+        if hit:
+            verdict = self.verdict(text, hit)
+            if timer:
+                timer.mark('classify')
+        else:
+            verdict = self.word_verdict(text, self.fuzzy_enabled(chat_id), timer)
+        self.stats.record(verdict, timer)
+        return verdict
+
+    def exact_hit(self, text: str, canonical: str, languages: tuple, chat_id: Optional[int]) -> tuple:
+        """
+        Совпадение по точным словам словарей или пустой кортеж
+
+        Запасная проверка для сообщений, на которых полный поиск не
+        уложился во время: без неоднозначных замен и повторов автомат
+        линеен по длине текста, поэтому работает без ограничения времени.
+        """
+        matchers = [(matcher, self.span_scripts.get(language)) for language, matcher in languages]
+        overlay = self.overlays.get(chat_id) if chat_id is not None else None
+        if overlay is not None:
+            matchers.append((overlay, None))
+
+        boundaries = AllowBoundaries(self.normalizer, [text])
+        for matcher, scripts in matchers:
+            hit = self.first_hit(matcher.exact(), canonical, None, boundaries, scripts)
+            if hit:
+                return hit
+        return ()
+
+    def first_hit(self, matcher: WordMatcher, canonical: str, deadline: Optional[float],
+                  boundaries: AllowBoundaries, scripts: Optional[frozenset] = None) -> tuple:
+        """Первое совпадение, задевшее буквы scripts (если заданы), или пустой кортеж"""
+        for hit in matcher.finditer(canonical, deadline, allow_check=boundaries):
+            if scripts is None or boundaries.in_scripts(hit[0], hit[1], scripts):
+                return hit
+        return ()
+
+    def word_verdict(self, text: str, fuzzy: bool, timer: Optional[StageTimer] = None) -> Tuple[bool, str, str]:
+        """
+        Проверка по отдельным словам: словоформы, затем опечатки
+
+        Выполняется, только если автомат ничего не нашел, и не кешируется:
+        слова сообщения зависят от разделителей, а в кеше лежит
+        каноническая форма.
+        """
+        if not (Config.FILTER_STEMS or fuzzy):
+            return False, "", ""
+
+        tokens = self.normalizer.tokens(text)
+        if Config.FILTER_STEMS:
+            word = self.find_stem(tokens)
+            if timer:
+                timer.mark('stem')
+            if word is not None:
+                return True, word, "stem"
+
+        if fuzzy:
+            word = self.fuzzy_index().find(tokens)
+            if timer:
+                timer.mark('fuzzy')
+            if word is not None:
+                return True, word, "fuzzy"
 
         return False, "", ""
 
-    def generate_translit_variants(self, text: str) -> List[str]:
-        """Генерировать варианты текста с заменой русских букв на английские"""
-        variants = [text]
-
-        # Простая замена часто используемых букв
-        replacements = {
-            'a': 'а',
-            'b': 'в',
-            'c': 'с',
-            'e': 'е',
-            'k': 'к',
-            'm': 'м',
-            'o': 'о',
-            'p': 'р',
-            't': 'т',
-            'x': 'х',
-            'y': 'у'
-        }
+    def verdict(self, text: str, hit: tuple) -> Tuple[bool, str, str]:
+        """Вердикт по найденному фрагменту; разметка текста строится только для нарушений"""
+        if not hit:
+            return False, "", ""
+
+        start, end, word = hit
+        return True, word, self.violation_type(self.normalizer.normalize(text), start, end, word)
+
+    def check_messages(self, texts: Iterable[str], chunk_size: int = 256,
+                       chat_id: Optional[int] = None) -> Iterator[Tuple[bool, str, str]]:
+        """
+        Проверить поток сообщений (догон очереди, повторная проверка истории)
+
+        Принимает любой итерируемый источник и выдает вердикты в том же
+        порядке, что и check_message. Сообщения обрабатываются пачками:
+        одинаковые тексты проверяются один раз, а остальные склеиваются
+        через разделитель и проходят автомат одним сканированием.
+        """
+        iterator = iter(texts)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return
+            yield from self.check_chunk(chunk, chat_id)
 
-        # Меняем английские буквы на русские
-        for eng, rus in replacements.items():
-            variant = text.replace(eng, rus)
-            if variant != text:
-                variants.append(variant)
+    def check_chunk(self, texts: list, chat_id: Optional[int] = None) -> list:
+        """Проверить пачку сообщений одним проходом автомата"""
+        fuzzy = self.fuzzy_enabled(chat_id)
+        generation = self.generation
+        routes = self.routes
+        cache = self.verdict_cache
 
-        return variants
+        canonical = self.normalizer.canonical_many(texts)
+        selected = [routes[self.normalizer.scripts(text)] for text in texts]
+        keys = [cache.make_key(item, route) for item, (route, _) in zip(canonical, selected)]
+        hits = {}
+        for key in keys:
+            if key not in hits:
+                hits[key] = cache.get(key, generation)
+
+        # Непроверенные тексты каждого языка склеиваем через BATCH_SEPARATOR
+        # и проходим его автоматом один раз
+        items = {}
+        originals = {}
+        missing = {}
+        text_languages = {}
+        dependent = set()
+        for text, key, item, (_, languages) in zip(texts, keys, canonical, selected):
+            if key in items:
+                continue
+            items[key] = item
+            originals[key] = text
+            if hits[key] is None:
+                missing[key] = item
+                text_languages[key] = {language for language, _ in languages}
+
+        chat_hits = {}
+        deadline = time.perf_counter() + Config.FILTER_TIME_BUDGET * len(items)
+        try:
+            if missing:
+                found = {}
+                # Маршрут без алфавитов содержит все языки в порядке проверки:
+                # сообщению достается совпадение первого языка, как и по одному
+                for language, matcher in routes[frozenset()][1]:
+                    pending = [key for key in missing if key not in found and language in text_languages[key]]
+                    if not pending:
+                        continue
+                    matches, used = self.scan_joined(
+                        matcher, [missing[key] for key in pending], [originals[key] for key in pending], deadline,
+                        self.span_scripts.get(language)
+                    )
+                    dependent.update(pending[index] for index in used)
+                    for index, hit in matches.items():
+                        found[pending[index]] = hit
+
+                for key in missing:
+                    if key in dependent:
+                        continue
+                    hits[key] = found.get(key, ())
+                    cache.put(key, generation, hits[key])
+
+            # Слова чата ищутся после общего словаря и не кешируются
+            overlay = self.overlays.get(chat_id) if chat_id is not None else None
+            if overlay is not None:
+                pending = [key for key in items if key not in dependent and not hits[key]]
+                if pending:
+                    matches, used = self.scan_joined(
+                        overlay, [items[key] for key in pending], [originals[key] for key in pending], deadline
+                    )
+                    dependent.update(pending[index] for index in used)
+                    chat_hits = {pending[index]: hit for index, hit in matches.items()}
+        except TimeBudgetExceeded as e:
+            logger.warning(f"Проверка пачки прервана, проверяем по одному: {e}")
+            self.stats.record_timeout()
+            return [self.check_message(text, chat_id) for text in texts]
+
+        verdicts = []
+        for text, key in zip(texts, keys):
+            if key in dependent:
+                continue
+            hit = hits[key] or chat_hits.get(key)
+            verdicts.append(self.verdict(text, hit) if hit else self.word_verdict(text, fuzzy))
+        self.stats.record_batch(verdicts)
+
+        # Тексты, где сработало исключение, зависят от разделителей
+        # и проверяются по одному
+        if dependent:
+            verdicts = iter(verdicts)
+            verdicts = [
+                self.check_message(text, chat_id) if key in dependent else next(verdicts)
+                for text, key in zip(texts, keys)
+            ]
+        return verdicts
+
+    def scan_joined(self, matcher: WordMatcher, items: list, originals: list, deadline: float,
+                    scripts: Optional[frozenset] = None) -> Tuple[dict, set]:
+        """
+        Пройти склеенные канонические тексты одним сканированием
+
+        Возвращает первое совпадение каждого текста по его номеру и номера
+        текстов, для которых понадобилась проверка по исходному тексту
+        (исключения, алфавит scripts).
+        """
+        starts = []
+        position = 0
+        for item in items:
+            starts.append(position)
+            position += len(item) + 1
+        buffer = BATCH_SEPARATOR.join(items)
+
+        # После первого совпадения в сообщении поиск продолжается
+        # со следующего сообщения, как и при проверке по одному
+        found = {}
+        position = 0
+        boundaries = AllowBoundaries(self.normalizer, originals, starts)
+        while position < len(buffer):
+            for start, end, word in matcher.finditer(buffer, deadline, position, boundaries):
+                if scripts is not None and not boundaries.in_scripts(start, end, scripts):
+                    continue
+                index = bisect_right(starts, start) - 1
+                found[index] = (start - starts[index], end - starts[index], word)
+                position = starts[index + 1] if index + 1 < len(starts) else len(buffer)
+                break
+            else:
+                break
+        return found, boundaries.used
+
+    def violation_type(self, normalized: NormalizedText, start: int, end: int, word: str) -> str:
+        """Определить способ обхода фильтра по найденному фрагменту"""
+        # Ключ без необязательной буквы ("блят") кончается раньше слова:
+        # если текст продолжается словом целиком, берем его
+        key = self.normalizer.normalize_word(word)
+        if end - start < len(key) and normalized.text.startswith(key, start):
+            end = start + len(key)
+        gaps = normalized.gaps[start + 1:end]
+
+        # Разбиение слова (п р и в е т)
+        if gaps and all(gaps):
+            return "spaced"
+
+        # Разделители внутри слова (п.ривет)
+        if any(gaps):
+            return "no_spaces"
+
+        # Замена букв (пpивeт)
+        if normalized.raw[start:end] != self.normalizer.normalize(word).raw:
+            return "translit"
+
+        return "pattern_match"
 
     def add_custom_word(self, word: str) -> bool:
-        """Добавить новое запрещенное слово"""
-        if word not in self.base_words:
+        """Добавить новое запрещенное слово без пересборки словаря"""
+        word = word.lower()
+        with self.lock:
+            if word in self.base_words:
+                return False
+
             self.base_words.append(word)
-            self.generate_patterns()
+            self.add_stem(word)
+            matcher = self.matcher
+            for key in self.normalizer.word_keys(word):
+                matcher = matcher.with_word(key, word)
+            self.swap_matcher(matcher)
+            return True
+
+    def remove_custom_word(self, word: str) -> bool:
+        """Удалить кастомное слово без пересборки словаря"""
+        word = word.lower()
+        with self.lock:
+            # Слова из файла удаляются только правкой banned_words.json
+            if word not in self.base_words or word in self.file_words:
+                return False
+
+            self.base_words.remove(word)
+            self.remove_stem(word)
+            matcher = self.matcher
+            for key in self.normalizer.word_keys(word):
+                matcher = matcher.without_word(key, word)
+            self.swap_matcher(matcher)
             return True
-        return False
 
 
 # Глобальный экземпляр фильтра
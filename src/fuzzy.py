@@ -0,0 +1,109 @@
+"""
+Поиск запрещенных слов с опечатками (индекс удалений SymSpell)
+
+Для каждого слова словаря заранее сохраняются все варианты без одной
+или двух букв. Слово сообщения разбирается так же, и только найденные
+в индексе кандидаты сверяются точным расстоянием, поэтому время
+проверки не зависит от размера словаря.
+"""
+from functools import lru_cache
+from itertools import combinations
+from typing import Iterable, Optional
+
+
+def deletes(token: str, distance: int) -> set:
+    """Варианты слова без 0..distance букв"""
+    variants = {token}
+    for count in range(1, min(distance, len(token) - 1) + 1):
+        for removed in combinations(range(len(token)), count):
+            variants.add(''.join(char for i, char in enumerate(token) if i not in removed))
+    return variants
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Число вставок, удалений и перестановок соседних букв
+
+    Замена буквы стоит как удаление и вставка: одна замененная буква
+    часто дает другое обычное слово ("идиом", "чудак"). Счет
+    прекращается, как только расстояние превысило limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous = None
+    row = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            if a[i - 1] == b[j - 1]:
+                current[j] = row[j - 1]
+            else:
+                current[j] = min(row[j], current[j - 1]) + 1
+                if (previous is not None and j > 1
+                        and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                    current[j] = min(current[j], previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous, row = row, current
+    return row[-1]
+
+
+class FuzzyIndex:
+    """
+    Индекс удалений по запрещенным словам
+
+    Короткие слова допускают одну правку, длинные (от long_length
+    букв) - две. Слова короче min_length не индексируются: у них
+    слишком много обычных соседей.
+    """
+
+    def __init__(self, min_length: int = 5, long_length: int = 8,
+                 allowed: Iterable[str] = (), cache_size: int = 65536):
+        self.min_length = min_length
+        self.long_length = long_length
+        self.entries = {}  # вариант -> [(слово в канонической форме, слово)]
+        self.max_length = 0
+        # Начала исключений: такие слова сообщения не считаются опечатками
+        self.allowed = tuple(allowed)
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def max_distance(self, length: int) -> int:
+        return 2 if length >= self.long_length else 1
+
+    def add(self, token: str, word: str):
+        """Добавить запрещенное слово в канонической форме"""
+        if len(token) < self.min_length:
+            return
+
+        self.max_length = max(self.max_length, len(token))
+        for variant in deletes(token, self.max_distance(len(token))):
+            self.entries.setdefault(variant, []).append((token, word))
+
+    def find(self, tokens: Iterable[str]) -> Optional[str]:
+        """Запрещенное слово, от которого слово сообщения отличается опечаткой"""
+        if not self.entries:
+            return None
+
+        for token in tokens:
+            if self.min_length <= len(token) <= self.max_length + 2:
+                word = self.lookup(token)
+                if word is not None:
+                    return word
+        return None
+
+    def _lookup(self, token: str) -> Optional[str]:
+        if self.allowed and token.startswith(self.allowed):
+            return None
+
+        # Кандидаты с двумя правками возможны только рядом с длинными словами
+        distance = 2 if len(token) >= self.long_length - 2 else 1
+        for variant in deletes(token, distance):
+            for candidate, word in self.entries.get(variant, ()):
+                limit = self.max_distance(len(candidate))
+                if 0 < edit_distance(token, candidate, limit) <= limit:
+                    return word
+        return None
@@ -1,4 +1,5 @@
 import logging
+import re
 import time
 from datetime import datetime, timedelta
 from telebot import TeleBot, types
@@ -9,6 +10,34 @@ from keyboards import get_admin_keyboard, get_main_keyboard, get_moderation_keyb
 
 logger = logging.getLogger(__name__)
 
+# Названия типов нарушений и этапов проверки для статистики
+VIOLATION_LABELS = {
+    'pattern_match': "прямые",
+    'no_spaces': "с разделителями",
+    'translit': "замена букв",
+    'spaced': "по буквам",
+    'stem': "словоформы",
+    'fuzzy': "опечатки",
+}
+
+STAGE_LABELS = {
+    'normalize': "нормализация",
+    'cache': "кеш",
+    'match': "поиск",
+    'chat': "слова чата",
+    'classify': "тип",
+    'stem': "основы",
+    'fuzzy': "опечатки",
+}
+
+# Символы разметки Markdown (parse_mode='Markdown'), которые экранируются вне сущностей
+MARKDOWN_SPECIAL = re.compile(r'([_*`\[])')
+
+
+def escape_markdown(text: str) -> str:
+    """Экранировать произвольный текст (слова пользователей) для parse_mode='Markdown'"""
+    return MARKDOWN_SPECIAL.sub(r'\\\1', str(text))
+
 
 class MessageHandler:
     def __init__(self, bot: TeleBot):
@@ -52,6 +81,10 @@ class MessageHandler:
         def delete_word_command(message):
             self.handle_delete_word(message)
 
+        @self.bot.message_handler(commands=['fuzzy'])
+        def fuzzy_command(message):
+            self.handle_fuzzy(message)
+
         @self.bot.message_handler(commands=['warn'])
         def warn_user_command(message):
             self.handle_warn_user(message)
@@ -121,8 +154,9 @@ class MessageHandler:
 
 **Для администраторов:**
 /admin - Панель управления
-/addword [слово] - Добавить слово в фильтр
-/delword [слово] - Удалить слово из фильтра
+/addword [слово] - Добавить слово в фильтр чата
+/delword [слово] - Удалить слово из фильтра чата
+/fuzzy on|off - Искать слова с опечатками
 /warn @username - Выдать предупреждение
 /mute @username [время] - Заглушить пользователя
 /unban @username - Разбанить пользователя
@@ -164,6 +198,9 @@ class MessageHandler:
     def handle_stats(self, message):
         """Обработка команды /stats"""
         stats = db.get_moderation_stats()
+        filter_metrics = word_filter.get_metrics()
+        user_cache = db.users.get_stats()
+        chat_actions = db.count_chat_actions(message.chat.id, datetime.now() - timedelta(days=1))
 
         stats_text = f"""
 📊 **Статистика бота:**
@@ -171,15 +208,20 @@ class MessageHandler:
 **Общая:**
 • Всего действий модерации: {stats['total_actions']}
 • Пользователей в базе: {stats['unique_users']}
+• Действий в этом чате за сутки: {chat_actions}
 • Кастомных слов: {stats['custom_words']}
 
 **Фильтрация:**
 • Базовых слов: {len(word_filter.base_words)}
-• Активных паттернов: {len(word_filter.patterns)}
+• Активных паттернов: {filter_metrics['dictionary_size']}
+• Словари: {', '.join(f"{language} {size}" for language, size in filter_metrics['languages'].items())}
+• Перезагрузок словаря: {filter_metrics['reloads']} (последняя {filter_metrics['last_reload_seconds'] * 1000:.1f} мс)
+• Кеш проверок: {filter_metrics['verdict_cache']['hit_rate']:.0%} попаданий
 • Обновлено: {datetime.now().strftime('%d.%m.%Y %H:%M')}
 
 **Система:**
 • База данных: SQLite
+• Кеш пользователей: {user_cache['users']}/{user_cache['max_users']}, {user_cache['hit_rate']:.0%} попаданий
 • Логирование: включено
 • Автообновление: каждые 24 часа
         """
@@ -234,12 +276,12 @@ class MessageHandler:
             self.bot.reply_to(message, "❌ Слово слишком короткое!")
             return
 
-        # Добавляем слово в базу данных
-        added = db.add_custom_word(word, message.from_user.id)
+        # Добавляем слово в словарь этого чата
+        added = db.add_custom_word(word, message.from_user.id, message.chat.id)
         if added:
             # Обновляем фильтр
-            word_filter.load_words()
-            self.bot.reply_to(message, f"✅ Слово `{word}` успешно добавлено в фильтр!", parse_mode='Markdown')
+            word_filter.reload_chat_words(message.chat.id)
+            self.bot.reply_to(message, f"✅ Слово `{word}` успешно добавлено в фильтр чата!", parse_mode='Markdown')
         else:
             self.bot.reply_to(message, f"❌ Слово `{word}` уже есть в фильтре!", parse_mode='Markdown')
 
@@ -263,15 +305,12 @@ class MessageHandler:
 
         word = parts[1].strip().lower()
 
-        # Удаляем слово из базы данных
+        # Удаляем слово только из словаря этого чата: общий словарь
+        # действует во всех чатах, и админ одного чата его не меняет
         try:
-            cursor = db.conn.cursor()
-            cursor.execute('UPDATE custom_words SET is_active = FALSE WHERE word = ?', (word,))
-            db.conn.commit()
-
-            if cursor.rowcount > 0:
+            if db.remove_custom_word(word, message.chat.id):
                 # Обновляем фильтр
-                word_filter.load_words()
+                word_filter.reload_chat_words(message.chat.id)
                 self.bot.reply_to(message, f"✅ Слово `{word}` успешно удалено из фильтра!", parse_mode='Markdown')
             else:
                 self.bot.reply_to(message, f"❌ Слово `{word}` не найдено в фильтре!", parse_mode='Markdown')
@@ -279,6 +318,47 @@ class MessageHandler:
             logger.error(f"Ошибка при удалении слова: {e}")
             self.bot.reply_to(message, "❌ Ошибка при удалении слова!")
 
+    def handle_fuzzy(self, message):
+        """Обработка команды /fuzzy"""
+        # Проверяем права администратора
+        try:
+            member = self.bot.get_chat_member(message.chat.id, message.from_user.id)
+            if member.status not in ['creator', 'administrator']:
+                self.bot.reply_to(message, "❌ Эта команда только для администраторов!")
+                return
+        except:
+            self.bot.reply_to(message, "❌ Не удалось проверить права доступа!")
+            return
+
+        parts = message.text.split(' ', 1)
+        if len(parts) < 2:
+            state = "включен" if word_filter.fuzzy_enabled(message.chat.id) else "выключен"
+            self.bot.reply_to(
+                message,
+                f"🔤 Поиск слов с опечатками {state}.\nИспользование: `/fuzzy on` или `/fuzzy off`",
+                parse_mode='Markdown'
+            )
+            return
+
+        argument = parts[1].strip().lower()
+        if argument not in ('on', 'off'):
+            self.bot.reply_to(message, "❌ Использование: `/fuzzy on` или `/fuzzy off`", parse_mode='Markdown')
+            return
+
+        enabled = argument == 'on'
+        try:
+            db.set_fuzzy_matching(message.chat.id, enabled)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении настройки чата: {e}")
+            self.bot.reply_to(message, "❌ Ошибка при сохранении настройки!")
+            return
+
+        word_filter.set_fuzzy(message.chat.id, enabled)
+        if enabled:
+            self.bot.reply_to(message, "✅ Поиск слов с опечатками включен!")
+        else:
+            self.bot.reply_to(message, "✅ Поиск слов с опечатками выключен!")
+
     def handle_warn_user(self, message):
         """Обработка команды /warn"""
         # Проверяем права администратора
@@ -324,15 +404,15 @@ class MessageHandler:
                     return
 
             # Увеличиваем предупреждения
-            user_data = db.get_user(target_user.id)
-            current_warnings = user_data[4] if user_data else 0
-            db.update_warnings(target_user.id, current_warnings + 1)
+            new_warnings = db.increment_warnings(
+                target_user.id, target_user.username, target_user.first_name, target_user.last_name
+            )
 
             # Определяем наказание
-            punishment = self.get_punishment(current_warnings + 1)
+            punishment = self.get_punishment(new_warnings)
 
             # Применяем наказание
-            self.apply_punishment(message.chat.id, target_user.id, current_warnings + 1, punishment)
+            self.apply_punishment(message.chat.id, target_user.id, new_warnings, punishment)
 
             # Логируем действие
             db.add_moderation_log(
@@ -345,7 +425,7 @@ class MessageHandler:
 
             self.bot.reply_to(message,
                               f"✅ Пользователю {username} выдано предупреждение!\n"
-                              f"📊 Всего предупреждений: {current_warnings + 1}/5",
+                              f"📊 Всего предупреждений: {new_warnings}/5",
                               parse_mode='Markdown'
                               )
 
@@ -425,6 +505,7 @@ class MessageHandler:
                 can_send_media_messages=False,
                 can_send_other_messages=False
             )
+            db.update_punishment(target_user.id, muted_until=until_date)
 
             # Логируем действие
             db.add_moderation_log(
@@ -473,12 +554,11 @@ class MessageHandler:
             self.bot.unban_chat_member(message.chat.id, username[1:])
 
             # Сбрасываем предупреждения
-            cursor = db.conn.cursor()
-            cursor.execute('SELECT user_id FROM users WHERE username = ?', (username[1:],))
-            user_result = cursor.fetchone()
+            user_result = db.get_user_by_username(username[1:])
 
             if user_result:
                 db.update_warnings(user_result[0], 0)
+                db.update_punishment(user_result[0], is_banned=False)
 
             # Логируем действие
             db.add_moderation_log(
@@ -506,7 +586,7 @@ class MessageHandler:
             return
 
         # Проверяем сообщение
-        has_violation, bad_word, violation_type = word_filter.check_message(message.text)
+        has_violation, bad_word, violation_type = word_filter.check_message(message.text, message.chat.id)
 
         if has_violation:
             self.handle_violation(message, bad_word, violation_type)
@@ -528,13 +608,8 @@ class MessageHandler:
             # Удаляем сообщение
             self.bot.delete_message(chat_id, message.message_id)
 
-            # Получаем текущие предупреждения
-            user_data = db.get_user(user.id)
-            current_warnings = user_data[4] if user_data else 0
-            new_warnings = current_warnings + 1
-
-            # Обновляем предупреждения в БД
-            db.update_warnings(user.id, new_warnings)
+            # Добавляем предупреждение одним запросом, наказание - по результату
+            new_warnings = db.increment_warnings(user.id, user.username, user.first_name, user.last_name)
 
             # Логируем действие
             db.add_moderation_log(
@@ -592,8 +667,10 @@ class MessageHandler:
                     can_send_media_messages=False,
                     can_send_other_messages=False
                 )
+                db.update_punishment(user_id, muted_until=until_date)
             elif punishment["type"] == "ban":
                 self.bot.ban_chat_member(chat_id, user_id)
+                db.update_punishment(user_id, is_banned=True)
         except Exception as e:
             logger.error(f"Ошибка применения наказания: {e}")
 
@@ -686,13 +763,16 @@ class MessageHandler:
 
         if action == "stats":
             stats = db.get_moderation_stats()
+            filter_stats = word_filter.get_stats(top=5)
             stats_text = f"""
 📈 **Статистика модерации:**
 
 • Всего действий: {stats['total_actions']}
 • Уникальных нарушителей: {stats['unique_users']}
 • Кастомных слов: {stats['custom_words']}
-• Активных фильтров: {len(word_filter.patterns)}
+• Активных фильтров: {word_filter.get_metrics()['dictionary_size']}
+
+{self.format_filter_stats(filter_stats)}
 
 🔄 Последнее обновление: {datetime.now().strftime('%H:%M:%S')}
             """
@@ -711,7 +791,8 @@ class MessageHandler:
 
 • Базовых слов: {len(word_filter.base_words) - len(db.get_custom_words())}
 • Пользовательских слов: {len(db.get_custom_words())}
-• Всего паттернов: {len(word_filter.patterns)}
+• Слов этого чата: {len(db.get_custom_words(call.message.chat.id))}
+• Всего паттернов: {word_filter.get_metrics()['dictionary_size']}
 
 *Используйте команды:*
 /addword [слово] - добавить слово
@@ -726,6 +807,34 @@ class MessageHandler:
                 reply_markup=get_admin_keyboard()
             )
 
+    def format_filter_stats(self, filter_stats):
+        """Блок статистики фильтра для админ-панели"""
+        verdicts = ', '.join(
+            f"{escape_markdown(VIOLATION_LABELS.get(violation_type, violation_type))} {count}"
+            for violation_type, count in sorted(filter_stats['verdicts'].items(), key=lambda item: -item[1])
+        ) or "нет"
+        # Спойлер (||слово||) есть только в MarkdownV2, а панель идет в Markdown
+        words = ', '.join(f"{escape_markdown(word)} ({count})" for word, count in filter_stats['top_words']) or "нет"
+        stages = ', '.join(
+            f"{STAGE_LABELS[stage]} {data['mean_us']:.0f} мкс ({data['share']:.0%})"
+            for stage, data in filter_stats['stages'].items() if data['calls']
+        ) or "нет замеров"
+
+        latency = "нет замеров"
+        if filter_stats['p50_us'] is not None:
+            latency = ' / '.join(
+                f"≤{value} мкс" if value != float('inf') else "более 50 мс"
+                for value in (filter_stats['p50_us'], filter_stats['p99_us'])
+            )
+
+        return f"""🔍 **Фильтр:**
+• Проверено сообщений: {filter_stats['messages']} (нарушений {filter_stats['hits']}, {filter_stats['hit_rate']:.1%})
+• По типам: {verdicts}
+• Чаще всего: {words}
+• Этапы: {stages}
+• Задержка p50 / p99: {latency}
+• Прервано по времени: {filter_stats['timeouts']}"""
+
     def handle_ban_callback(self, call, user_id):
         """Обработка бана пользователя"""
         try:
@@ -734,6 +843,7 @@ class MessageHandler:
 
             # Сбрасываем предупреждения
             db.update_warnings(user_id, 5)  # Устанавливаем максимальное количество
+            db.update_punishment(user_id, is_banned=True)
 
             # Логируем действие
             db.add_moderation_log(
@@ -781,6 +891,7 @@ class MessageHandler:
                     can_send_media_messages=True,
                     can_send_other_messages=True
                 )
+                db.update_punishment(user_id, muted_until=0)
             except:
                 pass
 
@@ -823,6 +934,18 @@ class MessageHandler:
 
             if user_data:
                 user_id, username, first_name, last_name, warnings, muted_until, is_banned, join_date, last_activity = user_data
+                # Наказания берем из кеша: там и то, что еще не дописано в БД
+                state = db.get_user_state(user_id)
+                warnings, muted_until, is_banned = state.warnings, state.muted_until, state.is_banned
+                muted_str = datetime.fromtimestamp(muted_until).strftime(
+                    '%Y-%m-%d %H:%M:%S') if muted_until > time.time() else "Нет"
+
+                recent = db.get_user_logs(user_id)
+                recent_text = ''
+                if recent:
+                    recent_text = "\n    🕒 **Последние действия:**\n" + "\n".join(
+                        f"    • {str(timestamp)[:16]} - {action}" for action, _, _, timestamp in recent
+                    )
 
                 # Форматируем даты
                 join_date_str = join_date if isinstance(join_date, str) else join_date.strftime(
@@ -839,9 +962,11 @@ class MessageHandler:
 
     📊 **Статистика:**
     • Предупреждений: {warnings}/5
+    • Мут до: {muted_str}
     • Забанен: {'Да' if is_banned else 'Нет'}
     • Дата вступления: {join_date_str}
     • Последняя активность: {last_activity_str}
+{recent_text}
 
     💬 Для снятия предупреждений нажмите "Простить"
                 """
@@ -871,14 +996,12 @@ class MessageHandler:
 
     def handle_warn_callback(self, call, user_id):
         """Обработка выдачи предупреждения"""
-        user_data = db.get_user(user_id)
-        if user_data:
-            current_warnings = user_data[4]
-            db.update_warnings(user_id, current_warnings + 1)
+        if db.get_user(user_id):
+            new_warnings = db.increment_warnings(user_id)
 
             self.bot.answer_callback_query(
                 call.id,
-                f"Пользователю выдано предупреждение! Всего: {current_warnings + 1}",
+                f"Пользователю выдано предупреждение! Всего: {new_warnings}",
                 show_alert=True
             )
 
@@ -899,6 +1022,7 @@ class MessageHandler:
                 until_date=until_date,
                 can_send_messages=False
             )
+            db.update_punishment(user_id, muted_until=until_date)
 
             self.bot.answer_callback_query(
                 call.id,
@@ -0,0 +1,625 @@
+import copy
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Формат файла скомпилированного словаря: заголовок, затем массивы
+# (little-endian, по 4 байта на элемент):
+#   first_edge[nodes + 1] - начало ребер узла,
+#   word_index[nodes] - номер слова узла или -1,
+#   edge_char[edges] - буква ребра (код символа),
+#   edge_child[edges] - номер дочернего узла,
+#   word_offset[words + 1] - смещения слов в блоке UTF-8,
+#   word_flags[words] - 1 для слов из списка исключений,
+# и в конце блок слов в UTF-8.
+MAGIC = b'WFMC'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('<4sHH32sIIII')  # magic, версия, резерв, ключ, узлы, ребра, слова, байт слов
+
+class TimeBudgetExceeded(Exception):
+    """Проверка сообщения не уложилась в отведенное время"""
+
+
+class _Node:
+    """
+    Узел префиксного дерева словаря
+
+    allowed - слово узла из списка исключений: оно не нарушение,
+    а перекрывает найденные внутри него запрещенные слова.
+    """
+
+    __slots__ = ('children', 'word', 'allowed')
+
+    def __init__(self):
+        self.children = {}
+        self.word = None
+        self.allowed = False
+
+    def copy(self) -> '_Node':
+        node = _Node()
+        node.children = dict(self.children)
+        node.word = self.word
+        node.allowed = self.allowed
+        return node
+
+
+class _CompiledTrie:
+    """Плоские массивы дерева из скомпилированного файла"""
+
+    def __init__(self, data, nodes_count: int, edges_count: int, words_count: int):
+        view = memoryview(data)
+        offset = HEADER.size
+        arrays = []
+        for typecode, size in zip('IiIIII', (nodes_count + 1, nodes_count, edges_count,
+                                             edges_count, words_count + 1, words_count)):
+            arrays.append(_int_array(view[offset:offset + 4 * size], typecode))
+            offset += 4 * size
+
+        (self.first_edge, self.word_index, self.edge_char, self.edge_child,
+         self.word_offset, self.word_flags) = arrays
+        self.words = view[offset:]
+
+    def children(self, index: int) -> dict:
+        edge_char = self.edge_char
+        edge_child = self.edge_child
+        return {
+            chr(edge_char[edge]): _LazyNode(self, edge_child[edge])
+            for edge in range(self.first_edge[index], self.first_edge[index + 1])
+        }
+
+    def word(self, index: int) -> Optional[str]:
+        word_index = self.word_index[index]
+        if word_index < 0:
+            return None
+        start, end = self.word_offset[word_index], self.word_offset[word_index + 1]
+        return bytes(self.words[start:end]).decode('utf-8')
+
+    def allowed(self, index: int) -> bool:
+        word_index = self.word_index[index]
+        return word_index >= 0 and self.word_flags[word_index] == 1
+
+
+class _LazyNode(_Node):
+    """
+    Узел скомпилированного дерева
+
+    Ребра и слово читаются из массивов при первом обращении, поэтому
+    загрузка словаря не создает объекты для всех узлов сразу.
+    """
+
+    __slots__ = ('trie', 'index')
+
+    def __init__(self, trie: _CompiledTrie, index: int):
+        self.trie = trie
+        self.index = index
+
+    def __getattr__(self, name):
+        # Вызывается, только пока слот еще не заполнен
+        if name == 'children':
+            self.children = self.trie.children(self.index)
+            return self.children
+        if name == 'word':
+            self.word = self.trie.word(self.index)
+            return self.word
+        if name == 'allowed':
+            self.allowed = self.trie.allowed(self.index)
+            return self.allowed
+        raise AttributeError(name)
+
+
+class TokenTables:
+    """
+    Таблицы токенов для набора замен
+
+    Зависят только от замен, а не от слов, поэтому один экземпляр
+    делится между всеми автоматами с теми же параметрами (словари
+    языков, автоматы чатов).
+    """
+
+    __slots__ = ('char_classes', 'tokens', 'sources', 'sequences')
+
+    def __init__(self, char_classes: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 sequences: Optional[Dict[str, Tuple[str, ...]]] = None):
+        self.char_classes = char_classes or {}
+
+        # Однобуквенные токены для каждого символа: ((буква, 1), ...)
+        self.tokens = {
+            char: tuple((letter, 1) for letter in letters)
+            for char, letters in self.char_classes.items()
+        }
+
+        # Буква словаря -> символы и последовательности, которые ее обозначают
+        self.sources = {}
+        for char, letters in self.char_classes.items():
+            for letter in letters:
+                self.sources.setdefault(letter, set()).add(char)
+        for sequence, letters in (sequences or {}).items():
+            for letter in letters:
+                self.sources.setdefault(letter, set()).add(sequence)
+
+        # Дерево токенов: символ -> [дочерние узлы, буквы токена]
+        self.sequences = {}
+        for sequence, letters in (sequences or {}).items():
+            level = self.sequences
+            entry = None
+            for char in sequence:
+                entry = level.setdefault(char, [{}, ()])
+                level = entry[0]
+            if entry is not None:
+                entry[1] = tuple(letters)
+
+
+def _int_array(view: memoryview, typecode: str):
+    """Массив из 4-байтовых little-endian чисел без копирования, если возможно"""
+    if sys.byteorder == 'little':
+        return view.cast(typecode)
+    values = array(typecode)
+    values.frombytes(view)
+    values.byteswap()
+    return values
+
+
+class WordMatcher:
+    """
+    Поиск всех слов словаря за один проход по тексту.
+
+    Слова хранятся в префиксном дереве. На каждом символе текста
+    продвигаются все активные состояния и из корня запускается новое,
+    поэтому стоимость проверки зависит от длины сообщения, а не от
+    количества слов в словаре.
+
+    char_classes - для символа текста набор букв словаря, которые он
+    может обозначать (замены вида 'a' -> 'а').
+    sequences - многосимвольные замены ('zh' -> 'ж'). Они разбираются
+    отдельным деревом токенов, поэтому проход остается линейным.
+    repeats - разрешить повторение букв (ппривветт).
+    max_states - предел активных состояний на позицию текста.
+    tables - готовые TokenTables вместо char_classes и sequences.
+
+    Слова-исключения (allowed) ищутся тем же проходом. Запрещенное
+    слово, целиком лежащее внутри найденного исключения ("хер" внутри
+    "херсон"), не выдается; побеждает самое длинное совпадение.
+    allowed_keys - ключи исключений: по ним видно, какие состояния еще
+    могут дорасти до исключения.
+
+    Возвратов нет: каждый символ обрабатывается один раз, а число
+    состояний ограничено, поэтому время проверки линейно по длине текста.
+    """
+
+    def __init__(self, words: Iterable[str] = (),
+                 char_classes: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 sequences: Optional[Dict[str, Tuple[str, ...]]] = None,
+                 repeats: bool = False, max_states: int = 1000,
+                 tables: Optional[TokenTables] = None):
+        self.root = _Node()
+        if tables is None:
+            tables = TokenTables(char_classes, sequences)
+        self.char_classes = tables.char_classes
+        self.tokens = tables.tokens
+        self.sources = tables.sources
+        self.sequences = tables.sequences
+        self.repeats = repeats
+        self.max_states = max_states
+        self.size = 0
+        self.allowed_size = 0
+
+        self.allowed_keys = ()
+        self._starts = (None, None)
+        self._allow_nodes = (None, frozenset())
+        self._exact = (None, None)
+
+        for word in words:
+            self.add(word)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, key: str, word: Optional[str] = None, allowed: bool = False) -> bool:
+        """
+        Добавить слово в дерево
+
+        key - каноническая форма, по которой идет поиск,
+        word - слово, которое возвращается при совпадении,
+        allowed - слово из списка исключений.
+        """
+        if not key:
+            return False
+
+        node = self.root
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _Node()
+            node = child
+
+        if node.word is not None:
+            return False
+
+        node.word = word or key
+        node.allowed = allowed
+        if allowed:
+            self.allowed_size += 1
+            self.allowed_keys += (key,)
+        else:
+            self.size += 1
+        return True
+
+    def with_word(self, key: str, word: Optional[str] = None) -> 'WordMatcher':
+        """
+        Новый автомат с добавленным словом
+
+        Копируются только узлы на пути слова, остальное дерево общее,
+        поэтому стоимость пропорциональна длине слова. Текущий автомат
+        не меняется и может использоваться параллельно.
+        """
+        path = self._path(key)
+        last = path[-1]
+        if not key or (last is not None and last.word is not None and not last.allowed):
+            return self
+
+        # Запрещенное слово вытесняет исключение с тем же ключом
+        node = last.copy() if last is not None else _Node()
+        node.word = word or key
+        node.allowed = False
+        matcher = self._replace_path(key, path, node, self.size + 1)
+        if last is not None and last.allowed:
+            matcher.allowed_size -= 1
+        return matcher
+
+    def without_word(self, key: str, word: Optional[str] = None) -> 'WordMatcher':
+        """
+        Новый автомат без слова (копируется только путь слова)
+
+        word - удалить, только если ключ ведет к этому слову: тот же ключ
+        может принадлежать другому слову словаря.
+        """
+        path = self._path(key)
+        if not key or path[-1] is None or path[-1].word is None or path[-1].allowed:
+            return self
+        if word is not None and path[-1].word != word:
+            return self
+
+        node = None
+        if path[-1].children:
+            node = path[-1].copy()
+            node.word = None
+        return self._replace_path(key, path, node, self.size - 1)
+
+    def _path(self, key: str) -> list:
+        """Узлы на пути ключа (None там, где путь обрывается)"""
+        path = [self.root]
+        node = self.root
+        for char in key:
+            node = node.children.get(char) if node is not None else None
+            path.append(node)
+        return path
+
+    def _replace_path(self, key: str, path: list, node: Optional[_Node], size: int) -> 'WordMatcher':
+        """Собрать новый корень, заменив последний узел пути"""
+        for depth in range(len(key) - 1, -1, -1):
+            parent = path[depth].copy() if path[depth] is not None else _Node()
+            if node is None:
+                parent.children.pop(key[depth], None)
+                # Пустые промежуточные узлы удаляем
+                if not parent.children and parent.word is None and depth > 0:
+                    continue
+            else:
+                parent.children[key[depth]] = node
+            node = parent
+
+        matcher = copy.copy(self)
+        matcher.root = node if node is not None else _Node()
+        matcher.size = size
+        return matcher
+
+    def dump(self, path: Path, key: bytes):
+        """
+        Сохранить дерево в бинарный файл
+
+        key - 32 байта хеша входных данных. Запись атомарная: файл
+        пишется рядом и подменяется через os.replace.
+        """
+        order = [self.root]
+        first_edge = array('I')
+        word_index = array('i')
+        edge_char = array('I')
+        edge_child = array('I')
+        word_offset = array('I', [0])
+        word_flags = array('I')
+        words = bytearray()
+
+        for node in order:
+            first_edge.append(len(edge_char))
+            for char in sorted(node.children):
+                edge_char.append(ord(char))
+                edge_child.append(len(order))
+                order.append(node.children[char])
+
+            if node.word is not None:
+                word_index.append(len(word_offset) - 1)
+                words += node.word.encode('utf-8')
+                word_offset.append(len(words))
+                word_flags.append(1 if node.allowed else 0)
+            else:
+                word_index.append(-1)
+        first_edge.append(len(edge_char))
+
+        arrays = (first_edge, word_index, edge_char, edge_child, word_offset, word_flags)
+        if sys.byteorder != 'little':
+            for values in arrays:
+                values.byteswap()
+
+        path = Path(path)
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, key, len(order),
+                                len(edge_char), len(word_offset) - 1, len(words)))
+            for values in arrays:
+                f.write(values.tobytes())
+            f.write(words)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, key: bytes, shared: bool = False,
+             allowed_keys: Iterable[str] = (), **options) -> Optional['WordMatcher']:
+        """
+        Загрузить дерево из бинарного файла
+
+        Возвращает None, если файла нет, он другой версии или собран
+        из других входных данных. allowed_keys - ключи исключений
+        словаря (в файле хранятся только их слова), options - параметры
+        конструктора.
+
+        shared - отобразить файл в память (mmap) только для чтения.
+        Массивы дерева тогда лежат в страничном кеше и одна физическая
+        копия делится между всеми процессами бота; в памяти процесса
+        остаются только узлы, до которых дошла проверка.
+        """
+        try:
+            if shared:
+                with open(path, 'rb') as f:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = Path(path).read_bytes()
+            magic, version, _, file_key, nodes_count, edges_count, words_count, words_size = \
+                HEADER.unpack_from(data)
+        except (OSError, ValueError, struct.error):
+            return None
+
+        if magic != MAGIC or version != FORMAT_VERSION or file_key != key:
+            return None
+
+        arrays_size = 4 * (2 * nodes_count + 1 + 2 * edges_count + 2 * words_count + 1)
+        if len(data) != HEADER.size + arrays_size + words_size:
+            return None
+
+        trie = _CompiledTrie(data, nodes_count, edges_count, words_count)
+        matcher = cls(**options)
+        matcher.root = _LazyNode(trie, 0)
+        matcher.allowed_size = sum(trie.word_flags)
+        matcher.size = words_count - matcher.allowed_size
+        matcher.allowed_keys = tuple(allowed_keys)
+        return matcher
+
+    def allow_nodes(self) -> frozenset:
+        """
+        Узлы на путях исключений (без корня)
+
+        Только состояния в этих узлах могут дорасти до исключения и
+        перекрыть придержанное слово. Кешируется для текущего корня.
+        """
+        root, nodes = self._allow_nodes
+        if root is self.root:
+            return nodes
+
+        found = set()
+        for key in self.allowed_keys:
+            node = self.root
+            for char in key:
+                node = node.children.get(char)
+                if node is None:
+                    break
+                found.add(node)
+        nodes = frozenset(found)
+        self._allow_nodes = (self.root, nodes)
+        return nodes
+
+    def exact(self) -> 'WordMatcher':
+        """
+        Тот же словарь без неоднозначных замен и повторов букв
+
+        На каждой позиции живет не больше состояний, чем букв в самом
+        длинном слове, поэтому проход гарантированно линеен и годится
+        как запасная проверка без ограничения времени. Кешируется для
+        текущего корня.
+        """
+        root, matcher = self._exact
+        if root is self.root:
+            return matcher
+
+        matcher = copy.copy(self)
+        matcher.char_classes = {}
+        matcher.tokens = {}
+        matcher.sources = {}
+        matcher.sequences = {}
+        matcher.repeats = False
+        matcher._starts = (None, None)
+        self._exact = (self.root, matcher)
+        return matcher
+
+    def start_pattern(self):
+        """
+        Регулярное выражение для мест, где может начаться слово
+
+        Совпадение начала слова требует двух первых токенов слова подряд
+        (или одного, если слово из одной буквы). Пока активных состояний
+        нет, проверка перескакивает к следующему такому месту поиском
+        на C вместо разбора каждого символа. Кешируется для текущего корня.
+        """
+        root, pattern = self._starts
+        if root is self.root:
+            return pattern
+
+        alternatives = []
+        for letter, node in sorted(self.root.children.items()):
+            if node.word is not None:
+                alternatives.append(self._token_pattern({letter}))
+                continue
+
+            followers = set(node.children)
+            if self.repeats:
+                followers.add(letter)
+            alternatives.append(self._token_pattern({letter}) + self._token_pattern(followers))
+
+        pattern = re.compile('|'.join(alternatives) if alternatives else r'(?!)')
+        self._starts = (self.root, pattern)
+        return pattern
+
+    def _token_pattern(self, letters: set) -> str:
+        """Регулярное выражение для токена, обозначающего одну из букв"""
+        chars = set(letters)
+        sequences = set()
+        for letter in letters:
+            for source in self.sources.get(letter, ()):
+                (chars if len(source) == 1 else sequences).add(source)
+
+        options = [re.escape(sequence) for sequence in sorted(sequences)]
+        options.append('[' + ''.join(re.escape(char) for char in sorted(chars)) + ']')
+        return '(?:' + '|'.join(options) + ')'
+
+    def finditer(self, text: str, deadline: Optional[float] = None, pos: int = 0,
+                 allow_check: Optional[Callable[[int, int, int, int], bool]] = None
+                 ) -> Iterator[Tuple[int, int, str]]:
+        """
+        Найти все вхождения запрещенных слов
+
+        Возвращает кортежи (начало, конец, слово) по мере обнаружения.
+        deadline - момент time.perf_counter(), после которого проверка
+        прерывается исключением TimeBudgetExceeded.
+        pos - позиция, с которой начинать поиск.
+        allow_check - проверка, может ли найденное исключение перекрыть
+        слово: (начало исключения, конец, начало слова, конец).
+
+        Если в словаре есть исключения, найденное слово придерживается,
+        пока живы состояния на путях исключений, начавшиеся не позже
+        него: из них еще может вырасти перекрывающее исключение.
+        """
+        root = self.root
+        has_allowed = self.allowed_size > 0
+        allow_nodes = self.allow_nodes() if has_allowed else frozenset()
+        held = []  # придержанные совпадения (начало, конец, слово)
+        allows = []  # найденные исключения (начало, конец)
+        skip = self.start_pattern().search
+        single = self.tokens
+        sequences = self.sequences
+        repeats = self.repeats
+        max_states = self.max_states
+        length = len(text)
+
+        # позиция в тексте -> {(узел, последняя буква): начало совпадения}
+        pending = {}
+
+        i = pos - 1
+        steps = 0
+        while True:
+            i += 1
+            if held:
+                live = None
+                if i < length:
+                    live = min((start for states in pending.values()
+                                for (node, _), start in states.items() if node in allow_nodes),
+                               default=None)
+                ready, held = self._release(held, allows, live, allow_check)
+                yield from ready
+
+            if i >= length:
+                return
+            active = pending.pop(i, None)
+            if not active and not pending:
+                found = skip(text, i)
+                if found is None:
+                    return
+                i = found.start()
+            char = text[i]
+
+            steps += 1
+            if deadline is not None and not steps & 0xFF and time.perf_counter() > deadline:
+                raise TimeBudgetExceeded(f"Превышено время проверки на позиции {i} из {length}")
+
+            # Токены, начинающиеся в позиции i: (буква, длина)
+            tokens = single.get(char) or ((char, 1),)
+            entry = sequences.get(char)
+            if entry is not None:
+                tokens = list(tokens)
+                j = i + 1
+                while j < length:
+                    entry = entry[0].get(text[j])
+                    if entry is None:
+                        break
+                    j += 1
+                    for letter in entry[1]:
+                        tokens.append((letter, j - i))
+
+            root_state = ((root, None), i)
+            states = chain(active.items(), (root_state,)) if active else (root_state,)
+
+            for (node, last), start in states:
+                children = node.children
+                for letter, size in tokens:
+                    if repeats and letter == last:
+                        targets = pending.setdefault(i + size, {})
+                        if len(targets) < max_states:
+                            targets.setdefault((node, last), start)
+
+                    child = children.get(letter)
+                    if child is None:
+                        continue
+
+                    targets = pending.setdefault(i + size, {})
+                    key = (child, letter)
+                    if key not in targets and len(targets) < max_states:
+                        targets[key] = start
+                        if child.word is not None:
+                            if child.allowed:
+                                allows.append((start, i + size))
+                            elif has_allowed:
+                                held.append((start, i + size, child.word))
+                            else:
+                                yield start, i + size, child.word
+
+    @staticmethod
+    def _release(held: List[tuple], allows: List[tuple], live: Optional[int],
+                 allow_check: Optional[Callable[[int, int, int, int], bool]]) -> Tuple[list, list]:
+        """
+        Разобрать придержанные совпадения
+
+        Перекрытые исключением отбрасываются, остальные выдаются, если
+        живых состояний с началом не позже совпадения (live) не осталось.
+        Возвращает (готовые к выдаче, оставшиеся).
+        """
+        ready = []
+        waiting = []
+        for hit in held:
+            start, end, _ = hit
+            if any(allow_start <= start and end <= allow_end
+                   and (allow_check is None or allow_check(allow_start, allow_end, start, end))
+                   for allow_start, allow_end in allows):
+                continue
+            if live is not None and live <= start:
+                waiting.append(hit)
+            else:
+                ready.append(hit)
+        return ready, waiting
+
+    def search(self, text: str, deadline: Optional[float] = None) -> Optional[str]:
+        """Первое найденное слово или None"""
+        for _, _, word in self.finditer(text, deadline):
+            return word
+        return None
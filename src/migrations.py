@@ -0,0 +1,140 @@
+"""Версии схемы базы данных (номер примененной версии - в PRAGMA user_version)"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def columns(cursor, table: str) -> list:
+    """Колонки таблицы; пустой список, если таблицы нет"""
+    return [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+
+
+def base_schema(cursor):
+    """Таблицы первой версии бота"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            warnings INTEGER DEFAULT 0,
+            muted_until INTEGER DEFAULT 0,
+            is_banned BOOLEAN DEFAULT FALSE,
+            join_date TIMESTAMP,
+            last_activity TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS moderation_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            chat_id INTEGER,
+            action TEXT,
+            reason TEXT,
+            message_text TEXT,
+            timestamp TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS custom_words (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            word TEXT UNIQUE,
+            added_by INTEGER,
+            added_at TIMESTAMP,
+            is_active BOOLEAN DEFAULT TRUE
+        )
+    ''')
+
+
+def custom_words_per_chat(cursor):
+    """Словари чатов: chat_id = 0 - общие слова, слово уникально в чате"""
+    if 'chat_id' not in columns(cursor, 'custom_words'):
+        # UNIQUE (word) на месте не изменить - пересоздаем таблицу
+        cursor.execute('ALTER TABLE custom_words RENAME TO custom_words_old')
+        cursor.execute('''
+            CREATE TABLE custom_words (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                word TEXT,
+                chat_id INTEGER NOT NULL DEFAULT 0,
+                added_by INTEGER,
+                added_at TIMESTAMP,
+                is_active BOOLEAN DEFAULT TRUE,
+                UNIQUE (word, chat_id)
+            )
+        ''')
+        cursor.execute('''
+            INSERT INTO custom_words (id, word, added_by, added_at, is_active)
+            SELECT id, word, added_by, added_at, is_active FROM custom_words_old
+        ''')
+        cursor.execute('DROP TABLE custom_words_old')
+
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_custom_words_chat
+        ON custom_words (chat_id, is_active)
+    ''')
+
+
+def chat_settings(cursor):
+    """Настройки чатов (поиск с опечатками)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_settings (
+            chat_id INTEGER PRIMARY KEY,
+            fuzzy_matching BOOLEAN
+        )
+    ''')
+
+
+def lookup_indexes(cursor):
+    """Индексы для поиска по username и выборок лога по пользователю и чату"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_logs_chat_time
+        ON moderation_logs (chat_id, timestamp)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_logs_user_time
+        ON moderation_logs (user_id, timestamp)
+    ''')
+    # Свежая статистика для планировщика запросов
+    cursor.execute('ANALYZE')
+
+
+# Версия схемы = номер миграции, считая с 1. Новые миграции только
+# добавляются в конец, примененные не меняются. Базы до появления версий
+# (user_version = 0) уже могут содержать часть схемы, поэтому повторное
+# применение миграции ничего не должно ломать.
+MIGRATIONS = [
+    base_schema,
+    custom_words_per_chat,
+    chat_settings,
+    lookup_indexes,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn) -> int:
+    """Применить недостающие миграции; возвращает версию схемы"""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version > SCHEMA_VERSION:
+        logger.warning(f"Схема БД версии {version} новее кода ({SCHEMA_VERSION}), миграции пропущены")
+        return version
+
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        cursor = conn.cursor()
+        # Миграция и новый номер в одной транзакции: прерванная откатится целиком
+        try:
+            cursor.execute('BEGIN')
+            migration(cursor)
+            cursor.execute(f'PRAGMA user_version = {number}')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        logger.info(f"Схема БД обновлена до версии {number}: {migration.__doc__}")
+    return SCHEMA_VERSION
@@ -0,0 +1,312 @@
+import json
+import logging
+import re
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Разделитель сообщений при пакетной проверке: его нет ни в словаре,
+# ни среди замен, поэтому на нем обрываются все совпадения
+BATCH_SEPARATOR = '\0'
+
+# Алфавиты сообщений для выбора словарей языков
+SCRIPTS = ('cyrillic', 'latin')
+
+# Разделители внутри слова: любые пробельные символы, а также - _ .
+SEPARATORS = frozenset(
+    [char for char in map(chr, range(0x3001)) if char.isspace()] + ['-', '_', '.']
+)
+
+
+def build_char_classes(replacements: Dict[str, Iterable[str]]) -> Dict[str, Tuple[str, ...]]:
+    """Для каждого символа - буквы словаря, которые он может заменять"""
+    classes = {}
+    for letter, variants in replacements.items():
+        for variant in variants:
+            if len(variant) != 1:
+                continue
+            classes.setdefault(variant, [variant])
+            if letter not in classes[variant]:
+                classes[variant].append(letter)
+
+    return {char: tuple(letters) for char, letters in classes.items()}
+
+
+def load_confusables(path) -> dict:
+    """
+    Таблица похожих символов для TextNormalizer
+
+    Возвращает аргументы confusables и ignored; без файла таблица
+    пустая, и фильтр работает только с CHAR_REPLACEMENTS.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Таблица похожих символов не загружена: {e}")
+        return {'confusables': {}, 'ignored': ''}
+
+    return {'confusables': data.get('fold', {}), 'ignored': data.get('ignore', '')}
+
+
+def mirror_char_classes(char_classes: Dict[str, Tuple[str, ...]]) -> Dict[str, Tuple[str, ...]]:
+    """
+    Классы символов в обе стороны
+
+    Для словарей на латинице: буква кириллицы может стоять вместо
+    латинской, которая на нее заменяется ("fuсk" с кириллической "с").
+    """
+    mirrored = {char: list(letters) for char, letters in char_classes.items()}
+    for char, letters in char_classes.items():
+        for letter in letters:
+            variants = mirrored.setdefault(letter, [letter])
+            if char not in variants:
+                variants.append(char)
+
+    return {char: tuple(letters) for char, letters in mirrored.items()}
+
+
+class NormalizedText:
+    """
+    Каноническая форма сообщения
+
+    text - нижний регистр, замены и похожие символы свернуты,
+    разделители и невидимые символы убраны, повторы букв схлопнуты.
+    raw - те же позиции, но без свертки замен.
+    offsets - индекс символа исходного текста для каждой позиции text.
+    gaps - был ли разделитель перед позицией text.
+    """
+
+    __slots__ = ('original', 'text', 'raw', 'offsets', 'gaps')
+
+    def __init__(self, original: str, text: str, raw: str,
+                 offsets: List[int], gaps: List[bool]):
+        self.original = original
+        self.text = text
+        self.raw = raw
+        self.offsets = offsets
+        self.gaps = gaps
+
+
+class TextNormalizer:
+    """Приведение текста к канонической форме за один проход"""
+
+    def __init__(self, replacements: Dict[str, Iterable[str]],
+                 separators: Iterable[str] = SEPARATORS,
+                 confusables: Dict[str, str] = None, ignored: Iterable[str] = ()):
+        self.separators = frozenset(separators)
+        self.char_classes = build_char_classes(replacements)
+        self.mirrored_classes = mirror_char_classes(self.char_classes)
+        # Невидимые символы удаляются, но разделителем не считаются
+        self.ignored = frozenset(ignored) - self.separators - {BATCH_SEPARATOR}
+
+        # Однозначные замены (латиница, цифры) сворачиваем сразу в букву,
+        # неоднозначные (p -> п/р) оставляем автомату
+        self.fold_table = {}
+        ambiguous = set()
+        for char, letters in self.char_classes.items():
+            others = [letter for letter in letters if letter != char]
+            if len(others) > 1:
+                ambiguous.add(char)
+            elif len(others) == 1 and char not in replacements:
+                self.fold_table[ord(char)] = others[0]
+
+        # Похожие символы других алфавитов (ｐ, ρ, ⲣ) сворачиваем в ту же
+        # таблицу: за один translate и сразу в букву, если замена однозначна
+        for char, target in (confusables or {}).items():
+            if char in self.char_classes or char in self.separators or char in self.ignored:
+                continue
+            if target in self.separators:
+                continue
+            self.fold_table[ord(char)] = self.fold_table.get(ord(target), target)
+
+        # Повторы неоднозначных символов не схлопываем: "yy" может быть "уй"
+        self.ambiguous = frozenset(ambiguous)
+
+        # Буквы, которые можно пропустить ('ь': ['ь', '']): слова словаря
+        # попадают в автомат и без них ("дерьмо" -> "дермо")
+        self.optional = frozenset(letter for letter, variants in replacements.items() if '' in variants)
+
+        # Для быстрой канонической формы: удаление разделителей, свертка
+        # и схлопывание повторов регулярками и translate на C
+        self.separators_re = re.compile(self._char_set(self.separators) + '+')
+        # Свертка и удаление невидимых символов одним translate; он нужен,
+        # только если в тексте есть такие символы. Символы вне BMP (эмодзи,
+        # математические буквы) проверяем одним диапазоном: класс из сотен
+        # таких диапазонов re перебирает по одному
+        self.canonical_table = dict(self.fold_table)
+        self.canonical_table.update(dict.fromkeys(map(ord, self.ignored)))
+        basic = [chr(code) for code in self.canonical_table if code < 0x10000]
+        self.fold_re = re.compile(f'{self._char_set(basic)}|[\U00010000-\U0010ffff]')
+        # Слова сообщения: буквы и цифры, допускаются разделители внутри (за-лу-па)
+        inner = self._char_set(char for char in self.separators if not char.isspace())
+        self.inner_separators_re = re.compile(inner)
+        self.word_re = re.compile(rf'\w+(?:(?:{inner})+\w+)*')
+        self.repeats_re = re.compile(f'({self._char_set(self.ambiguous, negate=True)})\\1+')
+        # В склеенной пачке разделитель сообщений не схлопывается,
+        # иначе пустые сообщения сдвинут границы
+        self.batch_repeats_re = re.compile(
+            f'({self._char_set(self.ambiguous | {BATCH_SEPARATOR}, negate=True)})\\1+'
+        )
+
+        # Алфавиты: кириллица и любые другие буквы (латиница, греческий...)
+        self.cyrillic_re = re.compile('[\u0400-\u052f]')
+        self.latin_re = re.compile(r'[^\W\d_\u0400-\u052f]')
+        self.script_sets = {
+            (cyrillic, latin): frozenset(
+                script for script, present in zip(SCRIPTS, (cyrillic, latin)) if present
+            )
+            for cyrillic in (False, True) for latin in (False, True)
+        }
+
+        # Многобуквенные замены (zh -> ж, sch -> щ) в канонической форме,
+        # их разбирает автомат как отдельные токены
+        sequences = {}
+        for letter, variants in replacements.items():
+            for variant in variants:
+                if len(variant) > 1:
+                    key = self.normalize(variant).text
+                    sequences.setdefault(key, [])
+                    if letter not in sequences[key]:
+                        sequences[key].append(letter)
+        self.sequences = {key: tuple(letters) for key, letters in sequences.items()}
+
+    def normalize(self, text: str) -> NormalizedText:
+        """Нормализовать текст с сохранением карты смещений"""
+        lowered = self._lower(text)
+        folded = lowered.translate(self.fold_table)
+        separators = self.separators
+        ignored = self.ignored
+        ambiguous = self.ambiguous
+
+        chars = []
+        raw = []
+        offsets = []
+        gaps = []
+        last = None
+        gap = False
+
+        for i, char in enumerate(folded):
+            if char in ignored:
+                continue
+            if char in separators:
+                gap = True
+                continue
+            if char == last and char not in ambiguous:
+                continue
+
+            chars.append(char)
+            raw.append(lowered[i])
+            offsets.append(i)
+            gaps.append(gap)
+            last = char
+            gap = False
+
+        return NormalizedText(text, ''.join(chars), ''.join(raw), offsets, gaps)
+
+    def canonical(self, text: str) -> str:
+        """
+        Только каноническая форма, без карты смещений
+
+        Совпадает с normalize(text).text, но считается на C, поэтому
+        годится для проверки каждого сообщения; полную разметку нужно
+        строить только для найденных нарушений.
+        """
+        return self.repeats_re.sub(r'\1', self._fold(self._lower(text)))
+
+    def canonical_many(self, texts: List[str]) -> List[str]:
+        """
+        Канонические формы пачки сообщений
+
+        Пачка склеивается через BATCH_SEPARATOR и обрабатывается одним
+        вызовом каждой операции. Если символ-разделитель встречается
+        в самих сообщениях, они обрабатываются по одному.
+        """
+        if not texts:
+            return []
+
+        joined = BATCH_SEPARATOR.join(texts)
+        if joined.count(BATCH_SEPARATOR) != len(texts) - 1:
+            return [self.canonical(text) for text in texts]
+
+        lowered = joined.lower()
+        if len(lowered) != len(joined):
+            lowered = BATCH_SEPARATOR.join(map(self._lower, texts))
+
+        return self.batch_repeats_re.sub(r'\1', self._fold(lowered)).split(BATCH_SEPARATOR)
+
+    def scripts(self, text: str) -> frozenset:
+        """
+        Алфавиты букв сообщения (из SCRIPTS); пустое множество, если букв нет
+
+        Смотрится исходный текст: в канонической форме латиница уже
+        свернута в кириллицу.
+        """
+        return self.script_sets[(self.cyrillic_re.search(text) is not None,
+                                 self.latin_re.search(text) is not None)]
+
+    def tokens(self, text: str) -> List[str]:
+        """
+        Слова сообщения в канонической форме
+
+        Как canonical, но пробелы и знаки препинания между словами
+        сохраняются как границы.
+        """
+        lowered = self._lower(text)
+        if self.fold_re.search(lowered):
+            lowered = lowered.translate(self.canonical_table)
+        words = ' '.join(self.word_re.findall(lowered))
+        return self.repeats_re.sub(r'\1', self.inner_separators_re.sub('', words)).split()
+
+    def _lower(self, text: str) -> str:
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Редкие символы, которые в нижнем регистре меняют длину
+            lowered = ''.join(char.lower()[:1] for char in text)
+        return lowered
+
+    def _fold(self, text: str) -> str:
+        """Свернуть однозначные замены, убрать невидимые символы и разделители"""
+        if self.fold_re.search(text):
+            text = text.translate(self.canonical_table)
+        return self.separators_re.sub('', text)
+
+    @staticmethod
+    def _char_set(chars: Iterable[str], negate: bool = False) -> str:
+        """
+        Класс символов для регулярного выражения
+
+        Соседние коды записываются диапазонами: класс из тысяч отдельных
+        символов (таблица похожих символов) re проверяет перебором.
+        """
+        codes = sorted(set(map(ord, chars)))
+        ranges = []
+        for code in codes:
+            if ranges and ranges[-1][1] == code - 1:
+                ranges[-1][1] = code
+            else:
+                ranges.append([code, code])
+
+        body = ''.join(
+            re.escape(chr(first)) if first == last else f'{re.escape(chr(first))}-{re.escape(chr(last))}'
+            for first, last in ranges
+        )
+        if not body:
+            return r'(?s:.)' if negate else r'(?!)'
+        return f'[^{body}]' if negate else f'[{body}]'
+
+    def normalize_word(self, word: str) -> str:
+        """Каноническая форма слова словаря"""
+        return self.normalize(word).text
+
+    def word_keys(self, word: str) -> List[str]:
+        """Ключи слова словаря: каноническая форма, затем она же без необязательных букв"""
+        keys = ['']
+        for char in self.normalize_word(word):
+            extended = [key + char for key in keys]
+            keys = extended + keys if char in self.optional else extended
+
+        # Без пропущенной буквы могут сойтись одинаковые соседние
+        unique = dict.fromkeys(self.repeats_re.sub(r'\1', key) for key in keys)
+        return [key for key in unique if key]
+
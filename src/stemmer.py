@@ -0,0 +1,132 @@
+"""
+Стеммер русского языка на правилах (алгоритм Snowball Porter)
+
+Отрезает окончания, чтобы разные формы слова сводились к одной основе:
+"залупа", "залупой", "залупиться" -> "залуп".
+"""
+
+VOWELS = frozenset('аеиоуыэюя')
+
+# Окончания групп 1 допустимы только после "а" или "я"
+PERFECTIVE_GERUND = {
+    **dict.fromkeys(('в', 'вши', 'вшись'), 1),
+    **dict.fromkeys(('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'), 2),
+}
+
+ADJECTIVE = dict.fromkeys((
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым',
+    'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+), 2)
+
+PARTICIPLE = {
+    **dict.fromkeys(('ем', 'нн', 'вш', 'ющ', 'щ'), 1),
+    **dict.fromkeys(('ивш', 'ывш', 'ующ'), 2),
+}
+
+REFLEXIVE = dict.fromkeys(('ся', 'сь'), 2)
+
+VERB = {
+    **dict.fromkeys((
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет', 'ют',
+        'ны', 'ть', 'ешь', 'нно',
+    ), 1),
+    **dict.fromkeys((
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй', 'ил',
+        'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит', 'ыт',
+        'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ), 2),
+}
+
+NOUN = dict.fromkeys((
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией',
+    'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о', 'у', 'ах',
+    'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+), 2)
+
+DERIVATIONAL = ('ость', 'ост')
+SUPERLATIVE = ('ейше', 'ейш')
+
+
+def _regions(word: str):
+    """Начала областей RV и R2"""
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+
+    def after_syllable(start):
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = after_syllable(0)
+    return rv, after_syllable(r1)
+
+
+def _strip(rv: str, endings: dict):
+    """
+    Отрезать самое длинное окончание из набора
+
+    Возвращает основу или None, если окончания нет или не выполнено
+    условие группы 1. Более короткие окончания при этом не пробуются.
+    """
+    for size in range(min(len(rv), 6), 0, -1):
+        group = endings.get(rv[-size:])
+        if group is None:
+            continue
+        if group == 1 and not rv[:-size].endswith(('а', 'я')):
+            return None
+        return rv[:-size]
+    return None
+
+
+def stem(word: str) -> str:
+    """Основа слова в нижнем регистре"""
+    word = word.lower().replace('ё', 'е')
+    rv_start, r2_start = _regions(word)
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1: деепричастие или (возвратность +) прилагательное, глагол, существительное
+    result = _strip(rv, PERFECTIVE_GERUND)
+    if result is None:
+        reflexive = _strip(rv, REFLEXIVE)
+        if reflexive is not None:
+            rv = reflexive
+
+        result = _strip(rv, ADJECTIVE)
+        if result is not None:
+            participle = _strip(result, PARTICIPLE)
+            if participle is not None:
+                result = participle
+        else:
+            result = _strip(rv, VERB)
+            if result is None:
+                result = _strip(rv, NOUN)
+            if result is None:
+                result = rv
+    rv = result
+
+    # Шаг 2: конечное "и"
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательное окончание в R2
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and len(prefix) + len(rv) - len(ending) >= r2_start:
+            rv = rv[:-len(ending)]
+            break
+
+    # Шаг 4: превосходная степень, двойное "н", мягкий знак
+    for ending in SUPERLATIVE:
+        if rv.endswith(ending):
+            rv = rv[:-len(ending)]
+            if rv.endswith('нн'):
+                rv = rv[:-1]
+            break
+    else:
+        if rv.endswith('нн') or rv.endswith('ь'):
+            rv = rv[:-1]
+
+    return prefix + rv
@@ -0,0 +1,176 @@
+"""
+Сборка таблицы свертки похожих символов (data/confusables.json).
+
+Таблица строится заранее, чтобы бот не разбирал Unicode при запуске:
+
+  fold   - символ -> буква или цифра, на которую он похож: формы NFKC
+           (полноширинные, математические, в кружках), буквы с
+           диакритикой, греческие и прочие двойники кириллицы;
+  ignore - невидимые символы и комбинируемые знаки (нулевой ширины,
+           мягкий перенос, ударения, селекторы вариантов, заполнители
+           хангыля, пустой символ Брайля), которые при проверке просто
+           удаляются.
+
+Символы из Config.CHAR_REPLACEMENTS, ASCII и русский алфавит не
+трогаются: их обрабатывает нормализатор. Если под рукой есть
+confusables.txt из Unicode (https://www.unicode.org/Public/security/),
+его однобуквенные соответствия добавляются к встроенному списку.
+
+Запуск: python tools/build_confusables.py [--confusables confusables.txt] [--output путь]
+"""
+import argparse
+import json
+import sys
+import unicodedata
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from config import Config
+from normalizer import SEPARATORS
+
+OUTPUT = Path(__file__).parent.parent / 'data' / 'confusables.json'
+
+RUSSIAN = set('абвгдеёжзийклмнопрстуфхцчшщъыьэюя')
+
+# Default_Ignorable_Code_Point из DerivedCoreProperties.txt: в unicodedata
+# этого свойства нет, а часть символов - буквы (заполнители хангыля U+115F,
+# U+3164, U+FFA0), которые по категории не отличить от обычных
+DEFAULT_IGNORABLE = (
+    (0x00AD, 0x00AD), (0x034F, 0x034F), (0x061C, 0x061C), (0x115F, 0x1160),
+    (0x17B4, 0x17B5), (0x180B, 0x180F), (0x200B, 0x200F), (0x202A, 0x202E),
+    (0x2060, 0x206F), (0x3164, 0x3164), (0xFE00, 0xFE0F), (0xFEFF, 0xFEFF),
+    (0xFFA0, 0xFFA0), (0xFFF0, 0xFFF8), (0x1BCA0, 0x1BCA3), (0x1D173, 0x1D17A),
+    (0xE0000, 0xE0FFF),
+)
+
+# Видимо пустые символы вне этого свойства
+BLANKS = {'\u2800'}  # Пустой символ Брайля
+
+
+def is_ignorable(char):
+    """Символ не отображается: удаляется при проверке"""
+    code = ord(char)
+    if char in BLANKS or any(first <= code <= last for first, last in DEFAULT_IGNORABLE):
+        return True
+    return unicodedata.category(char) in ('Cf', 'Mn', 'Me')
+
+# Двойники, которых нет в NFKC: символ -> буква, на которую он похож
+HOMOGLYPHS = {
+    # Греческий
+    'α': 'а', 'ο': 'о', 'σ': 'о', 'ρ': 'р', 'κ': 'к', 'χ': 'х', 'τ': 'т',
+    'γ': 'у', 'π': 'п', 'ε': 'е', 'ν': 'v', 'ι': 'i', 'ϲ': 'с', 'ϳ': 'j',
+    'ϐ': 'в', 'ϰ': 'к', 'ϱ': 'р', 'ϻ': 'м',
+    # Кириллица других языков
+    'і': 'i', 'ї': 'i', 'ј': 'j', 'ѕ': 's', 'є': 'е', 'ґ': 'г', 'ў': 'у',
+    'ԁ': 'd', 'ӏ': 'l', 'һ': 'х', 'ԛ': 'q', 'ԝ': 'w', 'ү': 'у', 'ӄ': 'к',
+    'ҫ': 'с', 'ҙ': 'з', 'ӓ': 'а', 'ӧ': 'о', 'ӱ': 'у', 'ѐ': 'е', 'ѝ': 'и',
+    # Латиница: малые прописные и похожие буквы
+    'ɑ': 'а', 'ʙ': 'в', 'ᴦ': 'г', 'ᴇ': 'е', 'ᴋ': 'к', 'ᴍ': 'м', 'ʜ': 'н',
+    'ᴏ': 'о', 'ᴘ': 'р', 'ᴛ': 'т', 'ᴜ': 'u', 'ᴠ': 'v', 'ᴡ': 'w', 'ᴢ': 'z',
+    'ɡ': 'g', 'ɩ': 'i', 'ʏ': 'у', 'ɪ': 'i', 'ʀ': 'r', 'ʟ': 'l', 'ɴ': 'n',
+    'ɜ': 'з', 'ʒ': 'з', 'ɯ': 'ш', 'ƅ': 'ь', 'ᴎ': 'и', 'ᴙ': 'я',
+    # Коптский (часто в наборах "красивых" шрифтов)
+    'ⲁ': 'а', 'ⲃ': 'в', 'ⲅ': 'г', 'ⲉ': 'е', 'ⲕ': 'к', 'ⲙ': 'м', 'ⲏ': 'н',
+    'ⲟ': 'о', 'ⲡ': 'п', 'ⲣ': 'р', 'ⲥ': 'с', 'ⲧ': 'т', 'ⲩ': 'у', 'ⲭ': 'х',
+    # Армянский
+    'օ': 'о', 'ս': 'u', 'ց': 'g', 'հ': 'h', 'ո': 'n',
+}
+
+
+def protected_chars():
+    """Символы, которые сворачивает сам нормализатор"""
+    chars = set(map(chr, range(128))) | RUSSIAN | SEPARATORS
+    for letter, variants in Config.CHAR_REPLACEMENTS.items():
+        chars.add(letter)
+        chars.update(variant for variant in variants if len(variant) == 1)
+    return chars
+
+
+def is_target(char, protected):
+    """Цель свертки: буква или цифра, которую знает нормализатор"""
+    return char in protected and (char.isalnum() or char in '@$')
+
+
+def strip_marks(text):
+    """NFKC и удаление диакритики: "á" -> "a", "ｆ" -> "f" """
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return unicodedata.normalize('NFKC', stripped).lower()
+
+
+def read_confusables(path):
+    """Однобуквенные соответствия из confusables.txt: символ -> прообраз"""
+    mapping = {}
+    with open(path, encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            source, target = (field.strip() for field in line.split(';')[:2])
+            target = ''.join(chr(int(code, 16)) for code in target.split())
+            if ' ' not in source and len(target) == 1:
+                mapping[chr(int(source, 16))] = target
+    return mapping
+
+
+def build(confusables=None):
+    protected = protected_chars()
+    homoglyphs = dict(confusables or {})
+    homoglyphs.update(HOMOGLYPHS)
+
+    fold = {}
+    ignore = []
+    for code in range(0x110000):
+        char = chr(code)
+        if unicodedata.category(char) in ('Cn', 'Cs', 'Co', 'Cc'):
+            continue
+        if char in SEPARATORS:
+            continue
+        if is_ignorable(char):
+            ignore.append(char)
+            continue
+
+        # Ключ - символ после lower(): таблица применяется к тексту в нижнем регистре
+        key = char.lower()[:1]
+        if key in protected or key in fold:
+            continue
+
+        target = homoglyphs.get(key)
+        if target is None:
+            target = strip_marks(key)
+            if len(target) != 1:
+                continue
+            target = homoglyphs.get(target, target)
+        target = target.lower()
+
+        if target != key and is_target(target, protected):
+            fold[key] = target
+
+    return fold, ''.join(ignore)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборка таблицы похожих символов")
+    parser.add_argument('--confusables', type=Path, help="confusables.txt из Unicode")
+    parser.add_argument('--output', type=Path, default=OUTPUT, help="куда записать таблицу")
+    args = parser.parse_args()
+
+    confusables = read_confusables(args.confusables) if args.confusables else None
+    fold, ignore = build(confusables)
+
+    data = {
+        'unicode_version': unicodedata.unidata_version,
+        'sources': ['NFKC', 'homoglyphs'] + (['confusables.txt'] if confusables else []),
+        'fold': dict(sorted(fold.items())),
+        'ignore': ignore,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+        f.write('\n')
+
+    print(f"Записано {len(fold)} замен и {len(ignore)} невидимых символов: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
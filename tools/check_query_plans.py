@@ -0,0 +1,92 @@
+"""
+Проверка планов частых запросов к базе: код 1, если запрос идет не по своему индексу.
+
+Запуск: python tools/check_query_plans.py
+"""
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent / 'benchmarks'))
+
+from common import isolate_database
+from config import Config
+
+TEMP_DIR = isolate_database()
+Config.DB_WRITE_BEHIND = False
+
+from database import Database
+
+USERS = 2000
+LOGS = 20000
+CHATS = 50
+
+# Метод Database -> индекс, которым должен идти его запрос
+CHECKS = [
+    ('get_user_by_username', ('user7',), 'idx_users_username'),
+    ('get_user_logs', (7,), 'idx_logs_user_time'),
+    ('count_chat_actions', (-3, datetime.now() - timedelta(days=1)), 'idx_logs_chat_time'),
+    ('get_custom_words', (-3,), 'idx_custom_words_chat'),
+]
+
+
+def fill(database):
+    now = datetime.now()
+    with database.transaction() as cursor:
+        cursor.executemany(
+            'INSERT INTO users (user_id, username, first_name) VALUES (?, ?, ?)',
+            [(user_id, f'user{user_id}', 'Имя') for user_id in range(USERS)]
+        )
+        cursor.executemany(
+            'INSERT INTO moderation_logs (user_id, chat_id, action, reason, message_text, timestamp) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [(i % USERS, -(i % CHATS), 'message_deleted', 'проверка', '', now - timedelta(minutes=i))
+             for i in range(LOGS)]
+        )
+        cursor.executemany(
+            'INSERT INTO custom_words (word, chat_id) VALUES (?, ?)',
+            [(f'слово{i}', -(i % CHATS)) for i in range(500)]
+        )
+        cursor.execute('ANALYZE')
+
+
+def traced_queries(conn, call):
+    """SQL-запросы, которые выполнил call() на соединении conn"""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+
+
+def main():
+    database = Database(TEMP_DIR / 'plans.db')
+    fill(database)
+    reader = database.reader()
+
+    failed = False
+    for method, args, index in CHECKS:
+        queries = traced_queries(reader, lambda: getattr(database, method)(*args))
+        if not queries:
+            print(f"✗ {method}: запрос не перехвачен")
+            failed = True
+            continue
+
+        for sql in queries:
+            plan = [row[3] for row in reader.execute(f'EXPLAIN QUERY PLAN {sql}')]
+            ok = any(index in detail for detail in plan)
+            failed |= not ok
+            print(f"{'✓' if ok else '✗'} {method}: ожидается {index}")
+            for detail in plan:
+                print(f"    {detail}")
+
+    database.close()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""
+Повторная проверка истории сообщений текущим словарем.
+
+Источники:
+  export - экспорт чата из Telegram Desktop (result.json), в том числе
+           экспорт всех чатов; файл читается потоком, целиком в память
+           не загружается;
+  db     - колонка moderation_logs.message_text из базы бота.
+
+Сообщения идут через цепочку генераторов: чтение -> пачки ->
+пул процессов с WordFilter -> JSONL. В работе одновременно не больше
+workers * 4 пачек, поэтому память не зависит от размера входа, а
+пропускная способность растет с числом ядер. Вердикты пишутся в
+порядке входа, по строке JSON на сообщение.
+
+Сообщения пачки проверяются группами по чату вместе со словами чата
+(/addword). У записей лога chat_id свой, экспорт проверяется словами
+чата из --chat-id. Процессы пула открывают базу --db только для
+чтения: без миграций и фоновой записи.
+
+Запуск:
+  python tools/scan_corpus.py export result.json [--chat-id ID] [--output verdicts.jsonl]
+  python tools/scan_corpus.py db [--db data/users_data.db] [--only-violations]
+"""
+import argparse
+import json
+import multiprocessing
+import sqlite3
+import sys
+import threading
+import time
+from itertools import islice
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from config import Config
+
+READ_SIZE = 1 << 20
+MESSAGES_KEY = '"messages"'
+
+word_filter = None
+
+
+def message_text(text) -> str:
+    """Текст сообщения экспорта: строка или список кусков с разметкой"""
+    if isinstance(text, str):
+        return text
+    return ''.join(part if isinstance(part, str) else part.get('text', '') for part in text)
+
+
+def iter_json_array_items(path):
+    """
+    Объекты из всех массивов "messages" JSON-файла по одному
+
+    Ключ ищется прямо в тексте: внутри строк JSON кавычки
+    экранированы, поэтому "messages" с кавычками встречается только
+    как ключ. Каждый элемент разбирается json.raw_decode, в памяти
+    держится не больше одного элемента и блока чтения.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8-sig') as f:
+        buffer = ''
+        pos = 0
+        eof = False
+
+        def fill():
+            nonlocal buffer, pos, eof
+            chunk = f.read(READ_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return not eof
+
+        def skip(chars):
+            """Пропустить символы chars; False, если файл закончился"""
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in chars:
+                    pos += 1
+                if pos < len(buffer):
+                    return True
+                if not fill():
+                    return False
+
+        while True:
+            # Ищем следующий ключ "messages" с массивом
+            index = buffer.find(MESSAGES_KEY, pos)
+            if index < 0:
+                # Хвост буфера может содержать начало ключа
+                pos = max(pos, len(buffer) - len(MESSAGES_KEY))
+                if not fill():
+                    return
+                continue
+            pos = index + len(MESSAGES_KEY)
+            if not skip(' \t\r\n:') or buffer[pos] != '[':
+                continue
+            pos += 1
+
+            while skip(' \t\r\n,'):
+                if buffer[pos] == ']':
+                    pos += 1
+                    break
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # Элемент не поместился в буфер - дочитываем
+                    if not fill():
+                        raise
+                    continue
+                pos = end
+                yield item
+
+
+def read_export(path, chat_id=None):
+    """Сообщения экспорта Telegram: (запись, текст); chat_id - чей словарь применять"""
+    for item in iter_json_array_items(path):
+        if not isinstance(item, dict) or item.get('type') != 'message':
+            continue
+        text = message_text(item.get('text', ''))
+        if text:
+            record = {'id': item.get('id'), 'date': item.get('date'), 'from_id': item.get('from_id')}
+            if chat_id is not None:
+                record['chat_id'] = chat_id
+            yield record, text
+
+
+def read_db(path):
+    """Тексты из лога модерации: (запись, текст)"""
+    conn = sqlite3.connect(f'{Path(path).resolve().as_uri()}?mode=ro', uri=True)
+    try:
+        cursor = conn.execute('''
+            SELECT id, chat_id, user_id, message_text FROM moderation_logs
+            WHERE message_text IS NOT NULL AND message_text != ''
+            ORDER BY id
+        ''')
+        for log_id, chat_id, user_id, text in cursor:
+            yield {'id': log_id, 'chat_id': chat_id, 'user_id': user_id}, text
+    finally:
+        conn.close()
+
+
+def batches(items, size):
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bounded(items, slots: threading.Semaphore, stop: threading.Event):
+    """
+    Отдавать элементы, только пока есть свободные места
+
+    Pool.imap забирает входной итератор целиком в своем потоке;
+    место освобождается, когда результат пачки прочитан. После stop
+    итератор заканчивается, чтобы этот поток завершился.
+    """
+    for item in items:
+        slots.acquire()
+        if stop.is_set():
+            return
+        yield item
+
+
+def init_worker(db_path=None):
+    """
+    Загрузка словаря в процессе пула (файл автомата общий через mmap)
+
+    Глобальная база, которую создает импорт filters, открывается
+    только для чтения: воркеры не мигрируют и не пишут базу бота.
+    """
+    global word_filter
+    Config.DB_READ_ONLY = True
+    if db_path is not None:
+        Config.DB_PATH = db_path
+    from filters import word_filter as loaded
+    word_filter = loaded
+    word_filter.verdict_cache.max_entries = 0
+
+
+def check_batch(batch):
+    """Вердикты пачки: сообщения каждого чата проверяются вместе с его словами"""
+    chats = {}
+    for index, (record, _) in enumerate(batch):
+        chats.setdefault(record.get('chat_id'), []).append(index)
+
+    verdicts = [None] * len(batch)
+    for chat_id, indexes in chats.items():
+        texts = [batch[index][1] for index in indexes]
+        for index, verdict in zip(indexes, word_filter.check_chunk(texts, chat_id)):
+            verdicts[index] = verdict
+
+    return [
+        dict(record, violation=found, word=word, type=violation_type)
+        for (record, _), (found, word, violation_type) in zip(batch, verdicts)
+    ]
+
+
+def scan(items, workers: int, batch_size: int, db_path=None):
+    """
+    Вердикты в порядке входа; workers=0 - без пула, в этом процессе
+
+    db_path - база со словами и настройками чатов (по умолчанию Config.DB_PATH).
+    """
+    if workers == 0:
+        init_worker(db_path)
+        for batch in batches(items, batch_size):
+            yield from check_batch(batch)
+        return
+
+    slots = threading.Semaphore(workers * 4)
+    stop = threading.Event()
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=(db_path,)) as pool:
+        try:
+            for results in pool.imap(check_batch, bounded(batches(items, batch_size), slots, stop)):
+                slots.release()
+                yield from results
+        finally:
+            # Ошибка пачки или чтение брошено: поток пула, раздающий пачки,
+            # может ждать места в bounded, а terminate() при выходе из with
+            # ждет этот поток. Будим его, и он заканчивает раздачу
+            stop.set()
+            slots.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Повторная проверка истории сообщений")
+    parser.add_argument('source', choices=('export', 'db'), help="откуда читать сообщения")
+    parser.add_argument('path', nargs='?', type=Path, help="result.json экспорта Telegram")
+    parser.add_argument('--db', type=Path, default=Config.DB_PATH,
+                        help="база бота: лог для источника db, слова и настройки чатов")
+    parser.add_argument('--chat-id', type=int, help="чат, словами которого проверять экспорт")
+    parser.add_argument('--output', type=Path, help="файл JSONL (по умолчанию stdout)")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                        help="процессов в пуле, 0 - без пула")
+    parser.add_argument('--batch-size', type=int, default=512, help="сообщений в пачке")
+    parser.add_argument('--only-violations', action='store_true', help="писать только нарушения")
+    args = parser.parse_args()
+
+    if args.source == 'export':
+        if args.path is None:
+            parser.error("для источника export нужен путь к result.json")
+        items = read_export(args.path, args.chat_id)
+    else:
+        items = read_db(args.db)
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    started = time.perf_counter()
+    total = violations = 0
+    try:
+        for verdict in scan(items, args.workers, args.batch_size, args.db):
+            total += 1
+            violations += verdict['violation']
+            if verdict['violation'] or not args.only_violations:
+                output.write(json.dumps(verdict, ensure_ascii=False) + '\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Проверено {total} сообщений, нарушений: {violations}, "
+          f"{total / max(elapsed, 1e-9):.0f} сообщ/с", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,103 +1,19 @@
+import sys
+import time
+from pathlib import Path
+
 import telebot
-import re
+
+# Проверка и хранилище общие с основным ботом (src/)
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from database import db
+from filters import word_filter
 
 # Замени 'TOKEN' на токен от @BotFather
 TOKEN = 'BOT_TOKEN'
 bot = telebot.TeleBot(TOKEN)
 
-# Словарь замен для обхода фильтра (буквы -> возможные замены)
-CHAR_REPLACEMENTS = {
-    'а': ['а', 'a', '@'],
-    'б': ['б', 'b', '6'],
-    'в': ['в', 'v', 'b'],
-    'г': ['г', 'g', 'r'],
-    'д': ['д', 'd'],
-    'е': ['е', 'e'],
-    'ё': ['ё', 'е', 'e'],
-    'ж': ['ж', 'zh', 'z*'],
-    'з': ['з', 'z', '3'],
-    'и': ['и', 'i', 'u'],
-    'й': ['й', 'j', 'y', 'i'],
-    'к': ['к', 'k'],
-    'л': ['л', 'l'],
-    'м': ['м', 'm'],
-    'н': ['н', 'n'],
-    'о': ['о', 'o', '0'],
-    'п': ['п', 'p', 'n', 'п'],
-    'р': ['р', 'r', 'p'],
-    'с': ['с', 'c', 's'],
-    'т': ['т', 't', 'm'],
-    'у': ['у', 'y', 'u'],
-    'ф': ['ф', 'f'],
-    'х': ['х', 'x', 'h'],
-    'ц': ['ц', 'c', 'ts'],
-    'ч': ['ч', 'ch', '4'],
-    'ш': ['ш', 'sh'],
-    'щ': ['щ', 'sch', 'shch'],
-    'ъ': ['ъ', ''],
-    'ы': ['ы', 'i', 'y'],
-    'ь': ['ь', ''],
-    'э': ['э', 'e', 'э'],
-    'ю': ['ю', 'yu', 'iu'],
-    'я': ['я', 'ya', 'ia']
-}
-
-# Базовые запрещенные слова (в нормальной форме)
-BASE_BAD_WORDS = [
-    'блять', 'блядь', 'пизда', 'пиздец', 'ебать', 'ёб', 'ебал',
-    'хуй', 'хуё', 'мудак', 'гондон', 'сука', 'дрочить', 'трахать',
-    'вагина', 'член', 'хер', 'анус', 'жопа', 'сперма', 'секс',
-    'шлюха', 'проститутка', 'педераст', 'пидор', 'гомик',
-    'нацист', 'фашист', 'расист', 'жид', 'черножопый',
-    'дебил', 'идиот', 'дурак', 'тупица', 'кретин', 'даун',
-    'лох', 'лошара', 'чмо', 'отстой', 'говно', 'дерьмо',
-    'срать', 'срань', 'залупа', 'залупой', 'залупиться'
-]
-
-
-# Создаем расширенный список слов с разными вариантами написания
-def generate_word_variants(word):
-    variants = set()
-    # Добавляем базовое слово
-    variants.add(word)
-
-    # Добавляем варианты с заменой русских букв на английские
-    for rus_char, eng_chars in CHAR_REPLACEMENTS.items():
-        if rus_char in word:
-            for eng_char in eng_chars:
-                variant = word.replace(rus_char, eng_char)
-                variants.add(variant)
-
-    # Добавляем варианты с разными комбинациями замен
-    for i in range(len(word)):
-        if word[i] in CHAR_REPLACEMENTS:
-            for replacement in CHAR_REPLACEMENTS[word[i]]:
-                variant = word[:i] + replacement + word[i + 1:]
-                variants.add(variant)
-
-    return list(variants)
-
-
-# Генерируем полный список запрещенных слов
-BAD_WORDS = []
-for base_word in BASE_BAD_WORDS:
-    BAD_WORDS.extend(generate_word_variants(base_word))
-
-# Также добавляем слова с разделителями и повторениями
-EXTENDED_BAD_PATTERNS = []
-for base_word in BASE_BAD_WORDS:
-    # Паттерн для слов с разделителями (м-а-т, м.а.т, м а т)
-    pattern = ''
-    for char in base_word:
-        if char in CHAR_REPLACEMENTS:
-            possible_chars = CHAR_REPLACEMENTS[char]
-            pattern += f'[{"".join(possible_chars)}]'
-        else:
-            pattern += char
-        pattern += r'[\s\-_\.]*'
-
-    EXTENDED_BAD_PATTERNS.append(pattern[:-len(r'[\s\-_\.]*')])
-
 
 # Команда /start
 @bot.message_handler(commands=['start'])
@@ -132,7 +48,7 @@ def send_help(message):
 /stats - статистика работы
 
 **Для администраторов:**
-/addword [слово] - добавить слово в фильтр
+/addword [слово] - добавить слово в фильтр чата
 /listwords - показать список запрещенных слов
 /delword [слово] - удалить слово из фильтра
 /warn [@username] - выдать предупреждение
@@ -173,59 +89,28 @@ def send_rules(message):
 # Команда /stats
 @bot.message_handler(commands=['stats'])
 def send_stats(message):
+    metrics = word_filter.get_metrics()
     stats_text = f"""
 📊 **Статистика бота:**
 
-• Загружено {len(BASE_BAD_WORDS)} базовых запрещенных слов
-• Сгенерировано {len(BAD_WORDS)} вариантов написания
-• Загружено {len(EXTENDED_BAD_PATTERNS)} паттернов для поиска
+• Загружено {len(word_filter.base_words)} базовых запрещенных слов
+• Слов в словаре с исключениями: {metrics['dictionary_size']}
 • Активные фильтры: проверка замен букв, разделителей, регистра
     """
     bot.send_message(message.chat.id, stats_text, parse_mode='Markdown')
 
 
-# Хранилище для предупреждений (в реальном проекте используйте БД)
-warnings_storage = {}
-
-
-# Улучшенная функция проверки текста
-def check_text_for_bad_words(text):
-    text_lower = text.lower()
-
-    # 1. Проверка по точному совпадению в BAD_WORDS
-    for word in BAD_WORDS:
-        if word in text_lower:
-            return True, f"Запрещенное слово: {word}"
-
-    # 2. Проверка по паттернам (с разделителями)
-    for pattern in EXTENDED_BAD_PATTERNS:
-        if re.search(pattern, text_lower, re.IGNORECASE):
-            return True, f"Обнаружен запрещенный паттерн"
-
-    # 3. Проверка на обход фильтра через пробелы/разделители
-    text_without_spaces = re.sub(r'[\s\-_\.]', '', text_lower)
-    for word in BAD_WORDS:
-        if len(word) > 3 and word in text_without_spaces:
-            return True, f"Запрещенное слово с разделителями"
-
-    # 4. Проверка на повторяющиеся символы (типа "приввеет")
-    for base_word in BASE_BAD_WORDS:
-        if len(base_word) > 3:
-            # Создаем паттерн с возможными повторениями символов
-            pattern = ''
-            for char in base_word:
-                pattern += f'{re.escape(char)}+'
+# Проверка текста общим автоматом фильтра
+def check_text_for_bad_words(text, chat_id=None):
+    has_bad_content, bad_word, _ = word_filter.check_message(text, chat_id)
+    if has_bad_content:
+        return True, f"Запрещенное слово: {bad_word}"
+    return False, None
 
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                # Проверяем, что найденная последовательность похожа на запрещенное слово
-                match = re.search(pattern, text_lower, re.IGNORECASE)
-                if match:
-                    matched_text = match.group()
-                    # Если длина найденного текста близка к длине базового слова
-                    if abs(len(matched_text) - len(base_word)) <= 3:
-                        return True, f"Запрещенное слово с повторениями символов"
 
-    return False, None
+# Предупреждения хранятся в БД, как у основного бота
+def add_warning(user):
+    return db.increment_warnings(user.id, user.username, user.first_name, user.last_name)
 
 
 # Команда для добавления слов (админам)
@@ -241,11 +126,13 @@ def add_bad_word(message):
             if words:
                 added_words = []
                 for word in words:
-                    if word.lower() not in BASE_BAD_WORDS:
-                        BASE_BAD_WORDS.append(word.lower())
-                        # Обновляем BAD_WORDS
-                        BAD_WORDS.extend(generate_word_variants(word.lower()))
-                        added_words.append(word.lower())
+                    word = word.lower()
+                    # Слова попадают в словарь этого чата, как в основном боте
+                    if db.add_custom_word(word, user_id, chat_id):
+                        added_words.append(word)
+                if added_words:
+                    # Автомат чата соберется при следующем сообщении
+                    word_filter.reload_chat_words(chat_id)
 
                 bot.reply_to(message, f"✅ Добавлено {len(added_words)} слов: {', '.join(added_words)}")
             else:
@@ -265,9 +152,10 @@ def list_bad_words(message):
     try:
         member = bot.get_chat_member(chat_id, user_id)
         if member.status in ['creator', 'administrator']:
-            words_list = "\n".join(BASE_BAD_WORDS[:50])  # Показываем первые 50 слов
-            if len(BASE_BAD_WORDS) > 50:
-                words_list += f"\n\n... и ещё {len(BASE_BAD_WORDS) - 50} слов"
+            base_words = word_filter.base_words + db.get_custom_words(chat_id)
+            words_list = "\n".join(base_words[:50])  # Показываем первые 50 слов
+            if len(base_words) > 50:
+                words_list += f"\n\n... и ещё {len(base_words) - 50} слов"
             bot.reply_to(message, f"📝 Список запрещенных слов:\n{words_list}")
         else:
             bot.reply_to(message, "❌ Эта команда только для администраторов!")
@@ -281,7 +169,7 @@ def handle_all_messages(message):
     text = message.text
 
     # Проверяем текст
-    has_bad_content, reason = check_text_for_bad_words(text)
+    has_bad_content, reason = check_text_for_bad_words(text, message.chat.id)
 
     if has_bad_content:
         try:
@@ -290,11 +178,8 @@ def handle_all_messages(message):
 
             # Увеличиваем счетчик предупреждений
             user_id = message.from_user.id
-            if user_id not in warnings_storage:
-                warnings_storage[user_id] = 0
-            warnings_storage[user_id] += 1
-
-            warnings_count = warnings_storage[user_id]
+            warnings_count = add_warning(message.from_user)
+            db.add_moderation_log(user_id, message.chat.id, "message_deleted", reason, text[:100])
             username = message.from_user.username if message.from_user.username else message.from_user.first_name
 
             # Формируем сообщение в зависимости от количества предупреждений
@@ -322,7 +207,7 @@ def handle_all_messages(message):
                 action = "⛔ Бан"
                 try:
                     bot.ban_chat_member(message.chat.id, user_id)
-                    del warnings_storage[user_id]
+                    db.update_warnings(user_id, 0)
                 except:
                     pass
                 duration = ""
@@ -376,13 +261,10 @@ def welcome_new_member(message):
 
 # Запуск бота
 if __name__ == '__main__':
-    import time
-
     print("=" * 50)
     print("🤖 Умный бот-модератор запущен!")
-    print(f"📊 Базовых слов: {len(BASE_BAD_WORDS)}")
-    print(f"📊 Всего вариантов: {len(BAD_WORDS)}")
-    print(f"📊 Паттернов: {len(EXTENDED_BAD_PATTERNS)}")
+    print(f"📊 Базовых слов: {len(word_filter.base_words)}")
+    print(f"📊 Слов в словаре: {word_filter.get_metrics()['dictionary_size']}")
     print("=" * 50)
     print("⚙️  Возможности фильтрации:")
     print("• Замена русских букв на английские")